@@ -0,0 +1,135 @@
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+# Claims `tokens_for_user` embeds so requests can be authenticated without loading the user
+PRINCIPAL_CLAIMS = ('user_type', 'buyer_id', 'vendor_id')
+
+DEFAULT_AUTH_PRINCIPAL_SETTINGS = {
+    'TTL_SECONDS': 30,
+}
+
+
+def auth_principal_settings():
+    return {**DEFAULT_AUTH_PRINCIPAL_SETTINGS, **getattr(settings, 'AUTH_PRINCIPAL_CACHE', {})}
+
+
+def tokens_for_user(user):
+    """
+    Refresh token (and through it, the access token) of `user` carrying its role and the
+    ids of its buyer and vendor profiles, read in one query.
+    """
+    buyer_id, vendor_id = (
+        User.objects.filter(pk=user.pk).values_list('buyer_profile__id', 'vendor_profile__id').first()
+    )
+    refresh = RefreshToken.for_user(user)
+    refresh['user_type'] = user.user_type
+    refresh['buyer_id'] = buyer_id
+    refresh['vendor_id'] = vendor_id
+    return refresh
+
+
+class TokenPrincipal(TokenUser):
+    """
+    The user of a request authenticated from token claims. Role and profile ids come from
+    the token; any other user attribute loads the `VendorManagementUser` row on first use,
+    so only views that need the full user pay for it.
+    """
+
+    @cached_property
+    def user(self):
+        return User.objects.get(pk=self.id)
+
+    @property
+    def user_type(self):
+        return self.token['user_type']
+
+    @property
+    def buyer_id(self):
+        return self.token['buyer_id']
+
+    @property
+    def vendor_id(self):
+        return self.token['vendor_id']
+
+    @property
+    def is_staff(self):
+        return self.user.is_staff
+
+    @property
+    def is_superuser(self):
+        return self.user.is_superuser
+
+    @property
+    def username(self):
+        return self.user.get_username()
+
+    def __str__(self):
+        return f'TokenPrincipal {self.id}'
+
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr in ('token', 'user'):
+            raise AttributeError(attr)
+        return getattr(self.user, attr)
+
+
+class PrincipalCache:
+    """
+    When each user was last confirmed active, per process. Within TTL_SECONDS of that a
+    token is trusted without touching the database; `invalidate` (called when a user is
+    deactivated or deleted) forces the next request to check again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._verified_until = {}
+
+    def is_active(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            if self._verified_until.get(user_id, 0) > now:
+                return True
+        active = User.objects.filter(pk=user_id, is_active=True).exists()
+        if active:
+            with self._lock:
+                self._verified_until[user_id] = now + auth_principal_settings()['TTL_SECONDS']
+        return active
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._verified_until.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._verified_until.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds a `TokenPrincipal` from the claims of tokens issued by
+    `tokens_for_user`, checking only that the user is still active (cached). Tokens
+    without those claims authenticate as before, by loading the user.
+    """
+
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in PRINCIPAL_CLAIMS):
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed('Token contained no recognizable user identification')
+        if not principal_cache.is_active(user_id):
+            raise AuthenticationFailed('User not found or inactive', code='user_inactive')
+        return TokenPrincipal(validated_token)
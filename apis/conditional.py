@@ -0,0 +1,73 @@
+import hashlib
+from collections import namedtuple
+from operator import attrgetter
+from django.db.models import FilteredRelation, Q
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+Validators = namedtuple('Validators', ['etag', 'last_modified'])
+
+
+def resource_validators(request, timestamps, *parts):
+    """
+    Strong ETag and Last-Modified of a representation that depends on the rows last
+    updated at `timestamps` and on `parts`. The request path (with its query string) and
+    the user are part of the ETag, since they select what is rendered.
+    """
+    timestamps = [timestamp for timestamp in timestamps if timestamp is not None]
+    key = repr((request.get_full_path(), request.user.pk, parts, [timestamp.isoformat() for timestamp in timestamps]))
+    etag = '"%s"' % hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    return Validators(etag, max(timestamps) if timestamps else None)
+
+
+def page_validators(request, page, timestamp_fields, *parts):
+    """
+    Validators of one page of a list endpoint, from the rows already fetched for it: their
+    ids and `timestamp_fields` (dotted for related rows), plus `parts` such as the total
+    count and next link, which change when rows are added or deleted elsewhere.
+    """
+    timestamps = [attrgetter(field)(row) for row in page for field in timestamp_fields]
+    return resource_validators(request, timestamps, [row.pk for row in page], *parts)
+
+
+def vendor_validators(request, vendors, window=None, counters=False):
+    """
+    Validators of the single vendor in `vendors`, read in one query, or None when there is
+    none. Rolling `window` KPIs also depend on the window's counters row and on the day;
+    `counters` adds the lifetime counters row (response time sketch).
+    """
+    fields = ['updated_at', 'user__updated_at']
+    if window:
+        vendors = vendors.annotate(
+            window_metrics=FilteredRelation('rolling_metrics', condition=Q(rolling_metrics__window_days=window))
+        )
+        fields.append('window_metrics__updated_at')
+    if counters:
+        fields.append('metric_counters__updated_at')
+    row = vendors.values_list(*fields).first()
+    if row is None:
+        return None
+    return resource_validators(request, row, timezone.localdate() if window else None)
+
+
+def not_modified(request, validators):
+    """
+    The 304 answering a conditional GET (`If-None-Match`, else `If-Modified-Since`) that
+    still matches `validators`, or None when the representation has to be sent.
+    """
+    last_modified = int(validators.last_modified.timestamp()) if validators.last_modified else None
+    response = get_conditional_response(request, etag=validators.etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, validators)
+    return response
+
+
+def set_validators(response, validators):
+    response['ETag'] = validators.etag
+    if validators.last_modified:
+        response['Last-Modified'] = http_date(validators.last_modified.timestamp())
+    # Representations are per user; clients and proxies must revalidate before reuse.
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
@@ -0,0 +1,40 @@
+def largest_triangle_three_buckets(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of `points`, a list of (x, y) pairs sorted
+    by x. Returns the indexes of the points to keep: always the first and the last, plus
+    from every bucket in between the point forming the largest triangle with the
+    previously kept point and the average of the next bucket.
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+
+    selected = [0]
+    every = (count - 2) / (threshold - 2)
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+
+        next_start = end
+        next_end = min(int((bucket + 2) * every) + 1, count)
+        next_points = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(x for x, _ in next_points) / len(next_points)
+        avg_y = sum(y for _, y in next_points) / len(next_points)
+
+        prev_x, prev_y = points[previous]
+        best_area = -1
+        best = start
+        for index in range(start, min(end, count - 1)):
+            x, y = points[index]
+            area = abs((prev_x - avg_x) * (y - prev_y) - (prev_x - x) * (avg_y - prev_y))
+            if area > best_area:
+                best_area = area
+                best = index
+
+        selected.append(best)
+        previous = best
+
+    selected.append(count - 1)
+    return selected
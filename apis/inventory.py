@@ -0,0 +1,141 @@
+import random
+from collections import Counter
+from django.db import transaction
+from django.db.models import F, Sum
+from vendor_models.models import Items, ItemStockShard, StockReservation
+
+
+class OutOfStock(Exception):
+    pass
+
+
+def reserve_stock(item_id, quantity):
+    """
+    Takes `quantity` units of an item's stock with a conditional UPDATE, so concurrent
+    orders can never oversell. Raises `OutOfStock` when not enough is left.
+    """
+    taken = Items.objects.filter(pk=item_id, stock_shards=0, available_quantity__gte=quantity).update(
+        available_quantity=F('available_quantity') - quantity
+    )
+    if taken:
+        return
+    if not _reserve_sharded_stock(item_id, quantity):
+        raise OutOfStock(f'Not enough stock of item {item_id} for {quantity} units.')
+
+
+def _reserve_sharded_stock(item_id, quantity):
+    shards = list(ItemStockShard.objects.filter(item_id=item_id).values_list('shard', flat=True))
+    if not shards:
+        return False
+    # Start at a random shard so concurrent reservations spread over different rows.
+    random.shuffle(shards)
+    for shard in shards:
+        if ItemStockShard.objects.filter(item_id=item_id, shard=shard, available_quantity__gte=quantity).update(
+            available_quantity=F('available_quantity') - quantity
+        ):
+            return True
+
+    # No single shard holds enough: take from several at once under row locks.
+    with transaction.atomic():
+        rows = list(
+            ItemStockShard.objects.select_for_update().filter(item_id=item_id, available_quantity__gt=0)
+            .order_by('-available_quantity')
+        )
+        if sum(row.available_quantity for row in rows) < quantity:
+            return False
+        remaining = quantity
+        for row in rows:
+            take = min(row.available_quantity, remaining)
+            ItemStockShard.objects.filter(pk=row.pk).update(available_quantity=F('available_quantity') - take)
+            remaining -= take
+            if not remaining:
+                break
+    return True
+
+
+def release_stock(item_id, quantity):
+    """
+    Returns `quantity` units to an item's stock, e.g. when its order is cancelled.
+    """
+    if Items.objects.filter(pk=item_id, stock_shards=0).update(available_quantity=F('available_quantity') + quantity):
+        return
+    shards = Items.objects.filter(pk=item_id).values_list('stock_shards', flat=True).first()
+    if shards:
+        ItemStockShard.objects.filter(item_id=item_id, shard=random.randrange(shards)).update(
+            available_quantity=F('available_quantity') + quantity
+        )
+
+
+def release_reserved_stock(purchase_order_ids):
+    """
+    Returns the stock reserved for the given purchase orders to their items, with one
+    update per item, and deletes the reservations. The reservations are locked first, so
+    concurrent cancellations of an order release its stock once; orders without a
+    reservation (never reserved, or already released) release nothing.
+    """
+    with transaction.atomic():
+        reservations = list(
+            StockReservation.objects.select_for_update().filter(purchase_order_id__in=purchase_order_ids)
+            .values_list('pk', 'item_id', 'quantity')
+        )
+        if not reservations:
+            return
+        StockReservation.objects.filter(pk__in=[pk for pk, _, _ in reservations]).delete()
+        released = Counter()
+        for _, item_id, quantity in reservations:
+            released[item_id] += quantity
+        for item_id, quantity in released.items():
+            release_stock(item_id, quantity)
+
+
+def change_reserved_stock(purchase_order_id, item_id, quantity):
+    """
+    Moves the reservation of a purchase order to `quantity` units of `item_id` when its
+    item or quantity is edited: the difference is reserved or released, or on an item
+    change the new item is reserved and the old one released. Orders without a
+    reservation are left alone. Raises `OutOfStock` when the new units are not available.
+    """
+    with transaction.atomic():
+        reservation = StockReservation.objects.select_for_update().filter(purchase_order_id=purchase_order_id).first()
+        if reservation is None or (reservation.item_id, reservation.quantity) == (item_id, quantity):
+            return
+        if reservation.item_id != item_id:
+            reserve_stock(item_id, quantity)
+            release_stock(reservation.item_id, reservation.quantity)
+        elif quantity > reservation.quantity:
+            reserve_stock(item_id, quantity - reservation.quantity)
+        else:
+            release_stock(item_id, reservation.quantity - quantity)
+        reservation.item_id, reservation.quantity = item_id, quantity
+        reservation.save(update_fields=['item', 'quantity'])
+
+
+def available_stock(item_id):
+    """
+    Units of an item left to reserve, whichever mode its stock is kept in.
+    """
+    item = Items.objects.filter(pk=item_id).values('available_quantity', 'stock_shards').get()
+    if not item['stock_shards']:
+        return item['available_quantity']
+    return ItemStockShard.objects.filter(item_id=item_id).aggregate(total=Sum('available_quantity'))['total'] or 0
+
+
+def set_stock_shards(item_id, shards):
+    """
+    Moves an item's stock into `shards` evenly filled shard rows, or back into
+    `Items.available_quantity` with `shards=0`. Returns the stock moved.
+    """
+    with transaction.atomic():
+        item = Items.objects.select_for_update().get(pk=item_id)
+        stock = available_stock(item_id)
+        ItemStockShard.objects.filter(item_id=item_id).delete()
+        if shards:
+            share, extra = divmod(stock, shards)
+            ItemStockShard.objects.bulk_create([
+                ItemStockShard(item_id=item_id, shard=shard, available_quantity=share + (shard < extra))
+                for shard in range(shards)
+            ])
+        item.stock_shards = shards
+        item.available_quantity = 0 if shards else stock
+        item.save(update_fields=['stock_shards', 'available_quantity', 'updated_at'])
+    return stock
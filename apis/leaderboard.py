@@ -0,0 +1,171 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from django.conf import settings
+from vendor_models.models import Vendor
+
+
+# KPI name -> (Vendor column, whether a higher value ranks better)
+LEADERBOARD_METRICS = {
+    'on_time_delivery_rate': ('on_time_delivery_date', True),
+    'quality_rating_avg': ('quality_rating_avg', True),
+    'average_response_time': ('average_response_time', False),
+    'fulfillment_rate': ('fulfillment_rate', True),
+}
+
+DEFAULT_LEADERBOARD_SETTINGS = {
+    'RELOAD_SECONDS': 300,
+}
+
+
+def leaderboard_settings():
+    return {**DEFAULT_LEADERBOARD_SETTINGS, **getattr(settings, 'VENDOR_LEADERBOARD', {})}
+
+
+class RankingIndex:
+    """
+    Vendors of one KPI kept sorted best first. Rank and percentile lookups are a binary
+    search; changing a vendor's value moves only that vendor's entry.
+    """
+
+    def __init__(self, higher_is_better):
+        self.higher_is_better = higher_is_better
+        self._keys = []
+        self._entries = []
+        self._values = {}
+
+    def _key(self, value):
+        return -value if self.higher_is_better else value
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, vendor_id):
+        return vendor_id in self._values
+
+    def update(self, vendor_id, value):
+        if vendor_id in self._values:
+            if self._values[vendor_id] == value:
+                return
+            self.remove(vendor_id)
+        key = self._key(value)
+        position = bisect_right(self._entries, (key, vendor_id))
+        self._entries.insert(position, (key, vendor_id))
+        self._keys.insert(position, key)
+        self._values[vendor_id] = value
+
+    def remove(self, vendor_id):
+        value = self._values.pop(vendor_id, None)
+        if value is None:
+            return
+        position = bisect_left(self._entries, (self._key(value), vendor_id))
+        del self._entries[position]
+        del self._keys[position]
+
+    def value(self, vendor_id):
+        return self._values[vendor_id]
+
+    def rank(self, vendor_id):
+        """
+        1-based rank; vendors with the same value share the best rank among them.
+        """
+        return bisect_left(self._keys, self._key(self._values[vendor_id])) + 1
+
+    def percentile(self, vendor_id):
+        """
+        Share of vendors, in percent, that this vendor ranks level with or ahead of.
+        """
+        level_or_behind = len(self._keys) - bisect_left(self._keys, self._key(self._values[vendor_id]))
+        return round(100.0 * level_or_behind / len(self._keys), 2)
+
+    def top(self, limit):
+        """
+        `(rank, vendor_id, value)` for the best `limit` vendors.
+        """
+        leaders = []
+        for position, (key, vendor_id) in enumerate(self._entries[:limit]):
+            rank = leaders[-1][0] if leaders and key == self._entries[position - 1][0] else position + 1
+            leaders.append((rank, vendor_id, self._values[vendor_id]))
+        return leaders
+
+
+class VendorLeaderboard:
+    """
+    One `RankingIndex` per KPI, loaded from Vendor in a single query on first use and
+    then kept current from `vendor_metrics_updated`. Writes made by other processes are
+    picked up by reloading once the index is older than RELOAD_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._indexes = None
+        self._loaded_at = None
+
+    def _ensure_loaded(self):
+        reload_seconds = leaderboard_settings()['RELOAD_SECONDS']
+        if self._indexes is None or (
+            reload_seconds is not None and time.monotonic() - self._loaded_at > reload_seconds
+        ):
+            self.reload()
+
+    def reload(self):
+        columns = [column for column, _ in LEADERBOARD_METRICS.values()]
+        indexes = {name: RankingIndex(higher) for name, (_, higher) in LEADERBOARD_METRICS.items()}
+        for vendor_id, *values in Vendor.objects.values_list('pk', *columns).iterator():
+            for index, value in zip(indexes.values(), values):
+                index.update(vendor_id, value)
+        with self._lock:
+            self._indexes = indexes
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._indexes = None
+
+    def update(self, metrics_by_vendor):
+        """
+        Applies new KPI values, `{vendor_id: {metric: value}}`, to a loaded index.
+        """
+        with self._lock:
+            if self._indexes is None:
+                return
+            for vendor_id, metrics in metrics_by_vendor.items():
+                for name, index in self._indexes.items():
+                    if name in metrics:
+                        index.update(vendor_id, metrics[name])
+
+    def remove(self, vendor_id):
+        with self._lock:
+            if self._indexes is None:
+                return
+            for index in self._indexes.values():
+                index.remove(vendor_id)
+
+    def top(self, metric, limit):
+        with self._lock:
+            self._ensure_loaded()
+            return self._indexes[metric].top(limit)
+
+    def standing(self, vendor_id, metrics=None):
+        """
+        `{metric: {'value', 'rank', 'percentile'}}` for the vendor plus the number of
+        ranked vendors, or None when the vendor is not ranked.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            first = next(iter(self._indexes.values()))
+            if vendor_id not in first:
+                return None
+            standing = {
+                name: {
+                    'value': index.value(vendor_id),
+                    'rank': index.rank(vendor_id),
+                    'percentile': index.percentile(vendor_id),
+                }
+                for name, index in self._indexes.items()
+                if metrics is None or name in metrics
+            }
+            return standing, len(first)
+
+
+vendor_leaderboard = VendorLeaderboard()
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from apis.metric_counters import advance_rolling_windows
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves every vendor's 30/90/365 day rolling metrics forward to end today by subtracting the "
+        "daily counters that left the window. Meant to run once a day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Vendors handled per transaction.")
+
+    def handle(self, *args, **options):
+        moved = advance_rolling_windows(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved} rolling windows forward.'))
@@ -0,0 +1,61 @@
+import timeit
+import uuid
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from apis.renderers import EnvelopeJSONRenderer
+
+
+def purchase_order_page(rows):
+    """A purchase order list response of `rows` rows, as the list view builds it."""
+    now = timezone.now()
+    return {
+        'count': rows * 10,
+        'next': 'http://testserver/apis/purchase-orders/?page=2',
+        'previous': None,
+        'results': {
+            'responseCode': 200,
+            'responseMessage': 'Purchase orders retrieved successfully.',
+            'responseData': [
+                {
+                    'po_number': str(uuid.uuid4()), 'vendor': 7, 'buyer': 3,
+                    'order_date': now - timedelta(days=index), 'delivery_date': now + timedelta(days=index),
+                    'items': 11, 'quantity': index % 9 + 1, 'status': 'completed', 'quality_rating': 4.5,
+                    'issue_date': now - timedelta(days=index, hours=2), 'acknowledgment_date': None,
+                }
+                for index in range(rows)
+            ],
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = "Compares the throughput of DRF's JSONRenderer and EnvelopeJSONRenderer on purchase order pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help="Rows per page.")
+        parser.add_argument('--number', type=int, default=200, help="Pages rendered per timing.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timings taken; the best one is reported.")
+
+    def handle(self, *args, **options):
+        page = purchase_order_page(options['rows'])
+        envelope = page['results']
+
+        def pages_per_second(renderer, data):
+            best = min(timeit.repeat(lambda: renderer.render(data), number=options['number'], repeat=options['repeat']))
+            return options['number'] / best
+
+        results = []
+        for payload, data in (('paginated page', page), ('envelope', envelope)):
+            baseline = pages_per_second(JSONRenderer(), data)
+            results.append((payload, 'JSONRenderer', baseline, baseline))
+            for use_orjson in (True, False) if EnvelopeJSONRenderer.use_orjson else (False,):
+                renderer = EnvelopeJSONRenderer()
+                renderer.use_orjson = use_orjson
+                name = f"EnvelopeJSONRenderer ({'orjson' if use_orjson else 'json'})"
+                results.append((payload, name, pages_per_second(renderer, data), baseline))
+
+        self.stdout.write(f"{options['rows']}-row purchase order pages, best of {options['repeat']}:")
+        for payload, name, rate, baseline in results:
+            self.stdout.write(f"  {payload:<15} {name:<30} {rate:10.0f} pages/s  {rate / baseline:5.2f}x")
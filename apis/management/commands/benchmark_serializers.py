@@ -0,0 +1,34 @@
+import timeit
+from itertools import islice, cycle
+from django.core.management.base import BaseCommand, CommandError
+from vendor_models.models import PurchaseOrder
+from apis.fast_serializers import compiled_serializer
+from apis.serializers import PurchaseOrderSerializer, PurchaseOrderReadSerializer
+
+
+class Command(BaseCommand):
+    help = "Compares DRF serializers with their compiled equivalents on pages of stored purchase orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help="Rows per page; stored orders are repeated to fill it.")
+        parser.add_argument('--number', type=int, default=20, help="Pages serialized per timing.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timings taken; the best one is reported.")
+
+    def handle(self, *args, **options):
+        orders = PurchaseOrder.objects.order_by('-id')[:options['rows']]
+        if not orders:
+            raise CommandError("There are no purchase orders to serialize.")
+
+        def pages_per_second(serialize):
+            best = min(timeit.repeat(serialize, number=options['number'], repeat=options['repeat']))
+            return options['number'] / best
+
+        self.stdout.write(f"{options['rows']}-row purchase order pages, best of {options['repeat']}:")
+        for serializer_class in (PurchaseOrderSerializer, PurchaseOrderReadSerializer):
+            compiled = compiled_serializer(serializer_class)
+            instances = list(islice(cycle(orders), options['rows']))
+            rows = list(islice(cycle(compiled.project(orders)), options['rows']))
+            baseline = pages_per_second(lambda: serializer_class(instances, many=True).data)
+            rate = pages_per_second(lambda: compiled.serialize(rows))
+            name = serializer_class.__name__
+            self.stdout.write(f"  {name:<30} DRF {baseline:10.0f} pages/s  compiled {rate:10.0f} pages/s  {rate / baseline:5.2f}x")
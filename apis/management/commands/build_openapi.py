@@ -0,0 +1,24 @@
+import os
+import tempfile
+from django.core.management.base import BaseCommand, CommandError
+from apis.schema import api_docs_settings, build_schema
+
+
+class Command(BaseCommand):
+    help = "Writes the OpenAPI document of the API to API_DOCS['SCHEMA_FILE'] (or --output) for /openapi.json."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help="File to write, API_DOCS['SCHEMA_FILE'] when omitted.")
+        parser.add_argument('--url', help="Scheme and host the document advertises, e.g. https://api.example.com.")
+
+    def handle(self, *args, **options):
+        output = options['output'] or api_docs_settings()['SCHEMA_FILE']
+        if not output:
+            raise CommandError("No --output given and API_DOCS['SCHEMA_FILE'] is not set.")
+        content = build_schema(url=options['url'])
+        # Written next to the target and renamed, so a worker never reads a partial file.
+        directory = os.path.dirname(os.path.abspath(output))
+        with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as temporary:
+            temporary.write(content)
+        os.replace(temporary.name, output)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(content)} bytes to {output}"))
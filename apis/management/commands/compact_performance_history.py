@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from apis.performance_calculations import compact_performance_history, snapshot_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrites HistoricalPerformanceVendor into bucketed form: one snapshot per vendor per hour/day, "
+        "dropping snapshots whose values did not change."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bucket', choices=['hour', 'day'], default=None,
+            help="Bucket size. Defaults to VENDOR_PERFORMANCE_SNAPSHOTS['BUCKET'].",
+        )
+        parser.add_argument('--vendor', type=int, action='append', dest='vendor_ids', help="Only compact this vendor id (repeatable).")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Vendors compacted per transaction.")
+
+    def handle(self, *args, **options):
+        bucket = options['bucket'] or snapshot_settings()['BUCKET']
+        kept, deleted = compact_performance_history(bucket, vendor_ids=options['vendor_ids'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Kept {kept} snapshots, deleted {deleted}.'))
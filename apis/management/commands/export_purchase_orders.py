@@ -0,0 +1,39 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from vendor_models.models import PurchaseOrder
+from apis.serializers import PurchaseOrderExportQuerySerializer
+from apis.purchase_order_export import export_queryset, export_purchase_orders
+
+
+class Command(BaseCommand):
+    help = "Streams purchase orders to a file (or stdout) as NDJSON or CSV in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help="File to write, stdout when omitted.")
+        parser.add_argument('--format', choices=['ndjson', 'csv'], default='ndjson')
+        parser.add_argument('--gzip', action='store_true', help="Gzip the output.")
+        parser.add_argument('--buyer', type=int, help="Only orders placed by this buyer id.")
+        parser.add_argument('--vendor', type=int, help="Only orders received by this vendor id.")
+        parser.add_argument('--status', help="Only orders in this status.")
+        parser.add_argument('--from', dest='order_date_from', help="Only orders placed at or after this time (ISO 8601).")
+        parser.add_argument('--to', dest='order_date_to', help="Only orders placed before this time (ISO 8601).")
+
+    def handle(self, *args, **options):
+        names = ('buyer', 'vendor', 'status', 'order_date_from', 'order_date_to')
+        query = PurchaseOrderExportQuerySerializer(data={name: options[name] for name in names if options[name] is not None})
+        if not query.is_valid():
+            raise CommandError(query.errors)
+        filters = {name: value for name, value in query.validated_data.items() if name in names}
+
+        chunks = export_purchase_orders(
+            export_queryset(PurchaseOrder.objects.all(), filters), options['format'], options['gzip']
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            output = sys.stdout.buffer
+            for chunk in chunks:
+                output.write(chunk)
+            output.flush()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from apis.metric_counters import rebuild_vendor_counters
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the per-vendor metric counters from PurchaseOrder using grouped aggregates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendor', type=int, action='append', dest='vendor_ids', help="Only rebuild this vendor id (repeatable).")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Vendors aggregated and upserted per batch.")
+
+    def handle(self, *args, **options):
+        written = rebuild_vendor_counters(vendor_ids=options['vendor_ids'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt metric counters for {written} vendors.'))
@@ -0,0 +1,53 @@
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Max, Min
+from vendor_models.models import Vendor
+from apis.metric_counters import rebuild_vendor_metrics
+
+
+def _rebuild_range(min_id, max_id, chunk_size):
+    django.setup()
+    try:
+        return rebuild_vendor_metrics(min_id=min_id, max_id=max_id, chunk_size=chunk_size)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every vendor's performance metrics with grouped aggregates over PurchaseOrder, "
+        "writing them back with bulk_update and bulk-inserting the historical snapshots."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Vendors aggregated and written per batch.")
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help="Split the vendor id range across this many worker processes. Only useful on a database "
+                 "that accepts concurrent writers; SQLite serialises them.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        processes = max(options['processes'], 1)
+
+        if processes == 1:
+            rebuilt = rebuild_vendor_metrics(chunk_size=chunk_size)
+        else:
+            bounds = Vendor.objects.aggregate(low=Min('pk'), high=Max('pk'))
+            if bounds['low'] is None:
+                rebuilt = 0
+            else:
+                step = (bounds['high'] - bounds['low']) // processes + 1
+                ranges = [
+                    (start, min(start + step - 1, bounds['high']), chunk_size)
+                    for start in range(bounds['low'], bounds['high'] + 1, step)
+                ]
+                # Forked workers must not share the parent's database connections.
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=processes) as executor:
+                    rebuilt = sum(executor.map(_rebuild_range, *zip(*ranges)))
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt performance metrics for {rebuilt} vendors.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from vendor_models.models import Items
+from apis.inventory import set_stock_shards
+
+
+class Command(BaseCommand):
+    help = "Spreads an item's stock over N shard rows so concurrent orders contend less, or folds it back with --shards 0."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--item', type=int, required=True, help="Item id.")
+        parser.add_argument('--shards', type=int, required=True, help="Number of shards, 0 to keep the stock on the item row.")
+
+    def handle(self, *args, **options):
+        if not 0 <= options['shards'] <= 64:
+            raise CommandError('--shards must be between 0 and 64.')
+        try:
+            stock = set_stock_shards(options['item'], options['shards'])
+        except Items.DoesNotExist:
+            raise CommandError(f"Item {options['item']} does not exist.")
+        self.stdout.write(self.style.SUCCESS(f"Item {options['item']}: {stock} units in {options['shards']} shards."))
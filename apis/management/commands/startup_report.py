@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from apis.startup import measure_startup, STARTUP_BUDGET_SECONDS
+
+PROJECT_PACKAGES = ('apis', 'vendor_models', 'vendorproject')
+
+
+class Command(BaseCommand):
+    help = "Profiles the cold start of a fresh worker: import time per module and time to first response."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/apis/vendors/', help="Path of the first request.")
+        parser.add_argument('--top', type=int, default=15, help="Number of slowest imports to list.")
+        parser.add_argument('--without-docs', action='store_true', help="Profile a worker with API_DOCS_ENABLED=0.")
+        parser.add_argument(
+            '--budget', type=float, nargs='?', const=STARTUP_BUDGET_SECONDS,
+            help=f"Fail when setup plus first response takes longer (seconds, {STARTUP_BUDGET_SECONDS} without a value).",
+        )
+
+    def handle(self, *args, **options):
+        env = {'API_DOCS_ENABLED': '0'} if options['without_docs'] else None
+        try:
+            profile = measure_startup(options['path'], env)
+        except RuntimeError as e:
+            raise CommandError(f"Worker failed to start: {e}")
+
+        total = profile.setup + profile.first_response
+        self.stdout.write(f"Fresh worker, GET {options['path']} -> {profile.status}")
+        self.stdout.write(f"  setup           {profile.setup:.3f}s")
+        self.stdout.write(f"  first response  {profile.first_response:.3f}s")
+        self.stdout.write(f"  total           {total:.3f}s  (process wall {profile.wall:.3f}s)")
+
+        top_level = sorted((row for row in profile.imports if row.depth == 0), key=lambda row: -row.cumulative_us)
+        self.stdout.write(f"\nSlowest top-level imports (cumulative, {len(profile.imports)} modules imported):")
+        for row in top_level[:options['top']]:
+            self.stdout.write(f"  {row.cumulative_us / 1000:8.1f} ms  {row.module}")
+
+        project = sorted(
+            (row for row in profile.imports if row.module.split('.')[0] in PROJECT_PACKAGES),
+            key=lambda row: -row.cumulative_us,
+        )
+        self.stdout.write("\nProject modules (cumulative / self):")
+        for row in project[:options['top']]:
+            self.stdout.write(f"  {row.cumulative_us / 1000:8.1f} ms {row.self_us / 1000:8.1f} ms  {row.module}")
+
+        if options['budget'] is not None and total > options['budget']:
+            raise CommandError(f"Startup took {total:.3f}s, over the budget of {options['budget']:.3f}s.")
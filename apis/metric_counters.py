@@ -0,0 +1,532 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from vendor_models.models import (
+    Vendor, PurchaseOrder, VendorMetricCounters, VendorDailyMetricCounters, VendorRollingMetrics,
+    HistoricalPerformanceVendor,
+)
+from .performance_calculations import (
+    vendor_metric_aggregates, counts_from_aggregates, metrics_from_counts, save_vendor_metrics,
+    snapshot_settings, snapshot_bucket_start, latest_snapshots, plan_snapshot, METRIC_NAMES,
+    vendor_metrics_updated,
+)
+from .sketches import DDSketch
+
+
+# PurchaseOrder fields that feed the vendor KPIs
+METRIC_FIELDS = ('vendor_id', 'order_date', 'status', 'delivery_date', 'quality_rating', 'issue_date', 'acknowledgment_date')
+
+ROLLING_WINDOWS = tuple(days for days, _ in VendorRollingMetrics.WINDOW_CHOICES)
+
+# Vendor columns holding the derived KPIs
+VENDOR_METRIC_FIELDS = ['on_time_delivery_date', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
+
+COUNTER_FIELDS = (
+    'total_orders', 'completed_orders', 'on_time_orders',
+    'quality_rating_sum', 'acknowledged_orders', 'response_seconds_sum',
+)
+
+# Counter -> KPIs derived from it (see `metrics_from_counts`)
+COUNTER_METRICS = {
+    'total_orders': {'fulfillment_rate'},
+    'completed_orders': {'on_time_delivery_rate', 'quality_rating_avg', 'fulfillment_rate'},
+    'on_time_orders': {'on_time_delivery_rate'},
+    'quality_rating_sum': {'quality_rating_avg'},
+    'acknowledged_orders': {'average_response_time'},
+    'response_seconds_sum': {'average_response_time'},
+}
+
+
+def metric_state(purchase_order):
+    """
+    Snapshot of the KPI-relevant fields of a purchase order. Returns None when any of
+    them is deferred, so callers never trigger a lazy load.
+    """
+    values = purchase_order.__dict__
+    if any(field not in values for field in METRIC_FIELDS):
+        return None
+    return {field: values[field] for field in METRIC_FIELDS}
+
+
+def order_contribution(state):
+    """
+    What a single purchase order in `state` adds to its vendor's counters.
+    Mirrors the filters in `vendor_metric_aggregates`.
+    """
+    completed = state['status'] == 'completed'
+    acknowledgment_date = state['acknowledgment_date']
+    acknowledged = acknowledgment_date is not None
+    return {
+        'total_orders': 1,
+        'completed_orders': int(completed),
+        'on_time_orders': int(completed and state['delivery_date'] is not None),
+        'quality_rating_sum': (state['quality_rating'] or 0) if completed else 0,
+        'acknowledged_orders': int(acknowledged),
+        'response_seconds_sum': (acknowledgment_date - state['issue_date']).total_seconds() if acknowledged else 0,
+    }
+
+
+def order_day(state):
+    return timezone.localtime(state['order_date']).date()
+
+
+def response_seconds(state):
+    if state is None or state['acknowledgment_date'] is None:
+        return None
+    return (state['acknowledgment_date'] - state['issue_date']).total_seconds()
+
+
+def response_time_samples(changes):
+    """
+    Response times to remove from and add to the sketches, as `(seconds, count)` lists
+    keyed by `(vendor_id, order day)`. Orders whose response time did not change are
+    left out.
+    """
+    samples = defaultdict(list)
+    for old_state, new_state in changes:
+        old_seconds, new_seconds = response_seconds(old_state), response_seconds(new_state)
+        if old_seconds is not None and new_seconds is not None and old_seconds == new_seconds \
+                and old_state['vendor_id'] == new_state['vendor_id'] and order_day(old_state) == order_day(new_state):
+            continue
+        if old_seconds is not None:
+            samples[old_state['vendor_id'], order_day(old_state)].append((old_seconds, -1))
+        if new_seconds is not None:
+            samples[new_state['vendor_id'], order_day(new_state)].append((new_seconds, 1))
+    return samples
+
+
+def orders_sketch(orders):
+    """Response time sketch of the acknowledged orders in `orders`."""
+    sketch = DDSketch()
+    acknowledged = orders.filter(acknowledgment_date__isnull=False).order_by()
+    for state in acknowledged.values('issue_date', 'acknowledgment_date').iterator(chunk_size=2000):
+        sketch.add(response_seconds(state))
+    return sketch
+
+
+def update_response_time_sketch(counters, samples, orders):
+    """
+    Adds `samples` to the sketch stored on the single counters row matched by `counters`,
+    locking the row while it is rewritten. A row without a sketch (written before sketches
+    existed, or while the vendor had no acknowledged order) is given the sketch of
+    `orders`, the purchase orders it counts, which already reflect the samples.
+    """
+    with transaction.atomic():
+        row = counters.select_for_update().values_list('pk', 'response_time_sketch').first()
+        if row is None:
+            return
+        if row[1] is None:
+            sketch = orders_sketch(orders)
+        else:
+            sketch = DDSketch.from_bytes(row[1])
+            for seconds, count in samples:
+                sketch.add(seconds, count)
+        counters.model.objects.filter(pk=row[0]).update(response_time_sketch=sketch.to_bytes(), updated_at=timezone.now())
+
+
+def response_time_sketches(vendor_ids):
+    """
+    Lifetime and per-day response time sketches of `vendor_ids` built from one scan of
+    their acknowledged orders, keyed by vendor id and by `(vendor_id, day)`.
+    """
+    lifetime = {}
+    daily = {}
+    acknowledged = PurchaseOrder.objects.filter(vendor_id__in=vendor_ids, acknowledgment_date__isnull=False)
+    for state in acknowledged.order_by().values('vendor_id', 'order_date', 'issue_date', 'acknowledgment_date').iterator(chunk_size=2000):
+        seconds = response_seconds(state)
+        lifetime.setdefault(state['vendor_id'], DDSketch()).add(seconds)
+        daily.setdefault((state['vendor_id'], order_day(state)), DDSketch()).add(seconds)
+    return lifetime, daily
+
+
+def changed_metric_fields(old_state, new_state):
+    """
+    The METRIC_FIELDS whose value differs between two states; every field when either
+    side is None.
+    """
+    if old_state is None or new_state is None:
+        return set(METRIC_FIELDS)
+    return {field for field in METRIC_FIELDS if old_state[field] != new_state[field]}
+
+
+def affected_metrics(delta):
+    """
+    Names of the KPIs that a counter delta changes.
+    """
+    return set().union(*(COUNTER_METRICS[field] for field, value in delta.items() if value))
+
+
+def counter_deltas(changes, by_day=False):
+    """
+    Folds `(old_state, new_state)` pairs into counter deltas per vendor, or per
+    `(vendor_id, order day)` with `by_day`. Either side may be None for a created or
+    deleted order. Keys whose delta is all zero are left out.
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+    for old_state, new_state in changes:
+        for state, sign in ((old_state, -1), (new_state, 1)):
+            if state is None:
+                continue
+            key = (state['vendor_id'], order_day(state)) if by_day else state['vendor_id']
+            delta = deltas[key]
+            for field, value in order_contribution(state).items():
+                delta[field] += sign * value
+    return {
+        key: delta for key, delta in deltas.items()
+        if any(delta.values())
+    }
+
+
+def increments(delta):
+    return {field: F(field) + value for field, value in delta.items() if value}
+
+
+def apply_daily_delta(vendor_id, day, delta):
+    """
+    Adds `delta` to the vendor's counters for `day` and to every rolling window that
+    currently contains that day.
+    """
+    daily = VendorDailyMetricCounters.objects.filter(vendor_id=vendor_id, day=day)
+    if not daily.update(updated_at=timezone.now(), **increments(delta)):
+        try:
+            with transaction.atomic():
+                VendorDailyMetricCounters.objects.create(vendor_id=vendor_id, day=day, **delta)
+        except IntegrityError:
+            # Created concurrently; add to that row instead.
+            daily.update(updated_at=timezone.now(), **increments(delta))
+
+    VendorRollingMetrics.objects.filter(vendor_id=vendor_id, window_start__lte=day).update(
+        updated_at=timezone.now(),
+        **increments(delta)
+    )
+
+
+def apply_metric_changes(changes):
+    """
+    Applies the counter deltas of `(old_state, new_state)` pairs with atomic F() updates to
+    the lifetime, daily and rolling-window counters. Must run after the changed orders are
+    written. Returns `{vendor_id: names of the KPIs that changed}`; pairs that differ in no
+    metric field cost no query.
+    """
+    changes = [(old, new) for old, new in changes if changed_metric_fields(old, new)]
+    if not changes:
+        return {}
+    lifetime_deltas = counter_deltas(changes)
+    daily_deltas = counter_deltas(changes, by_day=True)
+    samples = response_time_samples(changes)
+    vendor_ids = set(lifetime_deltas).union(
+        vendor_id for vendor_id, _ in daily_deltas
+    ).union(vendor_id for vendor_id, _ in samples)
+
+    touched = {}
+    for vendor_id in vendor_ids:
+        # Moving an order to another day changes the daily counters but no lifetime KPI.
+        delta = lifetime_deltas.get(vendor_id)
+        if delta:
+            touched[vendor_id] = affected_metrics(delta)
+            updated = VendorMetricCounters.objects.filter(vendor_id=vendor_id).update(
+                updated_at=timezone.now(),
+                **increments(delta)
+            )
+            if not updated:
+                # First change seen for this vendor: seed every counter from PurchaseOrder,
+                # which already reflects the change, instead of applying the delta.
+                rebuild_vendor_counters([vendor_id])
+                touched[vendor_id] = set(METRIC_NAMES)
+                continue
+        for (day_vendor_id, day), day_delta in daily_deltas.items():
+            if day_vendor_id == vendor_id:
+                apply_daily_delta(vendor_id, day, day_delta)
+
+        vendor_samples = {day: day_samples for (day_vendor_id, day), day_samples in samples.items() if day_vendor_id == vendor_id}
+        if vendor_samples:
+            orders = PurchaseOrder.objects.filter(vendor_id=vendor_id)
+            update_response_time_sketch(
+                VendorMetricCounters.objects.filter(vendor_id=vendor_id),
+                [sample for day_samples in vendor_samples.values() for sample in day_samples],
+                orders,
+            )
+            for day, day_samples in vendor_samples.items():
+                update_response_time_sketch(
+                    VendorDailyMetricCounters.objects.filter(vendor_id=vendor_id, day=day), day_samples,
+                    orders.filter(order_date__date=day),
+                )
+    return touched
+
+
+def refresh_vendor_metrics(vendor, metrics=None):
+    """
+    Recomputes a vendor's KPIs from its running counters in constant time. `vendor` may be
+    an instance or a primary key; `metrics` limits the KPIs written back to the vendor.
+    """
+    vendor_id = vendor.pk if isinstance(vendor, Vendor) else vendor
+    counters = VendorMetricCounters.objects.filter(vendor_id=vendor_id).values(*COUNTER_FIELDS).first()
+    if counters is None:
+        rebuild_vendor_counters([vendor_id])
+        counters = VendorMetricCounters.objects.filter(vendor_id=vendor_id).values(*COUNTER_FIELDS).get()
+        metrics = None
+    save_vendor_metrics(vendor, metrics_from_counts(counters), metrics)
+
+
+def grouped_vendor_counts(vendor_ids):
+    """
+    Counts for every vendor in `vendor_ids` from one grouped aggregate over PurchaseOrder.
+    Vendors without orders get zero counts.
+    """
+    grouped = (
+        PurchaseOrder.objects.filter(vendor_id__in=vendor_ids)
+        .order_by()
+        .values('vendor_id')
+        .annotate(**vendor_metric_aggregates())
+    )
+    counts = {row['vendor_id']: counts_from_aggregates(row) for row in grouped}
+    return {
+        vendor_id: counts.get(vendor_id) or dict.fromkeys(COUNTER_FIELDS, 0)
+        for vendor_id in vendor_ids
+    }
+
+
+def upsert_vendor_counters(counts_by_vendor, sketches):
+    now = timezone.now()
+    VendorMetricCounters.objects.bulk_create(
+        [
+            VendorMetricCounters(
+                vendor_id=vendor_id,
+                created_at=now,
+                updated_at=now,
+                response_time_sketch=sketches[vendor_id].to_bytes() if vendor_id in sketches else None,
+                **counts
+            )
+            for vendor_id, counts in counts_by_vendor.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['vendor'],
+        update_fields=list(COUNTER_FIELDS) + ['response_time_sketch', 'updated_at'],
+    )
+
+
+def vendor_id_chunks(vendor_ids=None, min_id=None, max_id=None, chunk_size=1000):
+    vendors = Vendor.objects.order_by('pk').values_list('pk', flat=True)
+    if vendor_ids is not None:
+        vendors = vendors.filter(pk__in=vendor_ids)
+    if min_id is not None:
+        vendors = vendors.filter(pk__gte=min_id)
+    if max_id is not None:
+        vendors = vendors.filter(pk__lte=max_id)
+
+    vendor_ids = list(vendors)
+    for start in range(0, len(vendor_ids), chunk_size):
+        yield vendor_ids[start:start + chunk_size]
+
+
+def rebuild_window_counters(vendor_ids, daily_sketches, today=None):
+    """
+    Rebuilds the daily and rolling-window counters of `vendor_ids` from one aggregate over
+    PurchaseOrder grouped by vendor and order day. `daily_sketches` are the response time
+    sketches per `(vendor_id, day)` from `response_time_sketches`.
+    """
+    today = today or timezone.localdate()
+    grouped = (
+        PurchaseOrder.objects.filter(vendor_id__in=vendor_ids)
+        .annotate(day=TruncDate('order_date'))
+        .order_by()
+        .values('vendor_id', 'day')
+        .annotate(**vendor_metric_aggregates())
+    )
+    now = timezone.now()
+    daily = []
+    rolling = {
+        (vendor_id, window): dict.fromkeys(COUNTER_FIELDS, 0)
+        for vendor_id in vendor_ids for window in ROLLING_WINDOWS
+    }
+    for row in grouped.iterator(chunk_size=2000):
+        counts = counts_from_aggregates(row)
+        sketch = daily_sketches.get((row['vendor_id'], row['day']))
+        daily.append(VendorDailyMetricCounters(
+            vendor_id=row['vendor_id'], day=row['day'], created_at=now, updated_at=now,
+            response_time_sketch=sketch.to_bytes() if sketch else None, **counts
+        ))
+        for window in ROLLING_WINDOWS:
+            if row['day'] >= today - timedelta(days=window - 1):
+                totals = rolling[row['vendor_id'], window]
+                for field in COUNTER_FIELDS:
+                    totals[field] += counts[field]
+
+    VendorDailyMetricCounters.objects.filter(vendor_id__in=vendor_ids).delete()
+    VendorDailyMetricCounters.objects.bulk_create(daily, batch_size=1000)
+    VendorRollingMetrics.objects.bulk_create(
+        [
+            VendorRollingMetrics(
+                vendor_id=vendor_id,
+                window_days=window,
+                window_start=today - timedelta(days=window - 1),
+                created_at=now,
+                updated_at=now,
+                **counts
+            )
+            for (vendor_id, window), counts in rolling.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['vendor', 'window_days'],
+        update_fields=list(COUNTER_FIELDS) + ['window_start', 'updated_at'],
+        batch_size=1000,
+    )
+
+
+def rebuild_vendor_counters(vendor_ids=None, chunk_size=1000):
+    """
+    Recomputes the lifetime, daily and rolling-window counters from PurchaseOrder with
+    grouped aggregates per chunk of vendors and upserts them in bulk. Returns the number
+    of vendors rebuilt.
+    """
+    written = 0
+    for chunk in vendor_id_chunks(vendor_ids, chunk_size=chunk_size):
+        counts_by_vendor = grouped_vendor_counts(chunk)
+        lifetime_sketches, daily_sketches = response_time_sketches(chunk)
+        with transaction.atomic():
+            upsert_vendor_counters(counts_by_vendor, lifetime_sketches)
+            rebuild_window_counters(chunk, daily_sketches)
+        written += len(counts_by_vendor)
+    return written
+
+
+def advance_rolling_windows(vendor_ids=None, windows=ROLLING_WINDOWS, today=None, chunk_size=500):
+    """
+    Moves stale rolling windows forward to end at `today` by subtracting the daily
+    counters of the days that left the window, without rescanning PurchaseOrder.
+    Returns the number of windows moved.
+    """
+    today = today or timezone.localdate()
+    moved = 0
+    for window in windows:
+        new_start = today - timedelta(days=window - 1)
+        stale = VendorRollingMetrics.objects.filter(window_days=window, window_start__lt=new_start)
+        if vendor_ids is not None:
+            stale = stale.filter(vendor_id__in=vendor_ids)
+
+        by_start = defaultdict(list)
+        for vendor_id, window_start in stale.values_list('vendor_id', 'window_start').iterator():
+            by_start[window_start].append(vendor_id)
+
+        for window_start, stale_vendor_ids in by_start.items():
+            for offset in range(0, len(stale_vendor_ids), chunk_size):
+                chunk = stale_vendor_ids[offset:offset + chunk_size]
+                leaving = {
+                    row['vendor_id']: row
+                    for row in VendorDailyMetricCounters.objects.filter(
+                        vendor_id__in=chunk, day__gte=window_start, day__lt=new_start
+                    ).order_by().values('vendor_id').annotate(**{field: Sum(field) for field in COUNTER_FIELDS})
+                }
+                with transaction.atomic():
+                    for vendor_id in chunk:
+                        left = leaving.get(vendor_id, {})
+                        moved += VendorRollingMetrics.objects.filter(
+                            vendor_id=vendor_id, window_days=window, window_start=window_start
+                        ).update(
+                            window_start=new_start,
+                            updated_at=timezone.now(),
+                            **{field: F(field) - left[field] for field in COUNTER_FIELDS if left.get(field)}
+                        )
+    return moved
+
+
+def rolling_vendor_metrics(vendor_ids, window, today=None):
+    """
+    KPIs of each vendor in `vendor_ids` over the last `window` days, keyed by vendor id.
+    Stale windows are moved forward first and missing ones are built on demand.
+    """
+    vendor_ids = list(vendor_ids)
+    advance_rolling_windows(vendor_ids, windows=[window], today=today)
+    rows = {
+        row['vendor_id']: row
+        for row in VendorRollingMetrics.objects.filter(vendor_id__in=vendor_ids, window_days=window)
+        .values('vendor_id', *COUNTER_FIELDS)
+    }
+    missing = [vendor_id for vendor_id in vendor_ids if vendor_id not in rows]
+    if missing:
+        rebuild_vendor_counters(missing)
+        rows.update({
+            row['vendor_id']: row
+            for row in VendorRollingMetrics.objects.filter(vendor_id__in=missing, window_days=window)
+            .values('vendor_id', *COUNTER_FIELDS)
+        })
+    return {vendor_id: metrics_from_counts(rows[vendor_id]) for vendor_id in vendor_ids if vendor_id in rows}
+
+
+RESPONSE_TIME_PERCENTILES = {'p50': 0.5, 'p95': 0.95, 'p99': 0.99}
+
+
+def response_time_percentiles(vendor_id, window=None, today=None):
+    """
+    p50/p95/p99 response times of a vendor in hours, read from the lifetime sketch or,
+    with `window`, from the merged daily sketches of the last `window` days. Values are
+    None when the vendor has no acknowledged orders.
+    """
+    if window:
+        today = today or timezone.localdate()
+        blobs = VendorDailyMetricCounters.objects.filter(
+            vendor_id=vendor_id, day__gte=today - timedelta(days=window - 1), response_time_sketch__isnull=False
+        ).values_list('response_time_sketch', flat=True)
+    else:
+        blobs = VendorMetricCounters.objects.filter(
+            vendor_id=vendor_id, response_time_sketch__isnull=False
+        ).values_list('response_time_sketch', flat=True)
+
+    sketch = DDSketch()
+    for blob in blobs:
+        sketch.merge(DDSketch.from_bytes(blob))
+    percentiles = {}
+    for name, q in RESPONSE_TIME_PERCENTILES.items():
+        seconds = sketch.quantile(q)
+        percentiles[name] = None if seconds is None else seconds / 3600
+    return percentiles
+
+
+def rebuild_vendor_metrics(vendor_ids=None, min_id=None, max_id=None, chunk_size=1000):
+    """
+    Recomputes the KPIs of many vendors at once. Each chunk costs one grouped aggregate,
+    a scan of the acknowledged orders for the response time sketches, a lookup of the
+    latest snapshots, a counters upsert, a chunked `bulk_update` of Vendor and bulk
+    writes of the snapshots the snapshot policy asks for. Returns the number of vendors
+    rebuilt.
+    """
+    policy = snapshot_settings()
+    written = 0
+    for chunk in vendor_id_chunks(vendor_ids, min_id, max_id, chunk_size):
+        counts_by_vendor = grouped_vendor_counts(chunk)
+        lifetime_sketches, daily_sketches = response_time_sketches(chunk)
+        latest = latest_snapshots(chunk)
+        now = timezone.now()
+        date = snapshot_bucket_start(now, policy['BUCKET'])
+        vendors = []
+        new_snapshots = []
+        updated_snapshots = []
+        metrics_by_vendor = {}
+        for vendor_id, counts in counts_by_vendor.items():
+            metrics = metrics_by_vendor[vendor_id] = metrics_from_counts(counts)
+            vendors.append(Vendor(
+                pk=vendor_id,
+                on_time_delivery_date=metrics['on_time_delivery_rate'],
+                quality_rating_avg=metrics['quality_rating_avg'],
+                average_response_time=metrics['average_response_time'],
+                fulfillment_rate=metrics['fulfillment_rate'],
+                updated_at=now,
+            ))
+            action = plan_snapshot(latest.get(vendor_id), metrics, date, policy)
+            if action == 'create':
+                new_snapshots.append(HistoricalPerformanceVendor(vendor_id=vendor_id, date=date, **metrics))
+            elif action == 'update':
+                updated_snapshots.append(HistoricalPerformanceVendor(pk=latest[vendor_id]['id'], updated_at=now, **metrics))
+
+        with transaction.atomic():
+            upsert_vendor_counters(counts_by_vendor, lifetime_sketches)
+            rebuild_window_counters(chunk, daily_sketches)
+            Vendor.objects.bulk_update(vendors, VENDOR_METRIC_FIELDS + ['updated_at'])
+            HistoricalPerformanceVendor.objects.bulk_create(new_snapshots)
+            HistoricalPerformanceVendor.objects.bulk_update(updated_snapshots, [*METRIC_NAMES, 'updated_at'])
+        vendor_metrics_updated.send(sender=Vendor, metrics=metrics_by_vendor)
+        written += len(vendors)
+    return written
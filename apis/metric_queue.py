@@ -0,0 +1,152 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from vendor_models.models import Vendor
+from .metric_counters import refresh_vendor_metrics
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_QUEUE_SETTINGS = {
+    'ENABLED': True,
+    'DEBOUNCE_SECONDS': 2.0,
+    'WORKERS': 2,
+}
+
+
+def queue_settings():
+    return {**DEFAULT_QUEUE_SETTINGS, **getattr(settings, 'VENDOR_METRICS_QUEUE', {})}
+
+
+class CoalescingQueue:
+    """
+    Runs `job(key, scope)` on a thread pool at most once per debounce window for each key.
+
+    Scheduling a key that is already pending only widens its scope, so a burst of requests
+    for the same vendor collapses into a single run once the window (counted from the
+    first request) has elapsed. `scope` is the union of the sets passed to `schedule`, or
+    None once any request asked for everything. A key is never run concurrently with
+    itself; requests arriving while it runs are picked up by one follow-up run.
+    """
+
+    def __init__(self, job, debounce_seconds, workers):
+        self.job = job
+        self.debounce_seconds = debounce_seconds
+        self.workers = workers
+        self._pending = {}
+        self._scopes = {}
+        self._running = set()
+        self._condition = threading.Condition()
+        self._executor = None
+        self._dispatcher = None
+
+    def schedule(self, key, scope=None):
+        with self._condition:
+            if key not in self._pending:
+                self._pending[key] = time.monotonic() + self.debounce_seconds
+                self._scopes[key] = None if scope is None else set(scope)
+            elif scope is None or self._scopes[key] is None:
+                self._scopes[key] = None
+            else:
+                self._scopes[key] |= set(scope)
+            self._start()
+            self._condition.notify()
+
+    def pending(self):
+        with self._condition:
+            return set(self._pending)
+
+    def flush(self):
+        """
+        Runs every pending job in the calling thread, ignoring the debounce window.
+        """
+        with self._condition:
+            keys = [key for key in self._pending if key not in self._running]
+            jobs = []
+            for key in keys:
+                del self._pending[key]
+                jobs.append((key, self._scopes.pop(key)))
+                self._running.add(key)
+        for key, scope in jobs:
+            self._run(key, scope)
+
+    def _start(self):
+        if self._dispatcher is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='vendor-metrics')
+            self._dispatcher = threading.Thread(target=self._dispatch, name='vendor-metrics-dispatcher', daemon=True)
+            self._dispatcher.start()
+
+    def _dispatch(self):
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                due = [key for key, at in self._pending.items() if at <= now and key not in self._running]
+                jobs = []
+                for key in due:
+                    del self._pending[key]
+                    jobs.append((key, self._scopes.pop(key)))
+                    self._running.add(key)
+                if not due:
+                    waiting = [at for key, at in self._pending.items() if key not in self._running]
+                    self._condition.wait(timeout=max(min(waiting) - now, 0) if waiting else None)
+                    continue
+            for key, scope in jobs:
+                self._executor.submit(self._run, key, scope)
+
+    def _run(self, key, scope):
+        try:
+            self.job(key, scope)
+        except Exception:
+            logger.exception('vendor metrics job failed for %s', key)
+        finally:
+            with self._condition:
+                self._running.discard(key)
+                self._condition.notify()
+
+
+def _refresh_vendor_metrics(vendor_id, metrics):
+    close_old_connections()
+    try:
+        if Vendor.objects.filter(pk=vendor_id).exists():
+            refresh_vendor_metrics(vendor_id, metrics)
+    finally:
+        close_old_connections()
+
+
+_queue = None
+_queue_pid = None
+_queue_lock = threading.Lock()
+
+
+def get_metric_queue():
+    global _queue, _queue_pid
+    with _queue_lock:
+        # A forked worker does not inherit the parent's threads, so it gets its own queue.
+        if _queue is None or _queue_pid != os.getpid():
+            config = queue_settings()
+            _queue = CoalescingQueue(_refresh_vendor_metrics, config['DEBOUNCE_SECONDS'], config['WORKERS'])
+            _queue_pid = os.getpid()
+        return _queue
+
+
+def enqueue_vendor_metrics(vendor_id, metrics=None):
+    """
+    Requests a recomputation of a vendor's KPIs, or only of the names in `metrics`. With
+    the queue enabled it runs on a worker thread after the current transaction commits,
+    coalesced per vendor; otherwise it runs inline.
+    """
+    if not queue_settings()['ENABLED']:
+        refresh_vendor_metrics(vendor_id, metrics)
+        return
+    transaction.on_commit(lambda: get_metric_queue().schedule(vendor_id, metrics))
+
+
+@atexit.register
+def _flush_on_exit():
+    if _queue is not None and _queue_pid == os.getpid():
+        _queue.flush()
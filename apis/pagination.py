@@ -0,0 +1,115 @@
+import base64
+import json
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks past the last row of the previous page instead of
+    counting and skipping rows, so every page costs the same however deep it is.
+
+    `ordering` lists the columns the rows are sorted by, with a unique column (the
+    primary key) last. The `cursor` query parameter is an opaque token holding the
+    ordering values of the last row served; responses carry no total count.
+    """
+    page_size = 4
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+        self.position = None
+        self.next_position = None
+        self.request = None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def encode_cursor(self, values):
+        # isoformat() keeps the microseconds that DjangoJSONEncoder would round away,
+        # which would skip rows sharing the same millisecond.
+        data = json.dumps(values, default=lambda value: value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, model, token):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(token.encode()))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except Exception:
+            # Malformed base64/JSON, wrong arity or values the columns do not accept
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor.'})
+
+    def after(self, position):
+        """
+        Rows that sort after `position`, as a lexicographic comparison over `ordering`.
+        """
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            step = Q(**{f"{name}__{'lt' if field.startswith('-') else 'gt'}": position[index]})
+            for earlier, value in zip(self.ordering[:index], position):
+                step &= Q(**{earlier.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        token = request.query_params.get(self.cursor_query_param)
+        self.position = self.decode_cursor(queryset.model, token) if token else None
+
+        queryset = queryset.order_by(*self.ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.after(self.position))
+        page_size = self.get_page_size(request)
+        rows = list(queryset[:page_size + 1])
+
+        page = rows[:page_size]
+        self.next_position = None
+        if len(rows) > page_size:
+            last = page[-1]
+            self.next_position = [getattr(last, field.lstrip('-')) for field in self.ordering]
+        return page
+
+    def at_start(self):
+        return self.position is None
+
+    def validator_parts(self):
+        # What a page's response holds besides its rows
+        return (self.next_position,)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+def list_pagination(request, default, ordering):
+    """
+    The paginator for a list endpoint: keyset pagination over `ordering` when the
+    client opts in with `?pagination=cursor` (or sends a cursor), else `default()`.
+    """
+    if request.query_params.get('pagination') == 'cursor' or request.query_params.get('cursor'):
+        return KeysetPagination(ordering)
+    return default()
@@ -1,57 +1,302 @@
-from django.db.models import F, Avg, Sum, Count, DurationField
+import math
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Avg, Sum, Count, Min, Max, DurationField, Window
+from django.db.models.functions import RowNumber, Trunc
+from django.dispatch import Signal
 from django.utils import timezone
 from vendor_models.models import Vendor, PurchaseOrder, HistoricalPerformanceVendor
+from .response_cache import invalidate_vendor_responses
+
+
+def vendor_metric_aggregates():
+    """
+    Conditional aggregates that compute every KPI input in a single pass over a
+    vendor's purchase orders. Used by `compute_vendor_metrics` and by anything
+    that needs the same numbers grouped per vendor.
+    """
+    completed = Q(status='completed')
+    acknowledged = Q(acknowledgment_date__isnull=False)
+    return {
+        'total_orders': Count('id'),
+        'completed_orders': Count('id', filter=completed),
+        'on_time_orders': Count('id', filter=completed & Q(delivery_date__lte=F('delivery_date'))),
+        'quality_rating_sum': Sum('quality_rating', filter=completed),
+        'acknowledged_orders': Count('id', filter=acknowledged),
+        'response_time_sum': Sum(
+            F('acknowledgment_date') - F('issue_date'),
+            filter=acknowledged,
+            output_field=DurationField(),
+        ),
+    }
+
+
+def counts_from_aggregates(totals):
+    """
+    Normalises a row produced by `vendor_metric_aggregates` into the field names used by
+    `PurchaseOrderMetricCounters`, so aggregates and running counters are interchangeable.
+    """
+    response_time_sum = totals['response_time_sum']
+    return {
+        'total_orders': totals['total_orders'] or 0,
+        'completed_orders': totals['completed_orders'] or 0,
+        'on_time_orders': totals['on_time_orders'] or 0,
+        'quality_rating_sum': totals['quality_rating_sum'] or 0,
+        'acknowledged_orders': totals['acknowledged_orders'] or 0,
+        'response_seconds_sum': response_time_sum.total_seconds() if response_time_sum else 0,
+    }
+
+
+def metrics_from_counts(counts):
+    """
+    Turns order counts/sums into the four vendor KPIs. Rates are percentages, response
+    time is in hours.
+    """
+    total_orders = counts['total_orders']
+    completed_orders = counts['completed_orders']
+    acknowledged_orders = counts['acknowledged_orders']
+
+    return {
+        'on_time_delivery_rate': (counts['on_time_orders'] / completed_orders) * 100 if completed_orders > 0 else 0.0,
+        'quality_rating_avg': counts['quality_rating_sum'] / completed_orders if completed_orders > 0 else 0.0,
+        'average_response_time': (counts['response_seconds_sum'] / acknowledged_orders) / 3600 if acknowledged_orders > 0 else 0.0,  # Convert to hours
+        'fulfillment_rate': (completed_orders / total_orders) * 100 if total_orders > 0 else 0.0,
+    }
+
+
+def vendor_order_counts(vendor):
+    totals = PurchaseOrder.objects.filter(vendor=vendor).aggregate(**vendor_metric_aggregates())
+    return counts_from_aggregates(totals)
+
+
+def compute_vendor_metrics(vendor):
+    return metrics_from_counts(vendor_order_counts(vendor))
+
 
 def calculate_on_time_delivery_rate(vendor):
-    completed_orders = PurchaseOrder.objects.filter(vendor=vendor, status='completed')
-    on_time_deliveries = completed_orders.filter(delivery_date__lte=F('delivery_date')).count()
-    total_completed_orders = completed_orders.count()
-    
-    on_time_delivery_rate = (on_time_deliveries / total_completed_orders) * 100 if total_completed_orders > 0 else 0
-    return on_time_delivery_rate
+    return compute_vendor_metrics(vendor)['on_time_delivery_rate']
 
 def calculate_quality_rating_avg(vendor):
-    completed_orders = PurchaseOrder.objects.filter(vendor=vendor, status='completed')
-    total_quality_ratings = completed_orders.aggregate(total=Sum('quality_rating'))['total'] or 0
-    total_completed_orders = completed_orders.count()
-    
-    quality_rating_avg = total_quality_ratings / total_completed_orders if total_completed_orders > 0 else 0
-    return quality_rating_avg
+    return compute_vendor_metrics(vendor)['quality_rating_avg']
 
 def calculate_average_response_time(vendor):
-    acknowledged_orders = PurchaseOrder.objects.filter(vendor=vendor).exclude(acknowledgment_date__isnull=True)
-    total_response_time_seconds = acknowledged_orders.aggregate(
-        total=Sum(F('acknowledgment_date') - F('issue_date'), output_field=DurationField())
-    )['total'].total_seconds() if acknowledged_orders.exists() else 0
-    average_response_time_seconds = total_response_time_seconds / acknowledged_orders.count() if acknowledged_orders.exists() else 0
-    average_response_time_hours = average_response_time_seconds / 3600  # Convert to hours
-    return average_response_time_hours
+    return compute_vendor_metrics(vendor)['average_response_time']
 
 def calculate_fulfillment_rate(vendor):
-    total_orders = PurchaseOrder.objects.filter(vendor=vendor).count()
-    fulfilled_orders = PurchaseOrder.objects.filter(vendor=vendor, status='completed').count()
-    
-    fulfillment_rate = (fulfilled_orders / total_orders) * 100 if total_orders > 0 else 0
-    return fulfillment_rate
+    return compute_vendor_metrics(vendor)['fulfillment_rate']
+
+
+# Sent after vendor KPIs are written, with `metrics={vendor_id: {metric: value}}`.
+vendor_metrics_updated = Signal()
+
+
+# KPI name -> Vendor column holding it
+VENDOR_METRIC_COLUMNS = {
+    'on_time_delivery_rate': 'on_time_delivery_date',
+    'quality_rating_avg': 'quality_rating_avg',
+    'average_response_time': 'average_response_time',
+    'fulfillment_rate': 'fulfillment_rate',
+}
+
+
+def save_vendor_metrics(vendor, metrics, changed=None):
+    """
+    Writes computed KPIs onto the vendor row and records a historical snapshot. `vendor`
+    may be an instance or a primary key. Only the KPIs named in `changed` are written to
+    the vendor when it is given; the snapshot always holds all of them.
+    """
+    vendor_id = vendor.pk if isinstance(vendor, Vendor) else vendor
+    names = [name for name in VENDOR_METRIC_COLUMNS if changed is None or name in changed]
+    values = {VENDOR_METRIC_COLUMNS[name]: metrics[name] for name in names}
+    values['updated_at'] = timezone.now()
+    Vendor.objects.filter(pk=vendor_id).update(**values)
+    if isinstance(vendor, Vendor):
+        for field, value in values.items():
+            setattr(vendor, field, value)
+
+    record_performance_snapshot(vendor_id, metrics)
+    vendor_metrics_updated.send(sender=Vendor, metrics={vendor_id: {name: metrics[name] for name in names}})
+
 
 def update_vendor_metrics(vendor):
-    on_time_delivery_rate = calculate_on_time_delivery_rate(vendor)
-    quality_rating_avg = calculate_quality_rating_avg(vendor)
-    average_response_time = calculate_average_response_time(vendor)
-    fulfillment_rate = calculate_fulfillment_rate(vendor)
-    
-    vendor.on_time_delivery_rate = on_time_delivery_rate
-    vendor.quality_rating_avg = quality_rating_avg
-    vendor.average_response_time = average_response_time
-    vendor.fulfillment_rate = fulfillment_rate
-    vendor.save()
-
-    
-    HistoricalPerformanceVendor.objects.create(
-        vendor=vendor,
-        date=timezone.now(),
-        on_time_delivery_rate=on_time_delivery_rate,
-        quality_rating_avg=quality_rating_avg,
-        average_response_time=average_response_time,
-        fulfillment_rate=fulfillment_rate
+    save_vendor_metrics(vendor, compute_vendor_metrics(vendor))
+
+
+################################  HISTORICAL SNAPSHOTS  ################################
+
+METRIC_NAMES = ('on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate')
+
+DEFAULT_SNAPSHOT_SETTINGS = {
+    'BUCKET': 'hour',
+    'SKIP_UNCHANGED': True,
+}
+
+SNAPSHOT_BUCKETS = (None, 'hour', 'day')
+
+
+def snapshot_settings():
+    return {**DEFAULT_SNAPSHOT_SETTINGS, **getattr(settings, 'VENDOR_PERFORMANCE_SNAPSHOTS', {})}
+
+
+def snapshot_bucket_start(moment, bucket):
+    """
+    Start of the bucket `moment` falls in. Day buckets follow the project time zone.
+    """
+    if bucket is None:
+        return moment
+    if bucket == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if bucket == 'day':
+        return timezone.localtime(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f'Unknown snapshot bucket {bucket!r}, expected one of {SNAPSHOT_BUCKETS}.')
+
+
+def metrics_unchanged(snapshot, metrics):
+    return all(
+        math.isclose(snapshot[name], metrics[name], rel_tol=1e-9, abs_tol=1e-9)
+        for name in METRIC_NAMES
+    )
+
+
+def plan_snapshot(latest, metrics, date, policy):
+    """
+    Decides what recording `metrics` at `date` means given the vendor's latest snapshot
+    row (a dict with `date` and the metric values, or None): 'skip', 'update' the
+    latest row in place, or 'create' a new one.
+    """
+    if latest is not None:
+        if policy['SKIP_UNCHANGED'] and metrics_unchanged(latest, metrics):
+            return 'skip'
+        if policy['BUCKET'] is not None and latest['date'] == date:
+            return 'update'
+    return 'create'
+
+
+def latest_snapshots(vendor_ids):
+    """
+    The most recent snapshot of each vendor in `vendor_ids`, keyed by vendor id.
+    """
+    rows = (
+        HistoricalPerformanceVendor.objects.filter(vendor_id__in=vendor_ids)
+        .annotate(row_number=Window(RowNumber(), partition_by=[F('vendor_id')], order_by=F('date').desc()))
+        .filter(row_number=1)
+        .values('id', 'vendor_id', 'date', *METRIC_NAMES)
+    )
+    return {row['vendor_id']: row for row in rows}
+
+
+def record_performance_snapshot(vendor_id, metrics, now=None):
+    """
+    Records a historical snapshot following VENDOR_PERFORMANCE_SNAPSHOTS: unchanged values
+    are not written again and, with a BUCKET set, every change inside one hour/day
+    upserts the single row of that bucket.
+    """
+    policy = snapshot_settings()
+    date = snapshot_bucket_start(now or timezone.now(), policy['BUCKET'])
+    latest = (
+        HistoricalPerformanceVendor.objects.filter(vendor_id=vendor_id)
+        .order_by('-date')
+        .values('id', 'date', *METRIC_NAMES)
+        .first()
+    )
+    action = plan_snapshot(latest, metrics, date, policy)
+    if action == 'update':
+        HistoricalPerformanceVendor.objects.filter(pk=latest['id']).update(updated_at=timezone.now(), **metrics)
+    elif action == 'create':
+        HistoricalPerformanceVendor.objects.create(vendor_id=vendor_id, date=date, **metrics)
+    return action
+
+
+HISTORY_BUCKETS = ('hour', 'day', 'week')
+
+
+def performance_history_series(vendor_id, start, end, bucket):
+    """
+    Min/max/avg of every metric per `bucket` between `start` and `end`, aggregated in the
+    database from one range scan over the (vendor, date) index. Returns a list of
+    `{'bucket': datetime, '<metric>': {'min', 'max', 'avg'}}` ordered by bucket.
+    """
+    aggregates = {}
+    for name in METRIC_NAMES:
+        aggregates[f'{name}__min'] = Min(name)
+        aggregates[f'{name}__max'] = Max(name)
+        aggregates[f'{name}__avg'] = Avg(name)
+
+    rows = (
+        HistoricalPerformanceVendor.objects.filter(vendor_id=vendor_id, date__gte=start, date__lt=end)
+        .annotate(bucket=Trunc('date', bucket))
+        .order_by('bucket')
+        .values('bucket')
+        .annotate(samples=Count('id'), **aggregates)
     )
+    return [
+        {
+            'bucket': row['bucket'],
+            'samples': row['samples'],
+            **{
+                name: {stat: row[f'{name}__{stat}'] for stat in ('min', 'max', 'avg')}
+                for name in METRIC_NAMES
+            },
+        }
+        for row in rows
+    ]
+
+
+def compact_performance_history(bucket, vendor_ids=None, chunk_size=500):
+    """
+    Rewrites existing snapshots into `bucket` form: within each bucket only the last
+    snapshot survives, dated at the bucket start, and a snapshot equal to the one kept
+    before it is dropped when SKIP_UNCHANGED is on. Vendors whose history changed get a
+    new `updated_at` and lose their cached responses. Returns (kept, deleted) counts.
+    """
+    policy = {**snapshot_settings(), 'BUCKET': bucket}
+    vendors = Vendor.objects.order_by('pk').values_list('pk', flat=True)
+    if vendor_ids is not None:
+        vendors = vendors.filter(pk__in=vendor_ids)
+    vendor_ids = list(vendors)
+
+    kept = deleted = 0
+    for start in range(0, len(vendor_ids), chunk_size):
+        chunk = vendor_ids[start:start + chunk_size]
+        rows = (
+            HistoricalPerformanceVendor.objects.filter(vendor_id__in=chunk, date__isnull=False)
+            .order_by('vendor_id', 'date', 'id')
+            .values('id', 'vendor_id', 'date', *METRIC_NAMES)
+            .iterator(chunk_size=2000)
+        )
+        survivors = {}
+        latest = {}
+        drop = []
+        changed = set()
+        for row in rows:
+            vendor_id = row['vendor_id']
+            date = snapshot_bucket_start(row['date'], bucket)
+            action = plan_snapshot(latest.get(vendor_id), row, date, policy)
+            if action == 'create':
+                survivor = {**row, 'date': date}
+                survivors[row['id']] = survivor
+                latest[vendor_id] = survivor
+                if date != row['date']:
+                    changed.add(vendor_id)
+                continue
+            drop.append(row['id'])
+            changed.add(vendor_id)
+            if action == 'update':
+                # The later row in the bucket wins; keep the earlier id, take the later values.
+                latest[vendor_id].update({name: row[name] for name in METRIC_NAMES})
+
+        with transaction.atomic():
+            HistoricalPerformanceVendor.objects.bulk_update(
+                [HistoricalPerformanceVendor(pk=pk, **{name: row[name] for name in ('date',) + METRIC_NAMES}) for pk, row in survivors.items()],
+                ['date', *METRIC_NAMES],
+                batch_size=500,
+            )
+            for offset in range(0, len(drop), 500):
+                HistoricalPerformanceVendor.objects.filter(pk__in=drop[offset:offset + 500]).delete()
+            # The performance responses and their validators are built from the history
+            if changed:
+                Vendor.objects.filter(pk__in=changed).update(updated_at=timezone.now())
+                invalidate_vendor_responses(changed)
+        kept += len(survivors)
+        deleted += len(drop)
+    return kept, deleted
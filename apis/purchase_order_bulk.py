@@ -0,0 +1,155 @@
+from collections import Counter
+from django.db import transaction
+from django.utils import timezone
+from vendor_models.models import Vendor, Items, PurchaseOrder, StockReservation
+from .serializers import PurchaseOrderBulkRowSerializer
+from .metric_counters import METRIC_FIELDS, metric_state, apply_metric_changes
+from .metric_queue import enqueue_vendor_metrics
+from .inventory import reserve_stock, release_reserved_stock, OutOfStock
+
+
+def bulk_create_purchase_orders(rows, buyer_id):
+    """
+    Validates and inserts many purchase orders for one buyer. Vendor codes and item ids
+    of the whole batch are resolved with one `IN` query each, stock is reserved once per
+    item and valid rows are inserted with `bulk_create` in one transaction, and the vendor
+    counters are updated once per batch with a single metrics refresh per affected vendor.
+
+    Returns `(created, errors)`: the created orders and `{'index', 'errors'}` for every
+    row that was rejected. Invalid rows never prevent the valid ones from being created.
+    """
+    errors = []
+    valid = []
+    for index, row in enumerate(rows):
+        serializer = PurchaseOrderBulkRowSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+
+    vendor_ids = dict(
+        Vendor.objects.filter(vendor_code__in={data['vendor_code'] for _, data in valid})
+        .values_list('vendor_code', 'pk')
+    )
+    item_ids = set(
+        Items.objects.filter(pk__in={data['items'] for _, data in valid}).values_list('pk', flat=True)
+    )
+
+    orders = []
+    for index, data in valid:
+        row_errors = {}
+        if data['vendor_code'] not in vendor_ids:
+            row_errors['vendor_code'] = ['Invalid vendor code.']
+        if data['items'] not in item_ids:
+            row_errors['items'] = [f'Invalid pk "{data["items"]}" - object does not exist.']
+        if row_errors:
+            errors.append({'index': index, 'errors': row_errors})
+            continue
+        fields = {key: value for key, value in data.items() if key not in ('vendor_code', 'items')}
+        orders.append((index, PurchaseOrder(
+            vendor_id=vendor_ids[data['vendor_code']], buyer_id=buyer_id, items_id=data['items'], **fields
+        )))
+
+    if orders:
+        with transaction.atomic():
+            orders = reserve_order_stock(orders, errors)
+            PurchaseOrder.objects.bulk_create(orders, batch_size=500)
+            StockReservation.objects.bulk_create([
+                StockReservation(purchase_order=order, item_id=order.items_id, quantity=order.quantity)
+                for order in orders if order.status != 'canceled'
+            ], batch_size=500)
+            # bulk_create sends no post_save, so the counters are updated here in one go.
+            changed = apply_metric_changes([(None, metric_state(order)) for order in orders])
+        for vendor_id, metrics in changed.items():
+            if metrics:
+                enqueue_vendor_metrics(vendor_id, metrics)
+
+    errors.sort(key=lambda error: error['index'])
+    return orders, errors
+
+
+def reserve_order_stock(orders, errors):
+    """
+    Reserves the stock of `orders` ((index, order) pairs) with one conditional update per
+    item. When an item cannot cover all of its rows at once, its rows are reserved one by
+    one and those that no longer fit are reported in `errors`. Returns the orders to create.
+    """
+    wanted = Counter()
+    for _, order in orders:
+        if order.status != 'canceled':
+            wanted[order.items_id] += order.quantity
+    short = set()
+    for item_id, quantity in wanted.items():
+        try:
+            reserve_stock(item_id, quantity)
+        except OutOfStock:
+            short.add(item_id)
+
+    reserved = []
+    for index, order in orders:
+        if order.items_id in short and order.status != 'canceled':
+            try:
+                reserve_stock(order.items_id, order.quantity)
+            except OutOfStock:
+                errors.append({'index': index, 'errors': {'quantity': ['Not enough stock available for this item.']}})
+                continue
+        reserved.append(order)
+    return reserved
+
+
+# Transition -> (new status, statuses it may be applied to, date field stamped with the time)
+PURCHASE_ORDER_TRANSITIONS = {
+    'acknowledge': ('acknowledged', ('pending', 'issued'), 'acknowledgment_date'),
+    'issue': ('issued', ('pending', 'acknowledged'), 'issue_date'),
+    'complete': ('completed', ('acknowledged', 'issued'), None),
+    'cancel': ('canceled', ('pending', 'acknowledged', 'issued'), None),
+}
+
+
+def bulk_transition_purchase_orders(purchase_orders, ids, transition):
+    """
+    Applies `transition` to the orders of `purchase_orders` (the caller's visible orders)
+    whose id is in `ids`, with one conditional UPDATE guarded by the allowed prior
+    statuses. Counters are updated for the batch and metrics refreshed once per vendor;
+    cancelling returns the stock reserved for the orders with one update per item.
+
+    Returns `(updated_ids, skipped)` where `skipped` lists `{'id', 'reason'}` for ids
+    that do not exist, are not visible, or are in a status the transition cannot leave.
+    """
+    new_status, allowed, stamp = PURCHASE_ORDER_TRANSITIONS[transition]
+    now = timezone.now()
+    values = {'status': new_status}
+    if stamp:
+        values[stamp] = now
+
+    with transaction.atomic():
+        states = {
+            row['id']: row
+            for row in purchase_orders.filter(pk__in=ids).select_for_update().order_by()
+            .values('id', *METRIC_FIELDS)
+        }
+        eligible = [pk for pk, state in states.items() if state['status'] in allowed]
+        updated = 0
+        if eligible:
+            updated = purchase_orders.filter(pk__in=eligible, status__in=allowed).update(updated_at=now, **values)
+        if updated != len(eligible):
+            # A row changed status between the locked read and the update (databases without
+            # row locks); re-read which rows took the transition.
+            eligible = list(purchase_orders.filter(pk__in=eligible, **values).values_list('pk', flat=True))
+        old_states = [{field: states[pk][field] for field in METRIC_FIELDS} for pk in eligible]
+        changed = apply_metric_changes([(state, {**state, **values}) for state in old_states])
+        if new_status == 'canceled':
+            release_reserved_stock(eligible)
+    for vendor_id, metrics in changed.items():
+        if metrics:
+            enqueue_vendor_metrics(vendor_id, metrics)
+
+    updated_ids = set(eligible)
+    skipped = []
+    for pk in dict.fromkeys(ids):
+        if pk in updated_ids:
+            continue
+        state = states.get(pk)
+        reason = 'Purchase order not found.' if state is None else f'Cannot {transition} a purchase order that is {state["status"]}.'
+        skipped.append({'id': pk, 'reason': reason})
+    return sorted(updated_ids), skipped
@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import zlib
+from .purchase_order_reads import filter_purchase_orders
+
+# Exported columns: (header, PurchaseOrder column); relations are exported as their ids
+PURCHASE_ORDER_EXPORT_COLUMNS = (
+    ('id', 'id'), ('po_number', 'po_number'), ('vendor', 'vendor_id'), ('buyer', 'buyer_id'),
+    ('order_date', 'order_date'), ('delivery_date', 'delivery_date'), ('items', 'items_id'),
+    ('quantity', 'quantity'), ('status', 'status'), ('quality_rating', 'quality_rating'),
+    ('issue_date', 'issue_date'), ('acknowledgment_date', 'acknowledgment_date'),
+)
+
+EXPORT_CONTENT_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Rows fetched per database round trip, and bytes buffered before a chunk is yielded
+EXPORT_FETCH_SIZE = 2000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def export_value(value):
+    # Datetimes as the API renders them (ISO 8601, UTC as `Z`)
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return value
+
+
+def export_queryset(purchase_orders, filters=None):
+    """
+    The rows of `purchase_orders` matching `filters`, as tuples of the export columns in
+    primary key order. Nothing is read until the result is iterated.
+    """
+    return (
+        filter_purchase_orders(purchase_orders, filters)
+        .order_by('pk')
+        .values_list(*(column for _, column in PURCHASE_ORDER_EXPORT_COLUMNS))
+    )
+
+
+def ndjson_lines(rows):
+    headers = [header for header, _ in PURCHASE_ORDER_EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(headers, map(export_value, row))), separators=(',', ':')) + '\n'
+
+
+def csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in PURCHASE_ORDER_EXPORT_COLUMNS])
+    for row in rows:
+        writer.writerow(['' if value is None else export_value(value) for value in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # The header alone when there are no rows
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+
+def buffered(lines):
+    """
+    Joins `lines` into chunks of about EXPORT_CHUNK_BYTES, so a response or file is not
+    written one row at a time.
+    """
+    parts, size = [], 0
+    for line in lines:
+        data = line.encode()
+        parts.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield b''.join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b''.join(parts)
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_purchase_orders(queryset, format='ndjson', compress=False):
+    """
+    The rows of `queryset` (see `export_queryset`) as an iterator of encoded NDJSON or CSV
+    chunks, gzipped when `compress` is set. Rows are read with a chunked server-side
+    iterator, so memory stays flat however many orders are exported.
+    """
+    lines = ndjson_lines if format == 'ndjson' else csv_lines
+    chunks = buffered(lines(queryset.iterator(chunk_size=EXPORT_FETCH_SIZE)))
+    return gzipped(chunks) if compress else chunks
@@ -0,0 +1,72 @@
+from collections import namedtuple
+from django.contrib.auth import get_user_model
+from vendor_models.models import PurchaseOrder
+from .authentication import TokenPrincipal
+
+User = get_user_model()
+
+
+# Columns `PurchaseOrderReadSerializer` renders; relations are rendered from their ids.
+PURCHASE_ORDER_READ_FIELDS = (
+    'id', 'po_number', 'vendor', 'buyer', 'order_date', 'delivery_date',
+    'items', 'quantity', 'status', 'quality_rating', 'issue_date', 'acknowledgment_date',
+)
+
+UserProfiles = namedtuple('UserProfiles', ['buyer_id', 'vendor_id'])
+
+
+def resolve_user_profiles(user):
+    """
+    The ids of the buyer and vendor profiles of `user` (None when missing): taken from the
+    token claims of a `TokenPrincipal`, else read in a single query instead of one
+    `hasattr` probe per profile.
+    """
+    if isinstance(user, TokenPrincipal):
+        return UserProfiles(user.buyer_id, user.vendor_id)
+    profiles = (
+        User.objects.filter(pk=user.pk)
+        .values_list('buyer_profile__id', 'vendor_profile__id')
+        .first()
+    )
+    return UserProfiles(*profiles) if profiles else UserProfiles(None, None)
+
+
+# Validated list filter -> lookup; each one is served by an index on PurchaseOrder
+PURCHASE_ORDER_LIST_FILTERS = {
+    'status': 'status',
+    'order_date_from': 'order_date__gte',
+    'order_date_to': 'order_date__lt',
+    'delivery_date_from': 'delivery_date__gte',
+    'delivery_date_to': 'delivery_date__lt',
+    'item': 'items_id',
+    'vendor': 'vendor_id',
+    'buyer': 'buyer_id',
+}
+
+
+def filter_purchase_orders(purchase_orders, filters):
+    """
+    `purchase_orders` narrowed by validated list filters (see PURCHASE_ORDER_LIST_FILTERS).
+    """
+    if not filters:
+        return purchase_orders
+    return purchase_orders.filter(**{PURCHASE_ORDER_LIST_FILTERS[name]: value for name, value in filters.items()})
+
+
+def purchase_order_read_queryset(profiles, vendor_name=None, filters=None):
+    """
+    Purchase orders visible to a user with `profiles`, projected to the columns the read
+    serializer needs. Buyers see the orders they placed, vendors the orders they received.
+    `filters` are validated `PurchaseOrderListQuerySerializer` data. Returns None when the
+    user has neither profile.
+    """
+    if profiles.buyer_id is not None:
+        purchase_orders = PurchaseOrder.objects.filter(buyer_id=profiles.buyer_id)
+    elif profiles.vendor_id is not None:
+        purchase_orders = PurchaseOrder.objects.filter(vendor_id=profiles.vendor_id)
+    else:
+        return None
+    if vendor_name:
+        purchase_orders = purchase_orders.filter(vendor__user__name__icontains=vendor_name)
+    # `updated_at` is not rendered but validates conditional GETs
+    return filter_purchase_orders(purchase_orders, filters).only(*PURCHASE_ORDER_READ_FIELDS, 'updated_at')
@@ -0,0 +1,65 @@
+import math
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def has_non_finite_float(values):
+    """Whether the JSON `values`, or the dicts, lists and tuples in them, hold a NaN or infinity."""
+    containers = [values]
+    while containers:
+        container = containers.pop()
+        for value in container.values() if isinstance(container, dict) else container:
+            kind = value.__class__
+            # Most values of a response are strings, integers and nulls
+            if kind is str or kind is int or value is None:
+                continue
+            if isinstance(value, float):
+                if not math.isfinite(value):
+                    return True
+            elif isinstance(value, (dict, list, tuple)):
+                containers.append(value)
+    return False
+
+
+class EnvelopeJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` producing the same JSON faster: the whole response (envelope and
+    `responseData`) is encoded straight to bytes by orjson, which handles datetimes, UUIDs
+    and dict/list subclasses natively and everything else through DRF's encoder. Without
+    orjson, for indented output (browsable API, `; indent=` media type parameter), for
+    values orjson cannot encode and for NaN and infinities (which orjson writes as null),
+    rendering is left to `JSONRenderer`.
+    """
+
+    use_orjson = orjson is not None
+    _encoder = encoders.JSONEncoder()
+
+    def default(self, value):
+        value = self._encoder.default(value)
+        if isinstance(value, float) and not math.isfinite(value):
+            # e.g. Decimal('NaN'); raising sends the response to JSONRenderer
+            raise TypeError('non-finite float')
+        return value
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not self.use_orjson or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=self.default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # e.g. integers above 64 bits; JSONRenderer encodes them or raises as before
+            return super().render(data, accepted_media_type, renderer_context)
+        # A non-finite float became null; JSONRenderer rejects it (STRICT_JSON) or writes it as is.
+        if b'null' in content and has_non_finite_float([data]):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Like JSONRenderer, keep the output a strict JavaScript subset
+        if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+            content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return content
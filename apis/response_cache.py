@@ -0,0 +1,157 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from vendor_models.models import Vendor
+
+
+DEFAULT_RESPONSE_CACHE_SETTINGS = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'LOCAL_MAX_ENTRIES': 1024,
+    'LOCAL_TTL': 5,
+}
+
+def response_cache_settings():
+    return {**DEFAULT_RESPONSE_CACHE_SETTINGS, **getattr(settings, 'VENDOR_RESPONSE_CACHE', {})}
+
+
+class ResponseCache:
+    """
+    Read-through cache of serialized payloads: a bounded in-process LRU in front of a
+    shared Django cache backend. Invalidation removes a key from both tiers here; other
+    processes drop their local copy after LOCAL_TTL seconds at the latest.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _key(self, key):
+        return f'{self.prefix}:{key}'
+
+    def _remember(self, key, value, config):
+        with self._lock:
+            self._local[key] = (time.monotonic() + config['LOCAL_TTL'], value)
+            self._local.move_to_end(key)
+            while len(self._local) > config['LOCAL_MAX_ENTRIES']:
+                self._local.popitem(last=False)
+
+    def get(self, key):
+        config = response_cache_settings()
+        if not config['ENABLED']:
+            return None
+        key = self._key(key)
+        with self._lock:
+            entry = self._local.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._local.move_to_end(key)
+                self.stats['local_hits'] += 1
+                return entry[1]
+        value = caches[config['ALIAS']].get(key)
+        if value is None:
+            self._count('misses')
+            return None
+        self._count('shared_hits')
+        self._remember(key, value, config)
+        return value
+
+    def set(self, key, value):
+        config = response_cache_settings()
+        if not config['ENABLED']:
+            return
+        key = self._key(key)
+        caches[config['ALIAS']].set(key, value, config['TIMEOUT'])
+        self._remember(key, value, config)
+
+    def delete_many(self, keys):
+        config = response_cache_settings()
+        keys = [self._key(key) for key in keys]
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+            self.stats['invalidations'] += 1
+        caches[config['ALIAS']].delete_many(keys)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, 'local_entries': len(self._local)}
+
+
+vendor_response_cache = ResponseCache('vendor-response')
+
+
+def vendor_response_version(vendor_id):
+    """
+    Version of a vendor's cached payloads, part of their keys. Invalidation drops it, so
+    every payload of the vendor (any window, user or query) is missed from then on.
+    """
+    key = f'version:{vendor_id}'
+    version = vendor_response_cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        vendor_response_cache.set(key, version)
+    return version
+
+
+def request_scope(request):
+    """
+    Digest of what, besides the vendor, selects a cached response: the user, whose id is
+    part of its validators, and the query string, normalized to its sorted parameters.
+    """
+    query = sorted(request.GET.lists())
+    return hashlib.blake2b(repr((request.user.pk, query)).encode(), digest_size=12).hexdigest()
+
+
+def vendor_detail_key(request, vendor_id, window=None):
+    # Rolling windows move daily, so their payloads are only valid for the day
+    day = timezone.localdate() if window else ''
+    return f'detail:{vendor_id}:{vendor_response_version(vendor_id)}:{window}:{day}:{request_scope(request)}'
+
+
+def vendor_performance_key(request, vendor_id, window=None):
+    day = timezone.localdate() if window else ''
+    return f'performance:{vendor_id}:{vendor_response_version(vendor_id)}:{window}:{day}:{request_scope(request)}'
+
+
+def vendor_id_for_code(vendor_code):
+    """
+    The id of the vendor with `vendor_code`, or None. Vendor codes never change, so the
+    mapping is cached and payloads can be keyed (and invalidated) by id alone.
+    """
+    key = f'code:{vendor_code}'
+    vendor_id = vendor_response_cache.get(key)
+    if vendor_id is None:
+        vendor_id = Vendor.objects.filter(vendor_code=vendor_code).values_list('pk', flat=True).first()
+        if vendor_id is not None:
+            vendor_response_cache.set(key, vendor_id)
+    return vendor_id
+
+
+def invalidate_vendor_responses(vendor_ids, vendor_codes=()):
+    """
+    Drops the cached detail and performance payloads of `vendor_ids` (their version) and
+    the id mappings of `vendor_codes`. The keys are dropped again once the surrounding
+    transaction commits, so a read of the uncommitted state cannot stay cached.
+    """
+    keys = [f'code:{vendor_code}' for vendor_code in vendor_codes]
+    keys.extend(f'version:{vendor_id}' for vendor_id in vendor_ids)
+    if keys:
+        vendor_response_cache.delete_many(keys)
+        transaction.on_commit(lambda: vendor_response_cache.delete_many(keys))
@@ -0,0 +1,189 @@
+import hashlib
+import os
+import threading
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import get_resolver, path
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+
+DEFAULT_API_DOCS_SETTINGS = {
+    'ENABLED': True,
+    'SCHEMA_FILE': None,
+    'MAX_AGE': 86400,
+}
+
+
+def api_docs_settings():
+    return {**DEFAULT_API_DOCS_SETTINGS, **getattr(settings, 'API_DOCS', {})}
+
+
+class DeferredOpenAPI:
+    """
+    Stand-in for `drf_yasg.openapi` in view annotations. Attributes and calls are only
+    recorded (`openapi.Schema(type=openapi.TYPE_STRING)` is a `Deferred` tree); they are
+    turned into drf_yasg objects by `materialize` when a schema is generated, so a process
+    that never serves docs never imports drf_yasg.
+    """
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return Deferred(name)
+
+
+class Deferred:
+    __slots__ = ('name', 'args', 'kwargs', 'called')
+
+    def __init__(self, name, args=(), kwargs=None, called=False):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.called = called
+
+    def __call__(self, *args, **kwargs):
+        return Deferred(self.name, args, kwargs, called=True)
+
+    def __repr__(self):
+        return f'Deferred(openapi.{self.name}{"(...)" if self.called else ""})'
+
+
+openapi = DeferredOpenAPI()
+
+
+def materialize(value):
+    """`value` with every `Deferred` in it replaced by the drf_yasg object it stands for."""
+    if isinstance(value, Deferred):
+        from drf_yasg import openapi as yasg_openapi
+        target = getattr(yasg_openapi, value.name)
+        if not value.called:
+            return target
+        return target(*materialize(value.args), **materialize(value.kwargs))
+    if isinstance(value, dict):
+        return {key: materialize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(materialize(item) for item in value)
+    return value
+
+
+_pending_annotations = []
+_annotations_lock = threading.Lock()
+
+
+def swagger_auto_schema(**kwargs):
+    """
+    Records the drf_yasg `swagger_auto_schema` overrides of a view method without applying
+    them; `load_schema_annotations` applies them before a schema is generated.
+    """
+    def decorator(view_method):
+        with _annotations_lock:
+            _pending_annotations.append((view_method, kwargs))
+        return view_method
+    return decorator
+
+
+def load_schema_annotations():
+    """Applies every recorded annotation of the views imported so far, once."""
+    from drf_yasg.utils import swagger_auto_schema as yasg_swagger_auto_schema
+    with _annotations_lock:
+        pending = list(_pending_annotations)
+        _pending_annotations.clear()
+    for view_method, kwargs in pending:
+        yasg_swagger_auto_schema(**materialize(kwargs))(view_method)
+
+
+def schema_info():
+    from drf_yasg import openapi as yasg_openapi
+    return yasg_openapi.Info(
+        title="Vendor Management Apis",
+        default_version='v1',
+        description="Vendor, Buyer, Purchase Order, Historical Performance",
+        terms_of_service="https://www.vendorexample.com/policies/terms/",
+        contact=yasg_openapi.Contact(email="vendor@example.com"),
+        license=yasg_openapi.License(name="Vendor License"),
+    )
+
+
+def schema_generator_class():
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    class AnnotatedSchemaGenerator(OpenAPISchemaGenerator):
+        def get_schema(self, request=None, public=False):
+            # Importing the URLconf imports the views, which records their annotations.
+            get_resolver(self._gen.urlconf).url_patterns
+            load_schema_annotations()
+            return super().get_schema(request, public)
+
+    return AnnotatedSchemaGenerator
+
+
+def build_schema(url=None):
+    """The OpenAPI document of every endpoint of the project, as JSON bytes."""
+    from drf_yasg.codecs import OpenAPICodecJson
+    generator = schema_generator_class()(schema_info(), url=url)
+    return OpenAPICodecJson(validators=[]).encode(generator.get_schema(request=None, public=True))
+
+
+class SchemaDocument:
+    """
+    The schema served by `openapi_schema`: SCHEMA_FILE as written by `build_openapi`,
+    re-read when the file changes, or built once per process when there is no file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._source = None
+        self._document = None
+
+    def get(self):
+        schema_file = api_docs_settings()['SCHEMA_FILE']
+        source = None
+        if schema_file and os.path.exists(schema_file):
+            stat = os.stat(schema_file)
+            source = (str(schema_file), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if self._document is None or self._source != source:
+                if source:
+                    with open(schema_file, 'rb') as document:
+                        content = document.read()
+                else:
+                    content = build_schema()
+                etag = '"%s"' % hashlib.blake2b(content, digest_size=16).hexdigest()
+                self._source, self._document = source, (content, etag)
+            return self._document
+
+    def clear(self):
+        with self._lock:
+            self._source = self._document = None
+
+
+schema_document = SchemaDocument()
+
+
+def openapi_schema(request):
+    content, etag = schema_document.get()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=api_docs_settings()['MAX_AGE'])
+    return response
+
+
+def docs_urlpatterns():
+    """
+    Routes of the API documentation: the schema document and the Swagger UI reading it
+    (SWAGGER_SETTINGS['SPEC_URL']). Only imported by the URLconf when docs are enabled.
+    """
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+    schema_view = get_schema_view(
+        schema_info(),
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+        generator_class=schema_generator_class(),
+    )
+    return [
+        path('openapi.json', openapi_schema, name='openapi-schema'),
+        path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    ]
@@ -4,6 +4,12 @@ from django.contrib.auth import authenticate
 from vendor_models.models import *
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from datetime import timedelta
+from .metric_counters import rolling_vendor_metrics
+from .leaderboard import LEADERBOARD_METRICS
+from .inventory import reserve_stock, change_reserved_stock, OutOfStock
+from django.db import transaction
 User = get_user_model()
 
 class LoginSerializer(serializers.Serializer):
@@ -188,13 +194,38 @@ class VendorManagementUserUpdateSerializer(serializers.ModelSerializer):
 
 
 
+def with_rolling_metrics(data, metrics, window):
+    """Vendor representation `data` with its KPIs replaced by the rolling `window` ones."""
+    data['on_time_delivery_date'] = metrics['on_time_delivery_rate']
+    data['quality_rating_avg'] = metrics['quality_rating_avg']
+    data['average_response_time'] = metrics['average_response_time']
+    data['fulfillment_rate'] = metrics['fulfillment_rate']
+    data['window'] = window
+    return data
+
+
 class VendorSerializer(serializers.ModelSerializer):
+    """
+    With a `window` (30, 90 or 365) in the context the KPIs are the rolling-window ones
+    instead of the lifetime values. List views pass the already computed
+    `rolling_metrics` map in the context to avoid one lookup per vendor.
+    """
     user = VendorManagementUserUpdateSerializer()
 
     class Meta:
         model = Vendor
         fields = ['user', 'on_time_delivery_date', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        window = self.context.get('window')
+        if window:
+            rolling_metrics = self.context.get('rolling_metrics')
+            if rolling_metrics is None:
+                rolling_metrics = rolling_vendor_metrics([instance.pk], window)
+            with_rolling_metrics(data, rolling_metrics[instance.pk], window)
+        return data
+
     def update(self, instance, validated_data):
         user_data = validated_data.pop('user', None)
         
@@ -249,12 +280,28 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Buyer profile does not exist for the logged-in user.')
         
         data['buyer'] = buyer
+
+        # Its stock went back to the item when it was canceled, so a canceled order stays canceled.
+        if self.instance is not None and self.instance.status == 'canceled' and data.get('status', 'canceled') != 'canceled':
+            raise serializers.ValidationError({'status': 'A canceled purchase order cannot be reopened.'})
         
         return data
 
     def create(self, validated_data):
         validated_data.pop('vendor_code')
-        purchase_order = PurchaseOrder.objects.create(**validated_data)
+        with transaction.atomic():
+            # Stock is taken with a conditional update, so two orders can never both get the last units.
+            reserved = validated_data.get('status') != 'canceled'
+            if reserved:
+                try:
+                    reserve_stock(validated_data['items'].pk, validated_data['quantity'])
+                except OutOfStock:
+                    raise serializers.ValidationError({'quantity': 'Not enough stock available for this item.'})
+            purchase_order = PurchaseOrder.objects.create(**validated_data)
+            if reserved:
+                StockReservation.objects.create(
+                    purchase_order=purchase_order, item=validated_data['items'], quantity=validated_data['quantity']
+                )
         return purchase_order
 
     def update(self, instance, validated_data):
@@ -267,8 +314,14 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
         instance.status = validated_data.get('status', instance.status)
         instance.quality_rating = validated_data.get('quality_rating', instance.quality_rating)
         instance.acknowledgment_date = validated_data.get('acknowledgment_date', instance.acknowledgment_date)
-        
-        instance.save()
+
+        with transaction.atomic():
+            # An edited item or quantity moves the order's reserved stock along with it.
+            try:
+                change_reserved_stock(instance.pk, instance.items_id, instance.quantity)
+            except OutOfStock:
+                raise serializers.ValidationError({'quantity': 'Not enough stock available for this item.'})
+            instance.save()
         return instance
     
 
@@ -276,6 +329,83 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
 
 
 
+class PurchaseOrderBulkRowSerializer(serializers.Serializer):
+    """
+    One order of a bulk create. Only checks the row itself; vendor codes and item ids
+    are resolved for the whole batch at once by `bulk_create_purchase_orders`.
+    """
+    STATUS_CHOICES = ['pending', 'acknowledged', 'issued', 'completed', 'canceled']
+
+    vendor_code = serializers.CharField(max_length=50)
+    items = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+    delivery_date = serializers.DateTimeField(required=False, allow_null=True)
+    status = serializers.ChoiceField(choices=STATUS_CHOICES, default='pending')
+    quality_rating = serializers.FloatField(required=False, allow_null=True)
+    acknowledgment_date = serializers.DateTimeField(required=False, allow_null=True)
+
+
+class PurchaseOrderBulkCreateSerializer(serializers.Serializer):
+    MAX_ORDERS = 5000
+
+    orders = serializers.ListField(child=serializers.DictField(), min_length=1, max_length=MAX_ORDERS)
+
+
+class PurchaseOrderBulkTransitionSerializer(serializers.Serializer):
+    TRANSITION_CHOICES = ['acknowledge', 'issue', 'complete', 'cancel']
+    MAX_ORDERS = 5000
+
+    transition = serializers.ChoiceField(choices=TRANSITION_CHOICES)
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1, max_length=MAX_ORDERS)
+
+
+class PurchaseOrderReadSerializer(serializers.Serializer):
+    """
+    Read-only rendering of a purchase order, matching the output of
+    `PurchaseOrderSerializer`. Relations are rendered from their ids, so rows from
+    `purchase_order_read_queryset` serialize without further queries.
+    """
+    po_number = serializers.CharField(read_only=True)
+    vendor = serializers.IntegerField(source='vendor_id', read_only=True)
+    buyer = serializers.IntegerField(source='buyer_id', read_only=True)
+    order_date = serializers.DateTimeField(read_only=True)
+    delivery_date = serializers.DateTimeField(read_only=True)
+    items = serializers.IntegerField(source='items_id', read_only=True)
+    quantity = serializers.IntegerField(read_only=True)
+    status = serializers.CharField(read_only=True)
+    quality_rating = serializers.FloatField(read_only=True)
+    issue_date = serializers.DateTimeField(read_only=True)
+    acknowledgment_date = serializers.DateTimeField(read_only=True)
+
+
+class PurchaseOrderListQuerySerializer(serializers.Serializer):
+    STATUS_CHOICES = ['pending', 'acknowledged', 'issued', 'completed', 'canceled']
+
+    status = serializers.ChoiceField(choices=STATUS_CHOICES, required=False)
+    order_date_from = serializers.DateTimeField(required=False)
+    order_date_to = serializers.DateTimeField(required=False)
+    delivery_date_from = serializers.DateTimeField(required=False)
+    delivery_date_to = serializers.DateTimeField(required=False)
+    item = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, data):
+        for field in ('order_date', 'delivery_date'):
+            start, end = data.get(f'{field}_from'), data.get(f'{field}_to')
+            if start and end and start >= end:
+                raise serializers.ValidationError({f'{field}_from': f'"{field}_from" must be earlier than "{field}_to".'})
+        return data
+
+
+class PurchaseOrderExportQuerySerializer(PurchaseOrderListQuerySerializer):
+    FORMAT_CHOICES = ['ndjson', 'csv']
+
+    vendor = serializers.IntegerField(required=False, min_value=1)
+    buyer = serializers.IntegerField(required=False, min_value=1)
+    # Not `format`: DRF reads that query parameter to pick a renderer
+    file_format = serializers.ChoiceField(choices=FORMAT_CHOICES, default='ndjson')
+    gzip = serializers.BooleanField(default=False)
+
+
 class VendorPerformanceSerializer(serializers.ModelSerializer):
     class Meta:
         model = HistoricalPerformanceVendor
@@ -294,3 +424,37 @@ class AcknowledgePurchaseOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = PurchaseOrder
         fields = ['po_number']
+
+
+
+class VendorPerformanceHistoryQuerySerializer(serializers.Serializer):
+    BUCKET_CHOICES = ['hour', 'day', 'week']
+    METRIC_CHOICES = ['on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate']
+
+    # `from` is a Python keyword, so the query parameter is mapped in `__init__`
+    to = serializers.DateTimeField(required=False)
+    bucket = serializers.ChoiceField(choices=BUCKET_CHOICES, default='day')
+    points = serializers.IntegerField(required=False, min_value=3, max_value=5000)
+    metric = serializers.ChoiceField(choices=METRIC_CHOICES, default='fulfillment_rate')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['from'] = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        end = data.get('to') or timezone.now()
+        start = data.get('from') or end - timedelta(days=30)
+        if start >= end:
+            raise serializers.ValidationError({'from': '"from" must be earlier than "to".'})
+        data['from'] = start
+        data['to'] = end
+        return data
+
+
+class VendorLeaderboardQuerySerializer(serializers.Serializer):
+    metric = serializers.ChoiceField(choices=list(LEADERBOARD_METRICS), default='fulfillment_rate')
+    limit = serializers.IntegerField(default=50, min_value=1, max_value=500)
+
+
+class VendorRankQuerySerializer(serializers.Serializer):
+    metric = serializers.ChoiceField(choices=list(LEADERBOARD_METRICS), required=False)
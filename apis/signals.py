@@ -1,8 +1,141 @@
-from django.db.models.signals import post_save
+import sys
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
+from django.db import transaction
 from django.dispatch import receiver
-from vendor_models.models import PurchaseOrder
-from .performance_calculations import update_vendor_metrics
+from vendor_models.models import Vendor, PurchaseOrder, VendorManagementUser
+from .performance_calculations import vendor_metrics_updated
+from .metric_counters import METRIC_FIELDS, metric_state, apply_metric_changes
+from .metric_queue import enqueue_vendor_metrics
+from .leaderboard import LEADERBOARD_METRICS, vendor_leaderboard
+from .inventory import release_reserved_stock
+from .response_cache import invalidate_vendor_responses
+
+
+def saved_metric_fields(update_fields):
+    """
+    The METRIC_FIELDS a save writes: all of them, or those named in `update_fields`.
+    """
+    if update_fields is None:
+        return set(METRIC_FIELDS)
+    return {PurchaseOrder._meta.get_field(name).attname for name in update_fields} & set(METRIC_FIELDS)
+
+
+@receiver(post_init, sender=PurchaseOrder)
+def remember_purchase_order_metric_state(sender, instance, **kwargs):
+    # Metric fields as last read from or written to the database, to diff the next save against.
+    instance._metric_state = metric_state(instance) if instance.pk else None
+
+
+@receiver(pre_save, sender=PurchaseOrder)
+def load_purchase_order_metric_state(sender, instance, update_fields=None, **kwargs):
+    saved = saved_metric_fields(update_fields)
+    if not instance.pk or not saved:
+        return
+    # A save writing the metric fields as they were loaded changes no counter and costs no query.
+    snapshot, values = instance._metric_state, instance.__dict__
+    if snapshot is not None and all(values[field] == snapshot[field] for field in saved if field in values):
+        return
+    # Otherwise the counters are diffed against the stored row, locked until the save commits:
+    # the snapshot is stale when another request changed the order since it was loaded.
+    instance._metric_state = (
+        PurchaseOrder.objects.filter(pk=instance.pk).select_for_update().values(*METRIC_FIELDS).first()
+    )
+
 
 @receiver(post_save, sender=PurchaseOrder)
-def handle_purchase_order_status_change(sender, instance, **kwargs):
-    update_vendor_metrics(instance.vendor)
+def handle_purchase_order_status_change(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        old_state, new_state = None, metric_state(instance)
+    else:
+        saved = saved_metric_fields(update_fields)
+        if not saved or instance._metric_state is None:
+            return
+        # Fields this save did not write keep their stored values, whatever the instance holds.
+        old_state = instance._metric_state
+        new_state = {**old_state, **{field: instance.__dict__[field] for field in saved if field in instance.__dict__}}
+    instance._metric_state = new_state
+    if old_state and old_state['status'] != 'canceled' and new_state['status'] == 'canceled':
+        # The stock reserved when the order was placed, if any, goes back to the item.
+        release_reserved_stock([instance.pk])
+    for vendor_id, metrics in apply_metric_changes([(old_state, new_state)]).items():
+        if metrics:
+            enqueue_vendor_metrics(vendor_id, metrics)
+
+
+@receiver(pre_delete, sender=PurchaseOrder)
+def load_deleted_purchase_order_state(sender, instance, **kwargs):
+    # What the deleted row contributes is read from the row itself (locked, in the deletion's
+    # transaction), not from a snapshot that may predate other requests' changes.
+    stored = PurchaseOrder.objects.filter(pk=instance.pk).select_for_update().values(*METRIC_FIELDS).first()
+    if stored is not None:
+        instance._metric_state = stored
+
+
+@receiver(pre_delete, sender=PurchaseOrder)
+def release_deleted_purchase_order_stock(sender, instance, **kwargs):
+    # Before the reservation is deleted with the order, its stock goes back to the item.
+    release_reserved_stock([instance.pk])
+
+
+@receiver(post_delete, sender=PurchaseOrder)
+def handle_purchase_order_delete(sender, instance, **kwargs):
+    old_state = instance._metric_state or metric_state(instance)
+    for vendor_id, metrics in apply_metric_changes([(old_state, None)]).items():
+        if metrics:
+            enqueue_vendor_metrics(vendor_id, metrics)
+
+
+@receiver(vendor_metrics_updated)
+def update_vendor_leaderboard(sender, metrics, **kwargs):
+    transaction.on_commit(lambda: vendor_leaderboard.update(metrics))
+
+
+@receiver(vendor_metrics_updated)
+def invalidate_vendor_metric_responses(sender, metrics, **kwargs):
+    invalidate_vendor_responses(metrics)
+
+
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+def invalidate_vendor_profile_responses(sender, instance, **kwargs):
+    invalidate_vendor_responses([instance.pk], vendor_codes=[instance.vendor_code])
+
+
+@receiver(post_save, sender=VendorManagementUser)
+def invalidate_vendor_user_responses(sender, instance, created, **kwargs):
+    # The cached vendor payloads include the vendor's user fields
+    if created:
+        return
+    invalidate_vendor_responses(Vendor.objects.filter(user_id=instance.pk).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Vendor)
+def add_vendor_to_leaderboard(sender, instance, created, **kwargs):
+    if created:
+        metrics = {name: getattr(instance, column) for name, (column, _) in LEADERBOARD_METRICS.items()}
+        transaction.on_commit(lambda: vendor_leaderboard.update({instance.pk: metrics}))
+
+
+@receiver(post_delete, sender=Vendor)
+def remove_vendor_from_leaderboard(sender, instance, **kwargs):
+    vendor_id = instance.pk
+    transaction.on_commit(lambda: vendor_leaderboard.remove(vendor_id))
+
+
+def invalidate_principal(user_id):
+    # Principals are only cached once this process has authenticated a request; until then
+    # there is nothing to drop, and simplejwt is not imported just to find that out.
+    authentication = sys.modules.get('apis.authentication')
+    if authentication is not None:
+        authentication.principal_cache.invalidate(user_id)
+
+
+@receiver(post_save, sender=VendorManagementUser)
+def revoke_inactive_user_tokens(sender, instance, **kwargs):
+    if not instance.is_active:
+        invalidate_principal(instance.pk)
+
+
+@receiver(post_delete, sender=VendorManagementUser)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    invalidate_principal(instance.pk)
@@ -0,0 +1,117 @@
+import math
+import struct
+
+
+class DDSketch:
+    """
+    Quantile sketch with relative-error guarantees (DDSketch). Positive values fall into
+    logarithmic bins so any quantile is returned within `relative_accuracy` of the true
+    value; values <= 0 are counted separately as zero. Counts per bin are exact, so a
+    value can be removed again and two sketches with the same accuracy merge by adding
+    their bins.
+
+    Once more than `max_bins` bins are in use the lowest ones are folded together, which
+    only loses accuracy on the smallest values.
+    """
+
+    VERSION = 1
+    _HEADER = struct.Struct('<BdqqH')
+
+    def __init__(self, relative_accuracy=0.01, max_bins=1024):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        # Lowest bin index still kept separate after folding; None while nothing was folded
+        self.floor = None
+
+    def _index(self, value):
+        index = math.ceil(math.log(value) / self._log_gamma)
+        if self.floor is not None and index < self.floor:
+            return self.floor
+        return index
+
+    def _add_to_bin(self, index, count):
+        total = self.bins.get(index, 0) + count
+        if total:
+            self.bins[index] = total
+        else:
+            self.bins.pop(index, None)
+
+    def add(self, value, count=1):
+        """
+        Adds `value` `count` times; a negative `count` removes it.
+        """
+        if value <= 0:
+            self.zero_count += count
+        else:
+            self._add_to_bin(self._index(value), count)
+            if len(self.bins) > self.max_bins:
+                self._fold()
+        self.count += count
+
+    def remove(self, value, count=1):
+        self.add(value, -count)
+
+    def _fold(self):
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins
+        self.floor = indexes[excess]
+        for index in indexes[:excess]:
+            self._add_to_bin(self.floor, self.bins.pop(index))
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Only sketches with the same relative accuracy can be merged.')
+        if other.floor is not None and (self.floor is None or other.floor > self.floor):
+            self.floor = other.floor
+            for index in [index for index in self.bins if index < self.floor]:
+                self._add_to_bin(self.floor, self.bins.pop(index))
+        for index, count in other.bins.items():
+            self._add_to_bin(max(index, self.floor) if self.floor is not None else index, count)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        if len(self.bins) > self.max_bins:
+            self._fold()
+        return self
+
+    def quantile(self, q):
+        """
+        Estimate of the `q` quantile (0 <= q <= 1), or None for an empty sketch.
+        """
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1) if self.bins else 0.0
+
+    def to_bytes(self):
+        indexes = sorted(self.bins)
+        header = self._HEADER.pack(
+            self.VERSION, self.relative_accuracy, self.zero_count,
+            self.floor if self.floor is not None else -2 ** 63, len(indexes),
+        )
+        body = struct.pack(f'<{len(indexes)}i{len(indexes)}q', *indexes, *(self.bins[index] for index in indexes))
+        return header + body
+
+    @classmethod
+    def from_bytes(cls, data, max_bins=1024):
+        version, relative_accuracy, zero_count, floor, size = cls._HEADER.unpack_from(data)
+        if version != cls.VERSION:
+            raise ValueError(f'Unsupported sketch version {version}.')
+        values = struct.unpack_from(f'<{size}i{size}q', data, cls._HEADER.size)
+        sketch = cls(relative_accuracy, max_bins)
+        sketch.bins = dict(zip(values[:size], values[size:]))
+        sketch.zero_count = zero_count
+        sketch.count = zero_count + sum(values[size:])
+        sketch.floor = None if floor == -2 ** 63 else floor
+        return sketch
@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from django.conf import settings
+
+
+# Time a fresh API worker may take to set Django up and answer its first request
+STARTUP_BUDGET_SECONDS = 1.0
+
+StartupProfile = namedtuple('StartupProfile', ['setup', 'first_response', 'wall', 'status', 'imports'])
+ImportTime = namedtuple('ImportTime', ['module', 'self_us', 'cumulative_us', 'depth'])
+
+# Run in a fresh interpreter: set Django up the way a WSGI worker does, then serve one
+# request through the WSGI handler without a server or the test client.
+WORKER_SCRIPT = '''
+import json, os, sys, time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', %(settings)r)
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+ready = time.perf_counter()
+environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'wsgi.input': BytesIO()}
+setup_testing_defaults(environ)
+statuses = []
+response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+b''.join(response)
+response.close()
+done = time.perf_counter()
+print(json.dumps({'setup': ready - start, 'first_response': done - ready, 'status': statuses[0]}))
+'''
+
+
+def parse_import_times(stderr):
+    """`python -X importtime` output as `ImportTime` rows, in import order."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        imports.append(ImportTime(name.strip(), int(self_us), int(cumulative_us), depth))
+    return imports
+
+
+def measure_startup(path='/apis/vendors/', env=None):
+    """
+    Starts a fresh worker process and returns its `StartupProfile`: seconds spent in
+    `get_wsgi_application` (settings, apps, models, signals) and serving its first request
+    for `path`, the wall time of the whole process, the response status and the time of
+    every import. `env` overrides environment variables of the worker.
+    """
+    script = WORKER_SCRIPT % {'settings': os.environ.get('DJANGO_SETTINGS_MODULE', 'vendorproject.settings')}
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script, path],
+        capture_output=True, text=True, cwd=settings.BASE_DIR, env={**os.environ, **(env or {})},
+    )
+    wall = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    return StartupProfile(
+        result['setup'], result['first_response'], wall, result['status'], parse_import_times(completed.stderr)
+    )
@@ -1,9 +1,57 @@
-from django.urls import reverse
-from rest_framework import status
-from rest_framework.test import APITestCase
+import csv
+import decimal
+import gzip
+import importlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+import zoneinfo
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from django.apps import apps as django_apps
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.functions import TruncDate
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from rest_framework_simplejwt.tokens import RefreshToken
 from vendor_models.models import *
-from rest_framework.test import APIClient
+from apis.authentication import principal_cache
+from apis.downsampling import largest_triangle_three_buckets
+from apis.fast_serializers import CompiledSerializer, compiled_serializer
+from apis.inventory import reserve_stock, release_stock, available_stock, set_stock_shards, OutOfStock
+from apis.leaderboard import RankingIndex, vendor_leaderboard
+from apis.metric_counters import (
+    COUNTER_FIELDS, affected_metrics, rebuild_vendor_metrics, rebuild_vendor_counters, rolling_vendor_metrics,
+    advance_rolling_windows, response_time_percentiles,
+)
+from apis.metric_queue import CoalescingQueue, get_metric_queue
+from apis.performance_calculations import (
+    compute_vendor_metrics, update_vendor_metrics, vendor_order_counts, record_performance_snapshot,
+    vendor_metric_aggregates,
+)
+from apis.purchase_order_reads import resolve_user_profiles, purchase_order_read_queryset
+from apis.renderers import EnvelopeJSONRenderer
+from apis.response_cache import ResponseCache, vendor_response_cache
+from apis.schema import openapi, materialize, schema_document
+from apis.serializers import (
+    VendorSerializer, PurchaseOrderSerializer, PurchaseOrderReadSerializer, VendorPerformanceSerializer,
+)
+from apis.sketches import DDSketch
+from apis.startup import measure_startup
+from apis.user_search import search_users, user_search_index_available
 
 User = get_user_model()
 
@@ -43,7 +91,6 @@ class LoginViewTests(APITestCase):
         self.assertIn('non_field_errors', response.data['responseData'])
 
 
-
 class BuyerCreateViewTests(APITestCase):
     
     def setUp(self):
@@ -89,7 +136,6 @@ class BuyerCreateViewTests(APITestCase):
         self.assertEqual(response.data['responseMessage']['non_field_errors'][0], 'Password does not match.')
 
 
-
 class VendorListViewTests(APITestCase):
     
     def setUp(self):
@@ -141,7 +187,6 @@ class VendorListViewTests(APITestCase):
         self.assertEqual(response.data['responseMessage'], 'Authentication credentials were not provided.')
 
 
-
 class VendorDetailViewTests(APITestCase):
     
     def setUp(self):
@@ -303,7 +348,6 @@ class VendorDeleteViewTests(APITestCase):
         self.assertEqual(response.data['responseMessage'], 'Authentication credentials were not provided.')
 
 
-
 class BuyerCreateViewTests(APITestCase):
 
     def setUp(self):
@@ -447,4 +491,1345 @@ class BuyerListViewTests(APITestCase):
             response = self.client.get(reverse('buyer-list'), {'cause_error': 'true'})
             self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
             self.assertEqual(response.data['responseCode'], status.HTTP_500_INTERNAL_SERVER_ERROR)
-            self.assertEqual(response.data['responseMessage'], 'Something went wrong! Please try again.')
\ No newline at end of file
+            self.assertEqual(response.data['responseMessage'], 'Something went wrong! Please try again.')
+
+
+class VendorOrderFixtures:
+
+    def setUp(self):
+        vendor_user = User.objects.create_user(
+            user_type='vendor',
+            name='Metrics Vendor',
+            email='metricsvendor@example.com',
+            password='vendorpassword123',
+            address='123 Vendor Street',
+            contact_details='1234567890'
+        )
+        buyer_user = User.objects.create_user(
+            user_type='buyer',
+            name='Metrics Buyer',
+            email='metricsbuyer@example.com',
+            password='buyerpassword123',
+            address='123 Buyer Street',
+            contact_details='1234567890'
+        )
+        self.vendor = Vendor.objects.create(user=vendor_user)
+        self.buyer = Buyer.objects.create(user=buyer_user, buyer_code='B_1_MTRC')
+        self.item = Items.objects.create(item_name='Widget', vendor=self.vendor, available_quantity=100)
+
+    def create_order(self, **kwargs):
+        return PurchaseOrder.objects.create(vendor=self.vendor, buyer=self.buyer, items=self.item, quantity=1, **kwargs)
+
+
+class VendorMetricsCalculationTests(VendorOrderFixtures, APITestCase):
+
+    def test_metrics_for_vendor_without_orders(self):
+        metrics = compute_vendor_metrics(self.vendor)
+        self.assertEqual(metrics, {
+            'on_time_delivery_rate': 0,
+            'quality_rating_avg': 0,
+            'average_response_time': 0,
+            'fulfillment_rate': 0,
+        })
+
+    def test_metrics_single_query(self):
+        now = timezone.now()
+        self.create_order(status='completed', quality_rating=4.0, delivery_date=now)
+        self.create_order(status='completed', quality_rating=2.0)
+        order = self.create_order()
+        PurchaseOrder.objects.filter(pk=order.pk).update(
+            issue_date=now - timedelta(hours=3), acknowledgment_date=now, status='acknowledged'
+        )
+        self.create_order()
+
+        with self.assertNumQueries(1):
+            metrics = compute_vendor_metrics(self.vendor)
+
+        self.assertEqual(metrics['fulfillment_rate'], 50.0)
+        self.assertEqual(metrics['on_time_delivery_rate'], 50.0)
+        self.assertEqual(metrics['quality_rating_avg'], 3.0)
+        self.assertAlmostEqual(metrics['average_response_time'], 3.0, places=3)
+
+    def test_update_vendor_metrics_persists_values(self):
+        self.create_order(status='completed', quality_rating=5.0, delivery_date=timezone.now())
+        self.create_order()
+
+        # aggregate, vendor update, latest snapshot lookup, snapshot insert
+        with self.assertNumQueries(4):
+            update_vendor_metrics(self.vendor)
+
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.fulfillment_rate, 50.0)
+        self.assertEqual(self.vendor.on_time_delivery_date, 100.0)
+        self.assertEqual(self.vendor.quality_rating_avg, 5.0)
+        self.assertEqual(self.vendor.historical_performance.latest('date').fulfillment_rate, 50.0)
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'ENABLED': False})
+class VendorMetricCountersTests(VendorOrderFixtures, APITestCase):
+
+    def assertCountersMatchOrders(self):
+        counters = VendorMetricCounters.objects.filter(vendor=self.vendor).values(*COUNTER_FIELDS).get()
+        expected = vendor_order_counts(self.vendor)
+        for field in COUNTER_FIELDS:
+            self.assertAlmostEqual(counters[field], expected[field], places=3, msg=field)
+
+    def test_counters_follow_order_lifecycle(self):
+        order = self.create_order()
+        self.assertCountersMatchOrders()
+
+        order.acknowledgment_date = timezone.now() + timedelta(hours=2)
+        order.status = 'acknowledged'
+        order.save()
+        self.assertCountersMatchOrders()
+
+        order.status = 'completed'
+        order.quality_rating = 4.5
+        order.delivery_date = timezone.now()
+        order.save()
+        self.assertCountersMatchOrders()
+
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.fulfillment_rate, 100.0)
+        self.assertEqual(self.vendor.quality_rating_avg, 4.5)
+        self.assertAlmostEqual(self.vendor.average_response_time, 2.0, places=2)
+
+        order.delete()
+        self.assertCountersMatchOrders()
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.fulfillment_rate, 0)
+
+    def test_counter_refresh_does_not_scan_orders(self):
+        order = self.create_order()
+        order.status = 'completed'
+        # locked read of the stored row, order update, lifetime/daily/rolling counter updates,
+        # counter read, vendor update, latest snapshot lookup, snapshot write
+        with self.assertNumQueries(9):
+            order.save(update_fields=['status'])
+        self.assertCountersMatchOrders()
+
+    def test_irrelevant_saves_cost_no_extra_queries(self):
+        order = self.create_order()
+        order.quantity = 5
+        with self.assertNumQueries(1):
+            order.save()
+        deferred = PurchaseOrder.objects.only('quantity').get(pk=order.pk)
+        deferred.quantity = 6
+        with self.assertNumQueries(1):
+            deferred.save()
+
+    def test_stale_instances_apply_each_change_once(self):
+        order = self.create_order(delivery_date=timezone.now())
+        first = PurchaseOrder.objects.get(pk=order.pk)
+        second = PurchaseOrder.objects.get(pk=order.pk)
+        for stale in (first, second):
+            stale.status = 'completed'
+            stale.quality_rating = 4.0
+            stale.save()
+        counters = VendorMetricCounters.objects.get(vendor=self.vendor)
+        self.assertEqual((counters.completed_orders, counters.quality_rating_sum), (1, 4.0))
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.fulfillment_rate, 100.0)
+        self.assertCountersMatchOrders()
+
+    def test_changes_are_detected_against_the_stored_row(self):
+        order = self.create_order(delivery_date=timezone.now())
+        stale = PurchaseOrder.objects.get(pk=order.pk)
+        order.status = 'completed'
+        order.quality_rating = 3.0
+        order.save()
+        Vendor.objects.filter(pk=self.vendor.pk).update(fulfillment_rate=42.0, quality_rating_avg=1.0)
+        # Only the rating differs from the stored row, so only its KPI is rewritten
+        stale.status = 'completed'
+        stale.quality_rating = 5.0
+        stale.save()
+        self.vendor.refresh_from_db()
+        self.assertEqual((self.vendor.quality_rating_avg, self.vendor.fulfillment_rate), (5.0, 42.0))
+        # Deleting a stale instance removes what the stored row contributed
+        other = self.create_order(delivery_date=timezone.now())
+        stale = PurchaseOrder.objects.get(pk=other.pk)
+        other.status = 'completed'
+        other.save()
+        stale.delete()
+        self.assertCountersMatchOrders()
+
+    def test_update_fields_is_respected(self):
+        order = self.create_order()
+        order.status = 'completed'
+        order.quantity = 2
+        order.save(update_fields=['quantity'])
+        self.assertCountersMatchOrders()
+        self.assertEqual(VendorMetricCounters.objects.get(vendor=self.vendor).completed_orders, 0)
+
+        order.save(update_fields=['status'])
+        self.assertCountersMatchOrders()
+
+    def test_only_affected_metrics_are_written(self):
+        order = self.create_order(status='completed', quality_rating=3.0)
+        Vendor.objects.filter(pk=self.vendor.pk).update(fulfillment_rate=42.0)
+        order.quality_rating = 5.0
+        order.save()
+        self.vendor.refresh_from_db()
+        self.assertEqual((self.vendor.quality_rating_avg, self.vendor.fulfillment_rate), (5.0, 42.0))
+
+    def test_affected_metrics(self):
+        self.assertEqual(affected_metrics({'quality_rating_sum': 1.5, 'total_orders': 0}), {'quality_rating_avg'})
+        self.assertEqual(affected_metrics(dict.fromkeys(COUNTER_FIELDS, 0)), set())
+        self.assertEqual(
+            affected_metrics({'completed_orders': 1}),
+            {'on_time_delivery_rate', 'quality_rating_avg', 'fulfillment_rate'},
+        )
+
+    def test_rebuild_vendor_counters_command(self):
+        self.create_order(status='completed', quality_rating=3.0)
+        self.create_order()
+        VendorMetricCounters.objects.filter(vendor=self.vendor).update(total_orders=99, completed_orders=0)
+
+        call_command('rebuild_vendor_counters', stdout=StringIO())
+        self.assertCountersMatchOrders()
+
+
+class CoalescingQueueTests(APITestCase):
+
+    def test_burst_for_one_key_runs_once(self):
+        calls = []
+        finished = threading.Event()
+
+        def job(key, scope):
+            calls.append(key)
+            finished.set()
+
+        queue = CoalescingQueue(job, debounce_seconds=0.2, workers=2)
+        for _ in range(500):
+            queue.schedule(7)
+        self.assertTrue(finished.wait(timeout=5))
+        time.sleep(0.3)
+        self.assertEqual(calls, [7])
+
+    def test_flush_runs_pending_keys_inline(self):
+        calls = []
+        queue = CoalescingQueue(lambda key, scope: calls.append((key, scope)), debounce_seconds=60, workers=1)
+        queue.schedule(1, {'fulfillment_rate'})
+        queue.schedule(2)
+        queue.schedule(1, {'quality_rating_avg'})
+        queue.flush()
+        self.assertEqual(sorted(calls), [(1, {'fulfillment_rate', 'quality_rating_avg'}), (2, None)])
+        self.assertEqual(queue.pending(), set())
+
+
+class VendorMetricQueueDispatchTests(VendorOrderFixtures, APITestCase):
+
+    def test_status_changes_schedule_after_commit(self):
+        order = self.create_order()
+        with self.captureOnCommitCallbacks() as callbacks:
+            for status_value in ('acknowledged', 'issued', 'completed'):
+                order.status = status_value
+                order.save()
+        self.assertEqual(len(callbacks), 1)  # only completion changes a counter
+
+        queue = get_metric_queue()
+        queue.debounce_seconds = 60
+        for callback in callbacks:
+            callback()
+        self.assertEqual(queue.pending(), {self.vendor.pk})
+        queue.flush()
+
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.fulfillment_rate, 100.0)
+
+
+class RebuildVendorMetricsTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        other_user = User.objects.create_user(
+            user_type='vendor',
+            name='Other Vendor',
+            email='othervendor@example.com',
+            password='vendorpassword123',
+            address='456 Vendor Street',
+            contact_details='1234567890'
+        )
+        self.other_vendor = Vendor.objects.create(user=other_user)
+
+    def test_rebuild_command_recomputes_every_vendor(self):
+        self.create_order(status='completed', quality_rating=4.0, delivery_date=timezone.now())
+        self.create_order()
+        Vendor.objects.update(fulfillment_rate=0, quality_rating_avg=0)
+        snapshots = HistoricalPerformanceVendor.objects.count()
+
+        call_command('rebuild_vendor_metrics', stdout=StringIO())
+
+        self.vendor.refresh_from_db()
+        self.other_vendor.refresh_from_db()
+        self.assertEqual(self.vendor.fulfillment_rate, 50.0)
+        self.assertEqual(self.vendor.quality_rating_avg, 4.0)
+        self.assertEqual(self.other_vendor.fulfillment_rate, 0)
+        self.assertEqual(HistoricalPerformanceVendor.objects.count(), snapshots + 2)
+        self.assertEqual(VendorMetricCounters.objects.get(vendor=self.other_vendor).total_orders, 0)
+
+    def test_rebuild_query_count_is_per_chunk(self):
+        self.create_order(status='completed')
+        # vendor ids, grouped aggregate, acknowledged orders for the sketches, latest snapshots,
+        # then savepoint, counters upsert, daily aggregate, daily delete + insert, rolling upsert,
+        # vendor bulk_update, snapshot insert and release for the chunk's transaction
+        with self.assertNumQueries(13):
+            rebuild_vendor_metrics(chunk_size=1000)
+
+
+class PerformanceSnapshotPolicyTests(VendorOrderFixtures, APITestCase):
+
+    metrics = {
+        'on_time_delivery_rate': 50.0,
+        'quality_rating_avg': 4.0,
+        'average_response_time': 1.5,
+        'fulfillment_rate': 50.0,
+    }
+
+    def history(self):
+        return list(self.vendor.historical_performance.order_by('date').values_list('date', 'fulfillment_rate'))
+
+    @override_settings(VENDOR_PERFORMANCE_SNAPSHOTS={'BUCKET': None, 'SKIP_UNCHANGED': True})
+    def test_unchanged_metrics_are_skipped(self):
+        now = datetime(2024, 5, 1, 10, 15, tzinfo=dt_timezone.utc)
+        self.assertEqual(record_performance_snapshot(self.vendor.pk, self.metrics, now), 'create')
+        self.assertEqual(record_performance_snapshot(self.vendor.pk, self.metrics, now + timedelta(hours=5)), 'skip')
+        self.assertEqual(len(self.history()), 1)
+
+    @override_settings(VENDOR_PERFORMANCE_SNAPSHOTS={'BUCKET': 'hour', 'SKIP_UNCHANGED': True})
+    def test_changes_within_a_bucket_upsert_one_row(self):
+        now = datetime(2024, 5, 1, 10, 15, tzinfo=dt_timezone.utc)
+        record_performance_snapshot(self.vendor.pk, self.metrics, now)
+        record_performance_snapshot(self.vendor.pk, {**self.metrics, 'fulfillment_rate': 60.0}, now + timedelta(minutes=30))
+        record_performance_snapshot(self.vendor.pk, {**self.metrics, 'fulfillment_rate': 70.0}, now + timedelta(hours=1))
+        self.assertEqual(self.history(), [
+            (datetime(2024, 5, 1, 10, tzinfo=dt_timezone.utc), 60.0),
+            (datetime(2024, 5, 1, 11, tzinfo=dt_timezone.utc), 70.0),
+        ])
+
+    def test_compact_command_buckets_existing_history(self):
+        start = datetime(2024, 5, 1, 10, 0, tzinfo=dt_timezone.utc)
+        for minutes, rate in ((5, 10.0), (20, 20.0), (50, 20.0), (70, 20.0), (130, 30.0)):
+            HistoricalPerformanceVendor.objects.create(
+                vendor=self.vendor, date=start + timedelta(minutes=minutes), **{**self.metrics, 'fulfillment_rate': rate}
+            )
+
+        call_command('compact_performance_history', bucket='hour', stdout=StringIO())
+
+        self.assertEqual(self.history(), [
+            (datetime(2024, 5, 1, 10, tzinfo=dt_timezone.utc), 20.0),
+            (datetime(2024, 5, 1, 12, tzinfo=dt_timezone.utc), 30.0),
+        ])
+
+
+class VendorPerformanceHistoryViewTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.vendor.user)
+        self.url = reverse('vendor-performance-history', kwargs={'vendor_id': self.vendor.pk})
+        start = datetime(2024, 5, 1, tzinfo=dt_timezone.utc)
+        for hours, rate in ((1, 10.0), (2, 30.0), (26, 50.0)):
+            HistoricalPerformanceVendor.objects.create(vendor=self.vendor, date=start + timedelta(hours=hours), fulfillment_rate=rate)
+
+    def test_daily_min_max_avg(self):
+        response = self.client.get(self.url, {'from': '2024-05-01T00:00:00Z', 'to': '2024-05-03T00:00:00Z', 'bucket': 'day'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        series = response.data['responseData']['series']
+        self.assertEqual(len(series), 2)
+        self.assertEqual(series[0]['samples'], 2)
+        self.assertEqual(series[0]['fulfillment_rate'], {'min': 10.0, 'max': 30.0, 'avg': 20.0})
+        self.assertEqual(series[1]['fulfillment_rate']['avg'], 50.0)
+
+    def test_invalid_bucket(self):
+        response = self.client.get(self.url, {'bucket': 'minute'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('bucket', response.data['responseMessage'])
+
+    def test_unknown_vendor(self):
+        response = self.client.get(reverse('vendor-performance-history', kwargs={'vendor_id': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_lttb_keeps_endpoints_and_extremes(self):
+        points = [(x, 0.0) for x in range(100)]
+        points[40] = (40, 100.0)
+        keep = largest_triangle_three_buckets(points, 10)
+        self.assertEqual(len(keep), 10)
+        self.assertEqual((keep[0], keep[-1]), (0, 99))
+        self.assertIn(40, keep)
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'ENABLED': False})
+class RollingVendorMetricsTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        self.create_order(status='completed')
+        old_order = self.create_order()
+        PurchaseOrder.objects.filter(pk=old_order.pk).update(order_date=timezone.now() - timedelta(days=60))
+        rebuild_vendor_counters([self.vendor.pk])
+
+    def test_windows_only_count_recent_orders(self):
+        self.assertEqual(rolling_vendor_metrics([self.vendor.pk], 30)[self.vendor.pk]['fulfillment_rate'], 100.0)
+        self.assertEqual(rolling_vendor_metrics([self.vendor.pk], 90)[self.vendor.pk]['fulfillment_rate'], 50.0)
+
+    def test_new_orders_update_windows_incrementally(self):
+        self.create_order()
+        self.assertEqual(rolling_vendor_metrics([self.vendor.pk], 30)[self.vendor.pk]['fulfillment_rate'], 50.0)
+        self.assertEqual(VendorRollingMetrics.objects.get(vendor=self.vendor, window_days=365).total_orders, 3)
+
+    def test_advancing_drops_orders_that_aged_out(self):
+        later = self.today + timedelta(days=40)
+        self.assertEqual(advance_rolling_windows([self.vendor.pk], today=later), 3)
+        window = VendorRollingMetrics.objects.get(vendor=self.vendor, window_days=90)
+        self.assertEqual(window.window_start, later - timedelta(days=89))
+        self.assertEqual((window.total_orders, window.completed_orders), (1, 1))
+        self.assertEqual(VendorRollingMetrics.objects.get(vendor=self.vendor, window_days=30).total_orders, 0)
+        # Already current: nothing left to move
+        self.assertEqual(advance_rolling_windows([self.vendor.pk], today=later), 0)
+
+    def test_empty_window_kpis_are_floats(self):
+        later = self.today + timedelta(days=400)
+        metrics = rolling_vendor_metrics([self.vendor.pk], 30, today=later)[self.vendor.pk]
+        self.assertEqual(metrics['fulfillment_rate'], 0.0)
+        self.assertTrue(all(isinstance(value, float) for value in metrics.values()))
+
+    def test_migration_builds_window_counters_of_existing_orders(self):
+        # Orders placed before the daily and rolling counters existed
+        VendorDailyMetricCounters.objects.all().delete()
+        VendorRollingMetrics.objects.all().delete()
+        migration = importlib.import_module('vendor_models.migrations.0015_rebuild_window_counters')
+        migration.rebuild_existing_window_counters(django_apps, None)
+        self.assertEqual(VendorDailyMetricCounters.objects.filter(vendor=self.vendor).count(), 2)
+        self.create_order()
+        self.assertEqual(VendorRollingMetrics.objects.get(vendor=self.vendor, window_days=90).total_orders, 3)
+        self.assertEqual(rolling_vendor_metrics([self.vendor.pk], 30)[self.vendor.pk]['fulfillment_rate'], 50.0)
+
+    def test_window_parameter_on_endpoints(self):
+        self.client.force_authenticate(user=self.vendor.user)
+        self.vendor.vendor_code = 'V_1_ROLL'
+        self.vendor.save()
+
+        response = self.client.get(reverse('vendor-detail', kwargs={'vendor_code': 'V_1_ROLL'}), {'window': 90})
+        self.assertEqual(response.data['responseData']['window'], 90)
+        self.assertEqual(response.data['responseData']['fulfillment_rate'], 50.0)
+
+        response = self.client.get(reverse('vendor-performance', kwargs={'vendor_id': self.vendor.pk}), {'window': 30})
+        self.assertEqual(response.data['responseData']['fulfillment_rate'], 100.0)
+
+        response = self.client.get(reverse('vendor-performance', kwargs={'vendor_id': self.vendor.pk}), {'window': 7})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RankingIndexTests(APITestCase):
+
+    def test_rank_percentile_and_ties(self):
+        index = RankingIndex(higher_is_better=True)
+        for vendor_id, value in ((1, 90.0), (2, 70.0), (3, 90.0), (4, 50.0)):
+            index.update(vendor_id, value)
+        self.assertEqual([index.rank(vendor_id) for vendor_id in (1, 2, 3, 4)], [1, 3, 1, 4])
+        self.assertEqual(index.percentile(1), 100.0)
+        self.assertEqual(index.percentile(4), 25.0)
+        self.assertEqual(index.top(3), [(1, 1, 90.0), (1, 3, 90.0), (3, 2, 70.0)])
+
+        index.update(4, 95.0)
+        self.assertEqual(index.rank(4), 1)
+        self.assertEqual(index.rank(1), 2)
+        index.remove(4)
+        self.assertEqual((len(index), index.rank(2)), (3, 3))
+
+    def test_lower_is_better(self):
+        index = RankingIndex(higher_is_better=False)
+        index.update(1, 5.0)
+        index.update(2, 1.5)
+        self.assertEqual(index.top(1), [(1, 2, 1.5)])
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'ENABLED': False})
+class VendorLeaderboardViewTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        vendor_leaderboard.invalidate()
+        self.addCleanup(vendor_leaderboard.invalidate)
+        self.client.force_authenticate(user=self.vendor.user)
+        other_user = User.objects.create_user(
+            user_type='vendor', name='Other Vendor', email='othervendor@example.com', password='vendorpassword123',
+            address='1 Other Street', contact_details='1234567890',
+        )
+        self.other = Vendor.objects.create(user=other_user, fulfillment_rate=50.0)
+
+    def test_top_vendors(self):
+        response = self.client.get(reverse('vendor-leaderboard'), {'metric': 'fulfillment_rate', 'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['responseData']['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual((results[0]['vendor_id'], results[0]['rank'], results[0]['name']), (self.other.pk, 1, 'Other Vendor'))
+
+    def test_rank_follows_metric_updates(self):
+        url = reverse('vendor-rank', kwargs={'vendor_id': self.vendor.pk})
+        response = self.client.get(url, {'metric': 'fulfillment_rate'})
+        self.assertEqual(response.data['responseData']['metrics']['fulfillment_rate']['rank'], 2)
+        self.assertEqual(response.data['responseData']['ranked_vendors'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_order(status='completed')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        standing = response.data['responseData']['metrics']['fulfillment_rate']
+        self.assertEqual((standing['rank'], standing['percentile'], standing['value']), (1, 100.0, 100.0))
+
+    def test_unknown_vendor_and_metric(self):
+        response = self.client.get(reverse('vendor-rank', kwargs={'vendor_id': 9999}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('vendor-leaderboard'), {'metric': 'price'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DDSketchTests(APITestCase):
+
+    def test_quantiles_within_relative_accuracy(self):
+        sketch = DDSketch(relative_accuracy=0.01)
+        values = [float(value) for value in range(1, 10001)]
+        for value in values:
+            sketch.add(value)
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertLessEqual(abs(sketch.quantile(q) - exact) / exact, 0.01)
+
+    def test_remove_merge_and_round_trip(self):
+        first, second = DDSketch(), DDSketch()
+        for value in (10.0, 20.0, 30.0):
+            first.add(value)
+        second.add(1000.0)
+        second.add(0)
+        first.merge(second)
+        first.remove(1000.0)
+        restored = DDSketch.from_bytes(first.to_bytes())
+        self.assertEqual((restored.count, restored.zero_count), (4, 1))
+        self.assertAlmostEqual(restored.quantile(1.0), 30.0, delta=0.3)
+        self.assertEqual(DDSketch().quantile(0.5), None)
+
+    def test_folding_keeps_the_bin_limit(self):
+        sketch = DDSketch(max_bins=8)
+        for value in range(1, 1000):
+            sketch.add(float(value))
+        self.assertLessEqual(len(sketch.bins), 8)
+        self.assertEqual(sketch.count, 999)
+        self.assertAlmostEqual(sketch.quantile(1.0), 999.0, delta=10.0)
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'ENABLED': False})
+class ResponseTimePercentileTests(VendorOrderFixtures, APITestCase):
+
+    def acknowledge(self, order, hours):
+        order.acknowledgment_date = order.issue_date + timedelta(hours=hours)
+        order.save()
+
+    def test_sketch_follows_acknowledgements(self):
+        orders = [self.create_order() for _ in range(4)]
+        for order, hours in zip(orders, (1, 2, 3, 40)):
+            self.acknowledge(order, hours)
+        percentiles = response_time_percentiles(self.vendor.pk)
+        self.assertAlmostEqual(percentiles['p50'], 2.0, delta=0.05)
+        self.assertAlmostEqual(percentiles['p99'], 3.0, delta=0.05)
+
+        # Re-acknowledging replaces the old sample instead of adding another one
+        self.acknowledge(orders[0], 50)
+        self.assertAlmostEqual(response_time_percentiles(self.vendor.pk)['p99'], 40.0, delta=0.5)
+        self.assertAlmostEqual(response_time_percentiles(self.vendor.pk, window=30)['p99'], 40.0, delta=0.5)
+
+        incremental = VendorMetricCounters.objects.get(vendor=self.vendor).response_time_sketch
+        rebuild_vendor_counters([self.vendor.pk])
+        rebuilt = VendorMetricCounters.objects.get(vendor=self.vendor).response_time_sketch
+        self.assertEqual(bytes(incremental), bytes(rebuilt))
+
+    def test_missing_sketch_is_rebuilt_from_orders(self):
+        orders = [self.create_order() for _ in range(4)]
+        for order, hours in zip(orders, (1, 2, 3, 40)):
+            self.acknowledge(order, hours)
+        # Counters written before the sketches existed
+        VendorMetricCounters.objects.filter(vendor=self.vendor).update(response_time_sketch=None)
+        VendorDailyMetricCounters.objects.filter(vendor=self.vendor).update(response_time_sketch=None)
+
+        self.acknowledge(orders[0], 50)
+        percentiles = response_time_percentiles(self.vendor.pk)
+        self.assertAlmostEqual(percentiles['p50'], 3.0, delta=0.05)
+        self.assertAlmostEqual(percentiles['p99'], 40.0, delta=0.5)
+        incremental = VendorMetricCounters.objects.get(vendor=self.vendor).response_time_sketch
+        rebuild_vendor_counters([self.vendor.pk])
+        rebuilt = VendorMetricCounters.objects.get(vendor=self.vendor).response_time_sketch
+        self.assertEqual(bytes(incremental), bytes(rebuilt))
+        self.assertAlmostEqual(response_time_percentiles(self.vendor.pk, window=30)['p99'], 40.0, delta=0.5)
+
+    def test_served_from_performance_view(self):
+        self.acknowledge(self.create_order(), 5)
+        self.client.force_authenticate(user=self.vendor.user)
+        response = self.client.get(reverse('vendor-performance', kwargs={'vendor_id': self.vendor.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertAlmostEqual(response.data['responseData']['response_time_percentiles']['p95'], 5.0, delta=0.05)
+
+    def test_no_acknowledged_orders(self):
+        self.create_order()
+        self.assertEqual(response_time_percentiles(self.vendor.pk), {'p50': None, 'p95': None, 'p99': None})
+
+
+class PurchaseOrderReadPathTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.buyer.user)
+        for _ in range(12):
+            self.create_order()
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        url = reverse('purchase-order-list')
+        # profile lookup, page count, page rows
+        for page_size in (4, 12):
+            with self.assertNumQueries(3):
+                response = self.client.get(url, {'page_size': page_size})
+            self.assertEqual(len(response.data['results']), page_size)
+
+    def test_list_matches_write_serializer_output(self):
+        response = self.client.get(reverse('purchase-order-list'), {'page_size': 1})
+        order = PurchaseOrder.objects.get(po_number=response.data['results'][0]['po_number'])
+        expected = PurchaseOrderSerializer(order).data
+        self.assertEqual(dict(response.data['results'][0]), dict(expected))
+
+    def test_vendor_sees_received_orders(self):
+        self.client.force_authenticate(user=self.vendor.user)
+        response = self.client.get(reverse('purchase-order-list'), {'page_size': 20})
+        self.assertEqual(response.data['count'], 12)
+        response = self.client.get(reverse('purchase-order-list'), {'name': 'nobody'})
+        self.assertEqual(response.data['responseData'], [])
+
+    def test_detail(self):
+        order = PurchaseOrder.objects.first()
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('purchase-order-detail', kwargs={'po_number': order.po_number}))
+        self.assertEqual(response.data['responseData']['items'], self.item.pk)
+
+
+class KeysetPaginationTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.buyer.user)
+        for _ in range(12):
+            self.create_order()
+        # Ties on order_date must be broken by id
+        PurchaseOrder.objects.filter(pk__in=PurchaseOrder.objects.values('pk')[:6]).update(order_date=timezone.now())
+
+    def test_walks_every_purchase_order_once(self):
+        url = reverse('purchase-order-list')
+        params = {'pagination': 'cursor', 'page_size': 5}
+        seen = []
+        while url:
+            # profile lookup and one seek for the page; no count, no offset
+            with self.assertNumQueries(2):
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            seen += [row['po_number'] for row in response.data['results']]
+            url, params = response.data['next'], None
+
+        expected = list(PurchaseOrder.objects.order_by('-order_date', '-id').values_list('po_number', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_vendor_and_buyer_lists(self):
+        response = self.client.get(reverse('vendor-list'), {'pagination': 'cursor', 'page_size': 1})
+        self.assertEqual(response.data['results']['responseCode'], status.HTTP_200_OK)
+        self.assertIsNone(response.data['next'])
+        response = self.client.get(reverse('buyer-list'), {'pagination': 'cursor'})
+        self.assertEqual(len(response.data['results']['responseData']), 1)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('purchase-order-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cursor', response.data['responseData'])
+
+
+class PurchaseOrderIndexTests(VendorOrderFixtures, APITestCase):
+
+    def assertUsesIndex(self, queryset, index=None):
+        plan = queryset.explain()
+        self.assertNotRegex(plan, r'SCAN vendor_models_purchaseorder(?! USING)', plan)
+        self.assertRegex(plan, r'SEARCH vendor_models_purchaseorder USING (COVERING )?INDEX', plan)
+        if index:
+            self.assertIn(index, plan)
+
+    def test_metric_aggregates(self):
+        per_vendor = PurchaseOrder.objects.filter(vendor_id__in=[self.vendor.pk]).order_by().values('vendor_id')
+        self.assertUsesIndex(per_vendor.annotate(**vendor_metric_aggregates()), 'COVERING INDEX po_vendor_metrics_idx')
+        per_day = per_vendor.annotate(day=TruncDate('order_date')).values('vendor_id', 'day')
+        self.assertUsesIndex(per_day.annotate(**vendor_metric_aggregates()), 'COVERING INDEX po_vendor_metrics_idx')
+        self.assertUsesIndex(PurchaseOrder.objects.filter(vendor=self.vendor, status='completed'), 'po_vendor_metrics_idx')
+
+    def test_acknowledged_orders_use_partial_index(self):
+        acknowledged = PurchaseOrder.objects.filter(vendor_id__in=[self.vendor.pk], acknowledgment_date__isnull=False)
+        self.assertUsesIndex(
+            acknowledged.order_by().values('vendor_id', 'order_date', 'issue_date', 'acknowledgment_date'),
+            'COVERING INDEX po_vendor_acknowledged_idx',
+        )
+
+    def test_list_filters(self):
+        profiles = resolve_user_profiles(self.buyer.user)
+        now = timezone.now()
+        self.assertUsesIndex(purchase_order_read_queryset(profiles).order_by('-order_date', '-id'), 'po_buyer_order_date_idx')
+        for filters in (
+            {'status': 'completed'},
+            {'order_date_from': now - timedelta(days=7), 'order_date_to': now},
+            {'delivery_date_from': now - timedelta(days=7)},
+            {'item': self.item.pk},
+        ):
+            self.assertUsesIndex(purchase_order_read_queryset(profiles, filters=filters).order_by('-order_date', '-id'))
+
+    def test_list_endpoint_filters(self):
+        self.client.force_authenticate(user=self.buyer.user)
+        self.create_order(status='completed', delivery_date=timezone.now())
+        self.create_order()
+        url = reverse('purchase-order-list')
+        response = self.client.get(url, {'status': 'completed'})
+        self.assertEqual([row['status'] for row in response.data['results']], ['completed'])
+        response = self.client.get(url, {'delivery_date_from': (timezone.now() - timedelta(days=1)).isoformat()})
+        self.assertEqual(response.data['count'], 1)
+        response = self.client.get(url, {'item': self.item.pk, 'order_date_to': (timezone.now() + timedelta(days=1)).isoformat()})
+        self.assertEqual(response.data['count'], 2)
+        response = self.client.get(url, {'status': 'lost'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'ENABLED': False})
+class PurchaseOrderBulkCreateTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.vendor.vendor_code = 'V_1_BULK'
+        self.vendor.save()
+        self.client.force_authenticate(user=self.buyer.user)
+        self.url = reverse('purchase-order-bulk-create')
+
+    def order(self, **kwargs):
+        return {'vendor_code': 'V_1_BULK', 'items': self.item.pk, 'quantity': 1, **kwargs}
+
+    def test_valid_rows_are_created_and_errors_reported(self):
+        orders = [
+            self.order(status='completed'),
+            self.order(vendor_code='V_404'),
+            self.order(quantity=0),
+            self.order(items=999999),
+            self.order(),
+        ]
+        response = self.client.post(self.url, {'orders': orders}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.data['responseData']
+        self.assertEqual(len(data['created']), 2)
+        self.assertEqual([error['index'] for error in data['errors']], [1, 2, 3])
+        self.assertIn('vendor_code', data['errors'][0]['errors'])
+        self.assertIn('items', data['errors'][2]['errors'])
+
+        counters = VendorMetricCounters.objects.get(vendor=self.vendor)
+        self.assertEqual((counters.total_orders, counters.completed_orders), (2, 1))
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.fulfillment_rate, 50.0)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        self.client.post(self.url, {'orders': [self.order()]}, format='json')
+        query_counts = []
+        for size in (2, 40):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, {'orders': [self.order() for _ in range(size)]}, format='json')
+            self.assertEqual(len(response.data['responseData']['created']), size)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_all_rows_invalid(self):
+        response = self.client.post(self.url, {'orders': [self.order(vendor_code='V_404')]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {'orders': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'ENABLED': False})
+class BulkPurchaseOrderTransitionTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.vendor.user)
+        self.url = reverse('bulk-purchase-order-transition')
+
+    def test_transition_skips_ineligible_and_unknown_ids(self):
+        pending = [self.create_order() for _ in range(3)]
+        done = self.create_order(status='completed')
+        ids = [order.pk for order in pending] + [done.pk, 999999]
+        response = self.client.post(self.url, {'transition': 'acknowledge', 'ids': ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['responseData']
+        self.assertEqual(data['updated'], sorted(order.pk for order in pending))
+        self.assertEqual([row['id'] for row in data['skipped']], [done.pk, 999999])
+
+        self.assertEqual(PurchaseOrder.objects.filter(status='acknowledged', acknowledgment_date__isnull=False).count(), 3)
+        self.assertEqual(VendorMetricCounters.objects.get(vendor=self.vendor).acknowledged_orders, 3)
+
+        response = self.client.post(self.url, {'transition': 'complete', 'ids': ids}, format='json')
+        self.assertEqual(len(response.data['responseData']['updated']), 3)
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.fulfillment_rate, 100.0)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        self.create_order()
+        query_counts = []
+        for size in (2, 30):
+            ids = [self.create_order().pk for _ in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, {'transition': 'cancel', 'ids': ids}, format='json')
+            self.assertEqual(len(response.data['responseData']['updated']), size)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_other_users_orders_are_not_visible(self):
+        order = self.create_order()
+        self.client.force_authenticate(user=User.objects.create_user(
+            user_type='vendor', name='Stranger', email='stranger@example.com', password='vendorpassword123',
+            address='1 Street', contact_details='1234567890',
+        ))
+        Vendor.objects.create(user=User.objects.get(email='stranger@example.com'))
+        response = self.client.post(self.url, {'transition': 'cancel', 'ids': [order.pk]}, format='json')
+        self.assertEqual(response.data['responseData']['updated'], [])
+        self.assertEqual(self.client.post(self.url, {'transition': 'reopen', 'ids': [1]}, format='json').status_code, 400)
+
+
+class InventoryReservationTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.vendor.vendor_code = 'V_1_STCK'
+        self.vendor.save()
+
+    def test_reserve_never_oversells(self):
+        reserve_stock(self.item.pk, 60)
+        with self.assertRaises(OutOfStock):
+            reserve_stock(self.item.pk, 41)
+        reserve_stock(self.item.pk, 40)
+        self.assertEqual(available_stock(self.item.pk), 0)
+        release_stock(self.item.pk, 5)
+        self.assertEqual(available_stock(self.item.pk), 5)
+
+    def test_create_reserves_and_cancel_releases(self):
+        self.client.force_authenticate(user=self.buyer.user)
+        url = reverse('purchase-order-create')
+        order = {'vendor_code': 'V_1_STCK', 'items': self.item.pk, 'quantity': 70, 'delivery_date': '2030-01-01T00:00:00Z'}
+        response = self.client.post(url, order, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(available_stock(self.item.pk), 30)
+
+        response = self.client.post(url, order, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('quantity', response.data['responseMessage'])
+        self.assertEqual(PurchaseOrder.objects.count(), 1)
+
+        purchase_order = PurchaseOrder.objects.get()
+        self.client.post(reverse('cancel-purchase-order', args=[purchase_order.pk]))
+        self.assertEqual(PurchaseOrder.objects.get().status, 'canceled')
+        self.assertEqual(available_stock(self.item.pk), 100)
+
+    def test_cancel_releases_only_the_reserved_stock(self):
+        self.client.force_authenticate(user=self.buyer.user)
+        # Created without going through the API, so no stock was reserved for it
+        unreserved = self.create_order()
+        self.client.post(reverse('cancel-purchase-order', args=[unreserved.pk]))
+        self.assertEqual(available_stock(self.item.pk), 100)
+
+        order = {'vendor_code': 'V_1_STCK', 'items': self.item.pk, 'quantity': 10, 'delivery_date': '2030-01-01T00:00:00Z'}
+        self.client.post(reverse('purchase-order-create'), order, format='json')
+        purchase_order = PurchaseOrder.objects.exclude(pk=unreserved.pk).get()
+        self.assertEqual(available_stock(self.item.pk), 90)
+        self.client.post(reverse('cancel-purchase-order', args=[purchase_order.pk]))
+        self.assertEqual(available_stock(self.item.pk), 100)
+        self.assertFalse(StockReservation.objects.exists())
+
+        response = self.client.post(reverse('acknowledge-purchase-order', args=[purchase_order.pk]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PurchaseOrder.objects.get(pk=purchase_order.pk).status, 'canceled')
+        # Reopened outside the API, a second cancel has nothing left to release
+        PurchaseOrder.objects.filter(pk=purchase_order.pk).update(status='acknowledged')
+        self.client.post(reverse('cancel-purchase-order', args=[purchase_order.pk]))
+        self.assertEqual(available_stock(self.item.pk), 100)
+
+    def test_edit_and_delete_move_the_reserved_stock(self):
+        self.client.force_authenticate(user=self.buyer.user)
+        order = {'vendor_code': 'V_1_STCK', 'items': self.item.pk, 'quantity': 10, 'delivery_date': '2030-01-01T00:00:00Z'}
+        self.client.post(reverse('purchase-order-create'), order, format='json')
+        purchase_order = PurchaseOrder.objects.get()
+        url = reverse('purchase-order-update', args=[purchase_order.po_number])
+
+        response = self.client.put(url, {'vendor_code': 'V_1_STCK', 'quantity': 50}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(available_stock(self.item.pk), 50)
+        self.assertEqual(StockReservation.objects.get().quantity, 50)
+        response = self.client.put(url, {'vendor_code': 'V_1_STCK', 'quantity': 120}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PurchaseOrder.objects.get().quantity, 50)
+        self.client.put(url, {'vendor_code': 'V_1_STCK', 'quantity': 5}, format='json')
+        self.assertEqual(available_stock(self.item.pk), 95)
+
+        other = Items.objects.create(item_name='Other', vendor=self.vendor, available_quantity=20)
+        self.client.put(url, {'vendor_code': 'V_1_STCK', 'items': other.pk}, format='json')
+        self.assertEqual((available_stock(self.item.pk), available_stock(other.pk)), (100, 15))
+        self.assertEqual(StockReservation.objects.get().item_id, other.pk)
+
+        self.client.delete(reverse('purchase-order-delete', args=[purchase_order.po_number]))
+        self.assertFalse(PurchaseOrder.objects.exists())
+        self.assertEqual(available_stock(other.pk), 20)
+
+    def test_bulk_create_rejects_rows_beyond_stock(self):
+        self.client.force_authenticate(user=self.buyer.user)
+        orders = [{'vendor_code': 'V_1_STCK', 'items': self.item.pk, 'quantity': 40} for _ in range(3)]
+        response = self.client.post(reverse('purchase-order-bulk-create'), {'orders': orders}, format='json')
+        data = response.data['responseData']
+        self.assertEqual(len(data['created']), 2)
+        self.assertEqual([error['index'] for error in data['errors']], [2])
+        self.assertEqual(available_stock(self.item.pk), 20)
+
+        self.client.force_authenticate(user=self.vendor.user)
+        ids = list(PurchaseOrder.objects.values_list('pk', flat=True))
+        self.client.post(reverse('bulk-purchase-order-transition'), {'transition': 'cancel', 'ids': ids}, format='json')
+        self.assertEqual(available_stock(self.item.pk), 100)
+
+    def test_bulk_cancel_releases_only_the_reserved_stock(self):
+        # Created without going through the API, so no stock was reserved for them
+        ids = [self.create_order().pk for _ in range(3)]
+        self.client.force_authenticate(user=self.vendor.user)
+        url = reverse('bulk-purchase-order-transition')
+        self.client.post(url, {'transition': 'cancel', 'ids': ids}, format='json')
+        self.assertEqual(available_stock(self.item.pk), 100)
+
+        PurchaseOrder.objects.filter(pk__in=ids).update(status='pending')
+        response = self.client.post(url, {'transition': 'cancel', 'ids': ids}, format='json')
+        self.assertEqual(response.data['responseData']['updated'], sorted(ids))
+        self.assertEqual(available_stock(self.item.pk), 100)
+
+    def test_sharded_stock(self):
+        self.assertEqual(set_stock_shards(self.item.pk, 4), 100)
+        self.assertEqual(list(self.item.shards.order_by('shard').values_list('available_quantity', flat=True)), [25] * 4)
+        reserve_stock(self.item.pk, 20)
+        # No single shard holds 70 any more; the reservation spans several of them
+        reserve_stock(self.item.pk, 70)
+        with self.assertRaises(OutOfStock):
+            reserve_stock(self.item.pk, 11)
+        release_stock(self.item.pk, 10)
+        self.assertEqual(available_stock(self.item.pk), 20)
+
+        call_command('shard_item_stock', item=self.item.pk, shards=0, stdout=StringIO())
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.stock_shards, self.item.available_quantity), (0, 20))
+        self.assertFalse(self.item.shards.exists())
+
+
+class PurchaseOrderExportTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.buyer.user)
+        self.url = reverse('purchase-order-export')
+        self.orders = [self.create_order() for _ in range(3)] + [self.create_order(status='completed')]
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b''.join(response.streaming_content)
+
+    def test_ndjson_export(self):
+        response, content = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [order.pk for order in self.orders])
+        self.assertEqual(rows[0]['vendor'], self.vendor.pk)
+        self.assertEqual(rows[0]['po_number'], str(self.orders[0].po_number))
+
+    def test_csv_export_with_filters_and_gzip(self):
+        response, content = self.export(file_format='csv', gzip='true', status='completed', vendor=self.vendor.pk)
+        self.assertIn('purchase-orders.csv.gz', response['Content-Disposition'])
+        rows = list(csv.DictReader(gzip.decompress(content).decode().splitlines()))
+        self.assertEqual([int(row['id']) for row in rows], [self.orders[-1].pk])
+        self.assertEqual(rows[0]['quality_rating'], '')
+
+        self.assertEqual(self.client.get(self.url, {'file_format': 'xml'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'orders.ndjson.gz')
+            call_command('export_purchase_orders', output=path, gzip=True, status='pending')
+            with gzip.open(path, 'rt') as export:
+                rows = [json.loads(line) for line in export]
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(all(row['status'] == 'pending' for row in rows))
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'ENABLED': False})
+class ConditionalGetTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.vendor.vendor_code = 'V_1_COND'
+        self.vendor.save()
+        self.client.force_authenticate(user=self.buyer.user)
+        self.order = self.create_order()
+
+    def test_purchase_order_detail(self):
+        url = reverse('purchase-order-detail', args=[self.order.po_number])
+        response = self.client.get(url)
+        etag = response['ETag']
+        # profile lookup and the order row; no serialization
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        self.order.quantity = 2
+        self.order.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_vendor_detail_and_performance(self):
+        url = reverse('vendor-detail', args=['V_1_COND'])
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        url = reverse('vendor-performance', args=[self.vendor.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.client.force_authenticate(user=self.vendor.user)
+        self.client.post(reverse('acknowledge-purchase-order', args=[self.order.pk]))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_list_page(self):
+        url = reverse('purchase-order-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        # A page depends on the other pages' rows through the count
+        self.create_order()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(user=self.vendor.user)
+        self.client.post(reverse('bulk-purchase-order-transition'), {'transition': 'cancel', 'ids': [self.order.pk]}, format='json')
+        self.client.force_authenticate(user=self.buyer.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'ENABLED': False})
+class VendorResponseCacheTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        vendor_response_cache.clear_local()
+        super().setUp()
+        self.vendor.vendor_code = 'V_1_CACH'
+        self.vendor.save()
+        self.client.force_authenticate(user=self.buyer.user)
+
+    @override_settings(VENDOR_RESPONSE_CACHE={'LOCAL_MAX_ENTRIES': 2})
+    def test_local_tier_is_bounded(self):
+        response_cache = ResponseCache('test')
+        for key in 'abc':
+            response_cache.set(key, key.upper())
+        self.assertEqual(response_cache.snapshot()['local_entries'], 2)
+        # Evicted locally, still served by the shared tier
+        self.assertEqual(response_cache.get('a'), 'A')
+        self.assertEqual(response_cache.get('c'), 'C')
+        self.assertIsNone(response_cache.get('d'))
+        stats = response_cache.snapshot()
+        self.assertEqual((stats['local_hits'], stats['shared_hits'], stats['misses']), (1, 1, 1))
+
+    def test_vendor_detail_is_served_from_cache_until_changed(self):
+        url = reverse('vendor-detail', args=['V_1_CACH'])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['responseData']['user']['name'], 'Metrics Vendor')
+
+        self.client.force_authenticate(user=self.vendor.user)
+        self.client.put(reverse('vendor-update', args=['V_1_CACH']), {'name': 'Renamed Vendor'}, format='json')
+        response = self.client.get(url)
+        self.assertEqual(response.data['responseData']['user']['name'], 'Renamed Vendor')
+
+        # Any save of the vendor's user, not only the update view's
+        self.vendor.user.contact_details = '5550001111'
+        self.vendor.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['responseData']['user']['contact_details'], '5550001111')
+
+    def test_cached_validators_are_per_user_and_query(self):
+        url = reverse('vendor-detail', args=['V_1_CACH'])
+        buyer_etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(user=self.vendor.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=buyer_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        vendor_etag = response['ETag']
+        self.assertNotEqual(vendor_etag, buyer_etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=vendor_etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # The same parameters in another order share an entry; other parameters do not
+        performance = reverse('vendor-performance', args=[self.vendor.pk])
+        first = self.client.get(performance, {'window': 30, 'fields': 'all'})['ETag']
+        with self.assertNumQueries(0):
+            self.client.get(f'{performance}?fields=all&window=30')
+        self.assertNotEqual(self.client.get(performance, {'window': 30})['ETag'], first)
+
+    def test_performance_is_invalidated_by_history_compaction(self):
+        start = datetime(2024, 5, 1, 10, 0, tzinfo=dt_timezone.utc)
+        for minutes in (5, 20):
+            HistoricalPerformanceVendor.objects.create(
+                vendor=self.vendor, date=start + timedelta(minutes=minutes), on_time_delivery_rate=0.0,
+                quality_rating_avg=0.0, average_response_time=0.0, fulfillment_rate=float(minutes),
+            )
+        url = reverse('vendor-performance', args=[self.vendor.pk])
+        etag = self.client.get(url)['ETag']
+
+        call_command('compact_performance_history', bucket='hour', stdout=StringIO())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['responseData']['date'], '2024-05-01T10:00:00Z')
+
+    def test_performance_is_invalidated_by_metric_updates(self):
+        url = reverse('vendor-performance', args=[self.vendor.pk])
+        self.create_order(status='completed')
+        self.assertEqual(self.client.get(url).data['responseData']['fulfillment_rate'], 100.0)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        self.create_order(status='canceled')
+        self.assertEqual(self.client.get(url).data['responseData']['fulfillment_rate'], 50.0)
+        stats = self.client.get(reverse('vendor-cache-stats')).data['responseData']
+        self.assertGreater(stats['invalidations'], 0)
+
+
+class UserSearchIndexTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=self.buyer.user)
+
+    def vendor_names(self, **params):
+        response = self.client.get(reverse('vendor-list'), {'page_size': 50, **params})
+        return sorted(vendor['user']['name'] for vendor in response.data['results']['responseData'])
+
+    def test_filters_use_the_index(self):
+        self.assertTrue(user_search_index_available())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.vendor_names(name='ETRICS VEN'), ['Metrics Vendor'])
+        self.assertTrue(any('MATCH' in query['sql'] for query in queries.captured_queries))
+        # Short terms and several fields at once
+        self.assertEqual(self.vendor_names(name='cs', address='Vendor Str'), ['Metrics Vendor'])
+        self.assertEqual(self.vendor_names(email='nobody'), [])
+
+    def test_index_follows_writes(self):
+        user = self.vendor.user
+        user.name = 'Quartz "Supplies"'
+        user.save()
+        self.assertEqual(self.vendor_names(name='"supp'), ['Quartz "Supplies"'])
+        self.assertEqual(self.vendor_names(name='Metrics'), [])
+        self.assertEqual(
+            list(search_users(Buyer.objects.all(), 'user', {'name': 'rics buy'})), [self.buyer]
+        )
+        self.buyer.user.delete()
+        self.assertFalse(search_users(Buyer.objects.all(), 'user', {'name': 'rics buy'}).exists())
+
+
+class ClaimsAuthenticationTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        principal_cache.clear()
+        response = self.client.post(reverse('login'), {'email': 'metricsbuyer@example.com', 'password': 'buyerpassword123'}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['responseData']['access']}")
+        self.create_order()
+
+    def test_authenticated_get_needs_no_user_queries(self):
+        url = reverse('purchase-order-list')
+        params = {'pagination': 'cursor'}
+        # The first request confirms the user is active; the token carries the profile ids
+        with self.assertNumQueries(2):
+            self.client.get(url, params)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_deactivated_user_is_rejected(self):
+        url = reverse('purchase-order-list')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        user = self.buyer.user
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_model_attributes_and_plain_tokens(self):
+        # Views that need the full user load it on demand
+        response = self.client.post(reverse('purchase-order-create'), {
+            'vendor_code': self.vendor.vendor_code, 'items': self.item.pk, 'quantity': 1, 'delivery_date': '2030-01-01T00:00:00Z',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # Tokens issued without the claims still authenticate by loading the user
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.buyer.user).access_token}')
+        response = self.client.get(reverse('purchase-order-list'))
+        self.assertEqual(response.data['count'], 2)
+
+
+class ApiSchemaTests(APITestCase):
+
+    def setUp(self):
+        schema_document.clear()
+        self.addCleanup(schema_document.clear)
+
+    def test_build_openapi_writes_annotated_document(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'openapi.json')
+            call_command('build_openapi', output=path, stdout=StringIO())
+            with open(path) as document:
+                schema = json.load(document)
+        parameters = {parameter['name'] for parameter in schema['paths']['/vendors/']['get']['parameters']}
+        self.assertTrue({'Authorization', 'name', 'page_size'} <= parameters)
+
+    def test_schema_file_is_served_with_long_lived_caching(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'openapi.json')
+            with open(path, 'wb') as document:
+                document.write(b'{"swagger": "2.0"}')
+            with override_settings(API_DOCS={'SCHEMA_FILE': path, 'MAX_AGE': 3600}):
+                response = self.client.get(reverse('openapi-schema'))
+                self.assertEqual(response.content, b'{"swagger": "2.0"}')
+                self.assertIn('max-age=3600', response['Cache-Control'])
+                response = self.client.get(reverse('openapi-schema'), HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_deferred_annotations_materialize_to_drf_yasg_objects(self):
+        from drf_yasg import openapi as yasg_openapi
+        parameter = materialize(openapi.Parameter('name', openapi.IN_QUERY, type=openapi.TYPE_STRING))
+        self.assertIsInstance(parameter, yasg_openapi.Parameter)
+        self.assertEqual((parameter['in'], parameter['type']), ('query', 'string'))
+
+
+class StartupProfileTests(SimpleTestCase):
+
+    def test_fresh_worker_profile(self):
+        # The time budget itself is checked by `startup_report --budget` in CI, not here
+        profile = measure_startup('/apis/vendors/', env={'API_DOCS_ENABLED': '0'})
+        self.assertEqual(profile.status, '401 Unauthorized')
+        self.assertGreater(profile.setup, 0)
+        self.assertGreater(profile.first_response, 0)
+        self.assertGreaterEqual(profile.wall, profile.setup + profile.first_response)
+        self.assertIn('apis.views', {row.module for row in profile.imports})
+        # Optional subsystems stay unloaded in a worker that does not need them
+        modules = {row.module for row in profile.imports}
+        self.assertNotIn('drf_yasg', modules)
+        self.assertNotIn('pkg_resources', modules)
+
+
+@override_settings(VENDOR_METRICS_QUEUE={'ENABLED': False})
+class CompiledSerializerTests(VendorOrderFixtures, APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.create_order(status='completed', quality_rating=4.5, delivery_date=now, acknowledgment_date=now - timedelta(hours=2), issue_date=now - timedelta(days=1))
+        self.create_order(status='pending', delivery_date=now + timedelta(days=3))
+        self.create_order(status='canceled', delivery_date=now)
+
+    def assert_parity(self, serializer_class, queryset):
+        compiled = compiled_serializer(serializer_class)
+        expected = [dict(serializer_class(instance).data) for instance in queryset]
+        self.assertEqual(compiled.serialize(compiled.project(queryset)), expected)
+        # Rendered the same way, values included
+        self.assertEqual(json.dumps(compiled.serialize(compiled.project(queryset))), json.dumps(expected, default=str))
+
+    def test_output_matches_drf_serializers(self):
+        self.assert_parity(PurchaseOrderSerializer, PurchaseOrder.objects.order_by('id'))
+        self.assert_parity(PurchaseOrderReadSerializer, PurchaseOrder.objects.order_by('id'))
+        self.assert_parity(VendorSerializer, Vendor.objects.order_by('id'))
+        self.assert_parity(VendorPerformanceSerializer, HistoricalPerformanceVendor.objects.order_by('id'))
+
+    def test_list_endpoints_match_drf_serializers(self):
+        self.client.force_authenticate(self.buyer.user)
+        response = self.client.get(reverse('purchase-order-list'), {'page_size': 10})
+        orders = PurchaseOrder.objects.order_by('-order_date', '-id')
+        self.assertEqual(response.data['results'], [dict(PurchaseOrderReadSerializer(order).data) for order in orders])
+        for window in (None, 30):
+            response = self.client.get(reverse('vendor-list'), {'window': window} if window else {})
+            expected = VendorSerializer(Vendor.objects.get(pk=self.vendor.pk), context={'window': window} if window else {}).data
+            self.assertEqual(response.data['results']['responseData'], [dict(expected)])
+
+    def test_unsupported_fields_are_rejected(self):
+        class NotCompilable(serializers.Serializer):
+            tags = serializers.ListField()
+        with self.assertRaises(TypeError):
+            CompiledSerializer(NotCompilable)
+
+    def test_pages_match_read_serializer(self):
+        # A page mixing every status and null column, as the list endpoints render it
+        orders = PurchaseOrder.objects.order_by('id')
+        compiled = compiled_serializer(PurchaseOrderReadSerializer)
+        expected = PurchaseOrderReadSerializer(list(orders) * 34, many=True).data
+        self.assertEqual(compiled.serialize(list(compiled.project(orders)) * 34), [dict(row) for row in expected])
+
+    def test_benchmark_command_runs(self):
+        out = StringIO()
+        call_command('benchmark_serializers', rows=5, number=1, repeat=1, stdout=out)
+        self.assertIn('PurchaseOrderReadSerializer', out.getvalue())
+
+
+class EnvelopeJSONRendererTests(APITestCase):
+
+    def payload(self):
+        moment = datetime(2024, 3, 1, 12, 30, 15, 250000, tzinfo=dt_timezone.utc)
+        return {
+            'responseCode': 200,
+            'responseMessage': 'Résumé \u2028 ok',
+            'responseData': {
+                'rows': ReturnList([{'po_number': uuid.UUID(int=7), 'order_date': moment, 'quality_rating': 4.5, 'issue_date': None}], serializer=None),
+                'detail': ReturnDict({'quantity': [ErrorDetail('Not enough stock.', code='invalid')]}, serializer=None),
+                'local': moment.astimezone(zoneinfo.ZoneInfo('Asia/Kolkata')),
+                'naive': datetime(2024, 3, 1, 12, 0),
+                'day': moment.date(),
+                'price': decimal.Decimal('12.50'),
+                'ranks': {7: 1, 9: 2},
+                'tags': ('a', 'b'),
+            },
+        }
+
+    def test_output_matches_json_renderer(self):
+        expected = JSONRenderer().render(self.payload())
+        self.assertEqual(EnvelopeJSONRenderer().render(self.payload()), expected)
+        fallback = EnvelopeJSONRenderer()
+        fallback.use_orjson = False
+        self.assertEqual(fallback.render(self.payload()), expected)
+        # Out of orjson's range, and indented output, are left to JSONRenderer
+        self.assertEqual(EnvelopeJSONRenderer().render({'big': 2 ** 70}), b'{"big":1180591620717411303424}')
+        self.assertEqual(
+            EnvelopeJSONRenderer().render(self.payload(), 'application/json; indent=2'),
+            JSONRenderer().render(self.payload(), 'application/json; indent=2'),
+        )
+        self.assertEqual(EnvelopeJSONRenderer().render(None), b'')
+
+    def test_non_finite_floats_are_rejected_like_json_renderer(self):
+        for value in (float('nan'), float('-inf'), decimal.Decimal('NaN')):
+            data = {'responseData': [{'quality_rating': value, 'issue_date': None}]}
+            with self.assertRaises(ValueError):
+                JSONRenderer().render(data)
+            with self.assertRaises(ValueError):
+                EnvelopeJSONRenderer().render(data)
+        self.assertEqual(
+            EnvelopeJSONRenderer().render({'rating': 4.5, 'issue_date': None}), b'{"rating":4.5,"issue_date":null}'
+        )
+
+    def test_views_render_with_envelope_renderer(self):
+        response = self.client.post(reverse('login'), {'email': 'nobody@example.com', 'password': 'wrong'}, format='json')
+        self.assertIsInstance(response.accepted_renderer, EnvelopeJSONRenderer)
+        self.assertEqual(json.loads(response.content)['responseCode'], response.status_code)
+
+    def test_benchmark_command_runs(self):
+        out = StringIO()
+        call_command('benchmark_renderers', rows=5, number=1, repeat=1, stdout=out)
+        self.assertIn('EnvelopeJSONRenderer', out.getvalue())
@@ -2,8 +2,9 @@ from django.urls import path
 from .views import (
     VendorCreateView, VendorListView, VendorDetailView, VendorUpdateView, VendorDeleteView,
     BuyerCreateView, BuyerListView, BuyerDetailView, BuyerUpdateView, BuyerDeleteView,
-    PurchaseOrderCreateView, PurchaseOrderListView, PurchaseOrderDetailView, PurchaseOrderUpdateView, PurchaseOrderDeleteView,
-    LoginView, VendorPerformanceView, AcknowledgePurchaseOrderView,IssuePurchaseOrderView,CompletePurchaseOrderView,CancelPurchaseOrderView,
+    PurchaseOrderCreateView, PurchaseOrderBulkCreateView, PurchaseOrderListView, PurchaseOrderExportView, PurchaseOrderDetailView, PurchaseOrderUpdateView, PurchaseOrderDeleteView,
+    LoginView, VendorPerformanceView, VendorPerformanceHistoryView, VendorLeaderboardView, VendorRankView, ResponseCacheStatsView, AcknowledgePurchaseOrderView,IssuePurchaseOrderView,CompletePurchaseOrderView,CancelPurchaseOrderView,
+    BulkPurchaseOrderTransitionView,
 )
 
 
@@ -27,7 +28,9 @@ urlpatterns = [
 
     #------------------------Purchase Orders---------------------------#
     path('purchase-orders-create/', PurchaseOrderCreateView.as_view(), name='purchase-order-create'),
+    path('purchase-orders-bulk/', PurchaseOrderBulkCreateView.as_view(), name='purchase-order-bulk-create'),
     path('purchase-orders/', PurchaseOrderListView.as_view(), name='purchase-order-list'),
+    path('purchase-orders-export/', PurchaseOrderExportView.as_view(), name='purchase-order-export'),
     path('purchase-orders/<str:po_number>/', PurchaseOrderDetailView.as_view(), name='purchase-order-detail'),
     path('purchase-orders/<str:po_number>/update/', PurchaseOrderUpdateView.as_view(), name='purchase-order-update'),
     path('purchase-orders/<str:po_number>/delete/', PurchaseOrderDeleteView.as_view(), name='purchase-order-delete'),
@@ -35,6 +38,10 @@ urlpatterns = [
 
     #-------------------------Vendor Performance metrics endpoint-------------------------------------------#
     path('vendors/<int:vendor_id>/performance', VendorPerformanceView.as_view(), name='vendor-performance'),
+    path('vendors/<int:vendor_id>/performance/history', VendorPerformanceHistoryView.as_view(), name='vendor-performance-history'),
+    path('vendors-leaderboard/', VendorLeaderboardView.as_view(), name='vendor-leaderboard'),
+    path('vendors/<int:vendor_id>/rank', VendorRankView.as_view(), name='vendor-rank'),
+    path('vendors-cache-stats/', ResponseCacheStatsView.as_view(), name='vendor-cache-stats'),
 
 
     #--------------------------Purchase order status endpoint-------------------------------------------------------------#
@@ -42,6 +49,7 @@ urlpatterns = [
     path('purchase_orders_status/<int:po_id>/issue', IssuePurchaseOrderView.as_view(), name='issue-purchase-order'),
     path('purchase_orders_status/<int:po_id>/complete', CompletePurchaseOrderView.as_view(), name='complete-purchase-order'),
     path('purchase_orders_status/<int:po_id>/cancel', CancelPurchaseOrderView.as_view(), name='cancel-purchase-order'),
+    path('purchase_orders_status/bulk', BulkPurchaseOrderTransitionView.as_view(), name='bulk-purchase-order-transition'),
 
     #-----------------------Login-----------------------------------------#
     path('login/', LoginView.as_view(), name='login'),
@@ -0,0 +1,53 @@
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# FTS5 trigram index over these VendorManagementUser columns (migration 0012, SQLite only)
+USER_SEARCH_TABLE = 'vendor_models_user_search'
+USER_SEARCH_FIELDS = ('name', 'email', 'contact_details', 'address')
+
+# The trigram tokenizer cannot match shorter terms; those are filtered with icontains.
+MIN_INDEXED_TERM = 3
+
+_search_index_available = {}
+
+
+def user_search_index_available(alias='default'):
+    """
+    Whether the database behind `alias` has the user search index.
+    """
+    if alias not in _search_index_available:
+        connection = connections[alias]
+        _search_index_available[alias] = (
+            connection.vendor == 'sqlite' and USER_SEARCH_TABLE in connection.introspection.table_names()
+        )
+    return _search_index_available[alias]
+
+
+def match_phrase(term):
+    # One FTS5 string: the term matched as a substring, with quotes escaped
+    return '"%s"' % term.replace('"', '""')
+
+
+def search_users(queryset, user_field, terms):
+    """
+    `queryset` narrowed to rows whose user (reached through `user_field`) contains every
+    term of `terms` ({field: term}) in that field, case-insensitively. Terms of at least
+    MIN_INDEXED_TERM characters are looked up in the search index when the database has
+    one; the others, and every term on other databases, use `icontains`.
+    """
+    terms = {field: term for field, term in terms.items() if term}
+    indexed = {}
+    if user_search_index_available(queryset.db):
+        indexed = {field: term for field, term in terms.items() if len(term) >= MIN_INDEXED_TERM}
+
+    condition = Q()
+    for field, term in terms.items():
+        if field not in indexed:
+            condition &= Q(**{f'{user_field}__{field}__icontains': term})
+    if indexed:
+        match = ' AND '.join(f'{field} : {match_phrase(term)}' for field, term in indexed.items())
+        condition &= Q(**{f'{user_field}__in': RawSQL(
+            f'SELECT rowid FROM {USER_SEARCH_TABLE} WHERE {USER_SEARCH_TABLE} MATCH %s', [match]
+        )})
+    return queryset.filter(condition)
@@ -2,15 +2,26 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from .schema import swagger_auto_schema, openapi
 from django.shortcuts import get_object_or_404
-from django.contrib.auth import authenticate
 from .serializers import *
 from vendor_models.models import *
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.exceptions import ValidationError
+from .purchase_order_reads import resolve_user_profiles, purchase_order_read_queryset
+from .pagination import list_pagination
+from .user_search import search_users
+from .fast_serializers import compiled_serializer
+from .authentication import tokens_for_user
+from .metric_counters import rolling_vendor_metrics, ROLLING_WINDOWS
+from .purchase_order_bulk import bulk_create_purchase_orders, bulk_transition_purchase_orders, PURCHASE_ORDER_TRANSITIONS
+from .purchase_order_export import export_queryset, export_purchase_orders, EXPORT_CONTENT_TYPES
+from .conditional import resource_validators, page_validators, vendor_validators, not_modified, set_validators
+from .response_cache import (
+    vendor_response_cache, vendor_detail_key, vendor_performance_key, vendor_id_for_code,
+)
+from django.http import StreamingHttpResponse
+import os
 import re 
 from django.shortcuts import get_object_or_404
 from django.http import Http404
@@ -25,6 +36,24 @@ class CustomPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+    def at_start(self):
+        return self.page.number == 1
+
+    def validator_parts(self):
+        # What a page's response holds besides its rows
+        return (self.page.paginator.count,)
+
+def rolling_window_from_request(request):
+    """
+    The optional `window` query parameter selecting rolling-window KPIs, as an int.
+    """
+    window = request.query_params.get('window')
+    if not window:
+        return None
+    if not window.isdigit() or int(window) not in ROLLING_WINDOWS:
+        raise ValidationError({'window': f'Window must be one of {", ".join(map(str, ROLLING_WINDOWS))} days.'})
+    return int(window)
+
 # Manual parameter for Authorization header
 authorization_param = openapi.Parameter(
     name='Authorization',
@@ -84,6 +113,29 @@ page_size_param = openapi.Parameter(
     type=openapi.TYPE_INTEGER
 )
 
+pagination_param = openapi.Parameter(
+    'pagination',
+    openapi.IN_QUERY,
+    description="Set to `cursor` for keyset pagination: no total count, follow `next` to page on",
+    type=openapi.TYPE_STRING,
+    enum=['cursor']
+)
+
+cursor_param = openapi.Parameter(
+    'cursor',
+    openapi.IN_QUERY,
+    description="Opaque cursor from the `next` link of the previous page",
+    type=openapi.TYPE_STRING
+)
+
+window_param = openapi.Parameter(
+    'window',
+    openapi.IN_QUERY,
+    description="Return the KPIs over the last 30, 90 or 365 days instead of the lifetime values",
+    type=openapi.TYPE_INTEGER,
+    enum=[30, 90, 365]
+)
+
 
 buyer_code_param = openapi.Parameter(
     'buyer_code',
@@ -120,7 +172,8 @@ class LoginView(APIView):
             serializer = LoginSerializer(data=request.data)
             if serializer.is_valid():
                 user = serializer.validated_data['user']
-                refresh = RefreshToken.for_user(user)
+                # Role and profile ids travel in the token, so requests need no user lookup
+                refresh = tokens_for_user(user)
                 return Response(
                     {
                         'responseCode': status.HTTP_200_OK,
@@ -209,7 +262,10 @@ class VendorListView(APIView):
             contact_details_param,
             address_param,
             page_param,
-            page_size_param
+            page_size_param,
+            pagination_param,
+            cursor_param,
+            window_param
         ],
         responses={
             200: openapi.Response(
@@ -281,22 +337,18 @@ class VendorListView(APIView):
             email = request.GET.get('email')
             contact_details = request.GET.get('contact_details')
             address = request.GET.get('address')
+            window = rolling_window_from_request(request)
 
-            # Filter vendors based on query parameters
-            filters = {}
-            if name:
-                filters['user__name__icontains'] = name
-            if email:
-                filters['user__email__icontains'] = email
-            if contact_details:
-                filters['user__contact_details__icontains'] = contact_details
-            if address:
-                filters['user__address__icontains'] = address
-
-            vendors = Vendor.objects.filter(**filters) if filters else Vendor.objects.all()
+            # Filter vendors based on query parameters, through the user search index where the database has one
+            vendors = search_users(Vendor.objects.all(), 'user', {
+                'name': name, 'email': email, 'contact_details': contact_details, 'address': address,
+            })
+            # Rows are projected to what the compiled VendorSerializer renders
+            vendor_serializer = compiled_serializer(VendorSerializer)
+            vendors = vendor_serializer.project(vendors, 'pk', 'id', 'updated_at', 'user__updated_at')
 
             # Apply pagination
-            paginator = CustomPagination()
+            paginator = list_pagination(request, CustomPagination, ['id'])
             page = paginator.paginate_queryset(vendors, request)
 
             # Check if there are any vendors
@@ -309,15 +361,37 @@ class VendorListView(APIView):
                     }
                 )
 
-            serializer = VendorSerializer(page, many=True)
-
-            return paginator.get_paginated_response(
+            # Answer polls of an unchanged page with a 304; rolling windows move daily, so those are always rendered
+            validators = None
+            if not window:
+                validators = page_validators(request, page, ['updated_at', 'user__updated_at'], *paginator.validator_parts())
+                unchanged = not_modified(request, validators)
+                if unchanged:
+                    return unchanged
+
+            vendors_data = vendor_serializer.serialize(page)
+            if window:
+                rolling_metrics = rolling_vendor_metrics([vendor.pk for vendor in page], window)
+                for vendor, vendor_data in zip(page, vendors_data):
+                    with_rolling_metrics(vendor_data, rolling_metrics[vendor.pk], window)
+
+            response = paginator.get_paginated_response(
                 {
                     'responseCode': status.HTTP_200_OK,
                     'responseMessage': 'Vendors retrieved successfully.',
-                    'responseData': serializer.data,
+                    'responseData': vendors_data,
                 }
             )
+            return set_validators(response, validators) if validators else response
+        except ValidationError as ve:
+            return Response(
+                {
+                    'responseCode': status.HTTP_400_BAD_REQUEST,
+                    'responseMessage': 'Invalid input',
+                    'responseData': ve.detail,
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             print('vendor list error------>', e)
             return Response(
@@ -333,7 +407,7 @@ class VendorDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
-        manual_parameters=[authorization_param, vendor_code_param],
+        manual_parameters=[authorization_param, vendor_code_param, window_param],
         responses={
             200: openapi.Response(
                 description='OK',
@@ -385,9 +459,12 @@ class VendorDetailView(APIView):
                                  'and follow the pattern "V_<id>_<4 random characters>".'
                 })
 
+            # The payload is cached with its validators, per user and query string, until the vendor or its KPIs change
+            window = rolling_window_from_request(request)
+
             # Check if vendor exists by vendor_code
-            vendor = Vendor.objects.filter(vendor_code=vendor_code).first()
-            if not vendor:
+            vendor_id = vendor_id_for_code(vendor_code)
+            if vendor_id is None:
                 return Response(
                     {
                         'responseCode': status.HTTP_404_NOT_FOUND,
@@ -396,16 +473,30 @@ class VendorDetailView(APIView):
                     },
                     status=status.HTTP_404_NOT_FOUND
                 )
-            
-            serializer = VendorSerializer(vendor)
-            return Response(
+
+            cache_key = vendor_detail_key(request, vendor_id, window)
+            cached = vendor_response_cache.get(cache_key)
+            if cached is None:
+                validators = vendor_validators(request, Vendor.objects.filter(pk=vendor_id), window)
+                if not validators:
+                    raise Vendor.DoesNotExist
+                vendor = Vendor.objects.select_related('user').get(pk=vendor_id)
+                cached = (validators, dict(VendorSerializer(vendor, context={'window': window}).data))
+                vendor_response_cache.set(cache_key, cached)
+
+            # Answer polls of an unchanged vendor with a 304
+            validators, data = cached
+            unchanged = not_modified(request, validators)
+            if unchanged:
+                return unchanged
+            return set_validators(Response(
                 {
                     'responseCode': status.HTTP_200_OK,
                     'responseMessage': 'Vendor details retrieved successfully.',
-                    'responseData': serializer.data,
+                    'responseData': data,
                 },
                 status=status.HTTP_200_OK
-            )
+            ), validators)
         except ValidationError as ve:
             return Response(
                 {
@@ -415,6 +506,15 @@ class VendorDetailView(APIView):
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
+        except Vendor.DoesNotExist:
+            return Response(
+                {
+                    'responseCode': status.HTTP_404_NOT_FOUND,
+                    'responseMessage': 'Vendor not found.',
+                    'responseData': [],
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
         except Exception as e:
             print(f'vendor detail error----------->{e}')
             return Response(
@@ -786,7 +886,9 @@ class BuyerListView(APIView):
             contact_details_param,
             address_param,
             page_param,
-            page_size_param
+            page_size_param,
+            pagination_param,
+            cursor_param
         ],
         responses={
             200: openapi.Response(
@@ -859,21 +961,13 @@ class BuyerListView(APIView):
             contact_details = request.GET.get('contact_details')
             address = request.GET.get('address')
 
-            # Filter buyers based on query parameters
-            filters = {}
-            if name:
-                filters['user__name__icontains'] = name
-            if email:
-                filters['user__email__icontains'] = email
-            if contact_details:
-                filters['user__contact_details__icontains'] = contact_details
-            if address:
-                filters['user__address__icontains'] = address
-
-            buyers = Buyer.objects.filter(**filters) if filters else Buyer.objects.all()
+            # Filter buyers based on query parameters, through the user search index where the database has one
+            buyers = search_users(Buyer.objects.select_related('user'), 'user', {
+                'name': name, 'email': email, 'contact_details': contact_details, 'address': address,
+            })
 
             # Apply pagination
-            paginator = CustomPagination()
+            paginator = list_pagination(request, CustomPagination, ['-id'])
             page = paginator.paginate_queryset(buyers, request)
 
             # Check if there are any buyers
@@ -886,14 +980,29 @@ class BuyerListView(APIView):
                     }
                 )
 
+            # Answer polls of an unchanged page with a 304
+            validators = page_validators(request, page, ['updated_at', 'user.updated_at'], *paginator.validator_parts())
+            unchanged = not_modified(request, validators)
+            if unchanged:
+                return unchanged
+
             serializer = BuyerSerializer(page, many=True)
 
-            return paginator.get_paginated_response(
+            return set_validators(paginator.get_paginated_response(
                 {
                     'responseCode': status.HTTP_200_OK,
                     'responseMessage': 'Buyers retrieved successfully.',
                     'responseData': serializer.data,
                 }
+            ), validators)
+        except ValidationError as ve:
+            return Response(
+                {
+                    'responseCode': status.HTTP_400_BAD_REQUEST,
+                    'responseMessage': 'Invalid input',
+                    'responseData': ve.detail,
+                },
+                status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
             print('buyer list error---------->', e)
@@ -967,9 +1076,9 @@ class BuyerDetailView(APIView):
                                  'and follow the pattern "B_<id>_<4 random characters>".'
                 })
 
-            # Check if buyer exists by buyer_code
-            buyer = Buyer.objects.filter(buyer_code=buyer_code).first()
-            if not buyer:
+            # Check if buyer exists by buyer_code, answering polls of an unchanged buyer with a 304
+            timestamps = Buyer.objects.filter(buyer_code=buyer_code).values_list('updated_at', 'user__updated_at').first()
+            if not timestamps:
                 return Response(
                     {
                         'responseCode': status.HTTP_404_NOT_FOUND,
@@ -978,16 +1087,21 @@ class BuyerDetailView(APIView):
                     },
                     status=status.HTTP_404_NOT_FOUND
                 )
-            
+            validators = resource_validators(request, timestamps)
+            unchanged = not_modified(request, validators)
+            if unchanged:
+                return unchanged
+
+            buyer = Buyer.objects.select_related('user').get(buyer_code=buyer_code)
             serializer = BuyerSerializer(buyer)
-            return Response(
+            return set_validators(Response(
                 {
                     'responseCode': status.HTTP_200_OK,
                     'responseMessage': 'Buyer details retrieved successfully.',
                     'responseData': serializer.data,
                 },
                 status=status.HTTP_200_OK
-            )
+            ), validators)
         except ValidationError as ve:
             print('validation error---------->', ve.detail)
             return Response(
@@ -1271,6 +1385,14 @@ class PurchaseOrderCreateView(APIView):
                 },
                 status=status.HTTP_400_BAD_REQUEST
             )
+        except ValidationError as ve:
+            return Response(
+                {
+                    'responseCode': status.HTTP_400_BAD_REQUEST,
+                    'responseMessage': ve.detail,
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             print('purchase create error--------->', e)
             return Response(
@@ -1281,14 +1403,146 @@ class PurchaseOrderCreateView(APIView):
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+class PurchaseOrderBulkCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        manual_parameters=[authorization_param],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['orders'],
+            properties={
+                'orders': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    description=f"Up to {PurchaseOrderBulkCreateSerializer.MAX_ORDERS} orders, each with the fields of /purchase-orders-create/",
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'vendor_code': openapi.Schema(type=openapi.TYPE_STRING),
+                            'items': openapi.Schema(type=openapi.TYPE_INTEGER),
+                            'quantity': openapi.Schema(type=openapi.TYPE_INTEGER),
+                            'delivery_date': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                            'status': openapi.Schema(type=openapi.TYPE_STRING),
+                            'quality_rating': openapi.Schema(type=openapi.TYPE_NUMBER),
+                            'acknowledgment_date': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
+                        },
+                    ),
+                ),
+            },
+        ),
+        responses={
+            201: openapi.Response(description='Created (some rows may have been rejected, see `errors`)', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+            400: openapi.Response(description='Bad Request', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+            500: openapi.Response(description='Internal Server Error', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        }
+    )
+    def post(self, request):
+        try:
+            serializer = PurchaseOrderBulkCreateSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(
+                    {
+                        'responseCode': status.HTTP_400_BAD_REQUEST,
+                        'responseMessage': serializer.errors,
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            profiles = resolve_user_profiles(request.user)
+            if profiles.buyer_id is None:
+                return Response(
+                    {
+                        'responseCode': status.HTTP_400_BAD_REQUEST,
+                        'responseMessage': 'Buyer profile does not exist for the logged-in user.',
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            created, errors = bulk_create_purchase_orders(serializer.validated_data['orders'], profiles.buyer_id)
+            response_status = status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+            return Response(
+                {
+                    'responseCode': response_status,
+                    'responseMessage': f'{len(created)} purchase orders created, {len(errors)} rejected.',
+                    'responseData': {
+                        'created': PurchaseOrderReadSerializer(created, many=True).data,
+                        'errors': errors,
+                    },
+                },
+                status=response_status
+            )
+        except Exception as e:
+            print('purchase bulk create error--------->', e)
+            return Response(
+                {
+                    'responseCode': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    'responseMessage': 'Something went wrong! Please try again.',
+                    'responseData': {'error': str(e)},
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+po_status_param = openapi.Parameter(
+    'status',
+    openapi.IN_QUERY,
+    description="Only orders in this status",
+    type=openapi.TYPE_STRING,
+    enum=['pending', 'acknowledged', 'issued', 'completed', 'canceled']
+)
+
+po_order_date_from_param = openapi.Parameter(
+    'order_date_from',
+    openapi.IN_QUERY,
+    description="Only orders placed at or after this time (ISO 8601)",
+    type=openapi.TYPE_STRING,
+    format=openapi.FORMAT_DATETIME
+)
+
+po_order_date_to_param = openapi.Parameter(
+    'order_date_to',
+    openapi.IN_QUERY,
+    description="Only orders placed before this time (ISO 8601)",
+    type=openapi.TYPE_STRING,
+    format=openapi.FORMAT_DATETIME
+)
+
+po_delivery_date_from_param = openapi.Parameter(
+    'delivery_date_from',
+    openapi.IN_QUERY,
+    description="Only orders delivered at or after this time (ISO 8601)",
+    type=openapi.TYPE_STRING,
+    format=openapi.FORMAT_DATETIME
+)
+
+po_delivery_date_to_param = openapi.Parameter(
+    'delivery_date_to',
+    openapi.IN_QUERY,
+    description="Only orders delivered before this time (ISO 8601)",
+    type=openapi.TYPE_STRING,
+    format=openapi.FORMAT_DATETIME
+)
+
+po_item_param = openapi.Parameter(
+    'item',
+    openapi.IN_QUERY,
+    description="Only orders for this item id",
+    type=openapi.TYPE_INTEGER
+)
+
+
 class PurchaseOrderListView(APIView):
     permission_classes = [IsAuthenticated]
     pagination_class = CustomPagination
 
     @swagger_auto_schema(
-        manual_parameters=[authorization_param, name_param_vendor, page_param, page_size_param],
+        manual_parameters=[
+            authorization_param, name_param_vendor, po_status_param, po_order_date_from_param, po_order_date_to_param,
+            po_delivery_date_from_param, po_delivery_date_to_param, po_item_param,
+            page_param, page_size_param, pagination_param, cursor_param,
+        ],
         responses={
-            200: openapi.Response(description='OK', schema=PurchaseOrderSerializer(many=True)),
+            200: openapi.Response(description='OK', schema=PurchaseOrderReadSerializer(many=True)),
             404: openapi.Response(description='Not Found', schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
                 'responseCode': openapi.Schema(type=openapi.TYPE_INTEGER),
                 'responseMessage': openapi.Schema(type=openapi.TYPE_STRING),
@@ -1298,20 +1552,22 @@ class PurchaseOrderListView(APIView):
     )
     def get(self, request):
         try:
-            user = request.user
             vendor_name = request.query_params.get('name', None)
-            print('vendor_name-------->', vendor_name)
+            query = PurchaseOrderListQuerySerializer(data=request.query_params)
+            if not query.is_valid():
+                return Response(
+                    {
+                        'responseCode': status.HTTP_400_BAD_REQUEST,
+                        'responseMessage': query.errors,
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-            # Check if the user is a buyer or a vendor and filter accordingly
-            if hasattr(user, 'buyer_profile'):
-                purchase_orders = PurchaseOrder.objects.filter(buyer=user.buyer_profile)
-                if vendor_name:
-                    purchase_orders = purchase_orders.filter(vendor__user__name__icontains=vendor_name)
-            elif hasattr(user, 'vendor_profile'):
-                purchase_orders = PurchaseOrder.objects.filter(vendor=user.vendor_profile)
-                if vendor_name:
-                    purchase_orders = purchase_orders.filter(vendor__user__name__icontains=vendor_name)
-            else:
+            # Resolve the user's buyer/vendor profile once and filter accordingly
+            purchase_orders = purchase_order_read_queryset(
+                resolve_user_profiles(request.user), vendor_name, query.validated_data
+            )
+            if purchase_orders is None:
                 return Response(
                     {
                         'responseCode': status.HTTP_400_BAD_REQUEST,
@@ -1320,7 +1576,14 @@ class PurchaseOrderListView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            if not purchase_orders.exists():
+            # Rows are projected to what the compiled PurchaseOrderReadSerializer renders
+            purchase_order_serializer = compiled_serializer(PurchaseOrderReadSerializer)
+            purchase_orders = purchase_order_serializer.project(purchase_orders, 'pk', 'id', 'updated_at')
+
+            # Paginate the purchase orders; an empty first page means there are none at all
+            paginator = list_pagination(request, CustomPagination, ['-order_date', '-id'])
+            paginated_purchase_orders = paginator.paginate_queryset(purchase_orders, request)
+            if not paginated_purchase_orders and paginator.at_start():
                 if vendor_name:
                     return Response(
                         {
@@ -1339,10 +1602,6 @@ class PurchaseOrderListView(APIView):
                         },
                         status=status.HTTP_200_OK
                     )
-
-            # Paginate the purchase orders
-            paginator = CustomPagination()
-            paginated_purchase_orders = paginator.paginate_queryset(purchase_orders, request)
             if not paginated_purchase_orders:
                 return Response(
                     {
@@ -1353,9 +1612,24 @@ class PurchaseOrderListView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            serializer = PurchaseOrderSerializer(paginated_purchase_orders, many=True)
-            return paginator.get_paginated_response(serializer.data)
+            # Answer polls of an unchanged page with a 304
+            validators = page_validators(request, paginated_purchase_orders, ['updated_at'], *paginator.validator_parts())
+            unchanged = not_modified(request, validators)
+            if unchanged:
+                return unchanged
 
+            data = purchase_order_serializer.serialize(paginated_purchase_orders)
+            return set_validators(paginator.get_paginated_response(data), validators)
+
+        except ValidationError as ve:
+            return Response(
+                {
+                    'responseCode': status.HTTP_400_BAD_REQUEST,
+                    'responseMessage': 'Invalid input',
+                    'responseData': ve.detail,
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             print('purchase order list error---------->', e)
             return Response(
@@ -1368,22 +1642,112 @@ class PurchaseOrderListView(APIView):
             )
         
 
+po_vendor_param = openapi.Parameter(
+    'vendor',
+    openapi.IN_QUERY,
+    description="Only orders received by this vendor id",
+    type=openapi.TYPE_INTEGER
+)
+
+po_buyer_param = openapi.Parameter(
+    'buyer',
+    openapi.IN_QUERY,
+    description="Only orders placed by this buyer id",
+    type=openapi.TYPE_INTEGER
+)
+
+export_format_param = openapi.Parameter(
+    'file_format',
+    openapi.IN_QUERY,
+    description="`ndjson` (one JSON object per line, default) or `csv`",
+    type=openapi.TYPE_STRING,
+    enum=['ndjson', 'csv']
+)
+
+export_gzip_param = openapi.Parameter(
+    'gzip',
+    openapi.IN_QUERY,
+    description="Gzip the export",
+    type=openapi.TYPE_BOOLEAN
+)
+
+
+class PurchaseOrderExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            authorization_param, export_format_param, export_gzip_param, po_status_param, po_vendor_param, po_buyer_param,
+            po_order_date_from_param, po_order_date_to_param, po_delivery_date_from_param, po_delivery_date_to_param, po_item_param,
+        ],
+        responses={
+            200: openapi.Response(description='Streamed NDJSON or CSV file of every matching purchase order'),
+            400: openapi.Response(description='Bad Request', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        }
+    )
+    def get(self, request):
+        """
+        Streams every purchase order visible to the user, without pagination, in constant memory.
+        """
+        try:
+            query = PurchaseOrderExportQuerySerializer(data=request.query_params)
+            if not query.is_valid():
+                return Response(
+                    {
+                        'responseCode': status.HTTP_400_BAD_REQUEST,
+                        'responseMessage': query.errors,
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            filters = dict(query.validated_data)
+            export_format, compress = filters.pop('file_format'), filters.pop('gzip')
+
+            purchase_orders = purchase_order_read_queryset(resolve_user_profiles(request.user))
+            if purchase_orders is None:
+                return Response(
+                    {
+                        'responseCode': status.HTTP_400_BAD_REQUEST,
+                        'responseMessage': 'User does not have a buyer or vendor profile.',
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            filename = f'purchase-orders.{export_format}' + ('.gz' if compress else '')
+            response = StreamingHttpResponse(
+                export_purchase_orders(export_queryset(purchase_orders, filters), export_format, compress),
+                content_type='application/gzip' if compress else EXPORT_CONTENT_TYPES[export_format],
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+
+        except Exception as e:
+            print('purchase order export error---------->', e)
+            return Response(
+                {
+                    'responseCode': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    'responseMessage': 'Something went wrong! Please try again.',
+                    'responseData': {'error': str(e)},
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class PurchaseOrderDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
         manual_parameters=[authorization_param],
         responses={
-            200: openapi.Response(description='OK', schema=PurchaseOrderSerializer),
+            200: openapi.Response(description='OK', schema=PurchaseOrderReadSerializer),
             404: openapi.Response(description='Not Found', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
         }
     )
     def get(self, request, po_number):
         try:
-            user = request.user
+            profiles = resolve_user_profiles(request.user)
 
             # Ensure the user is a buyer
-            if not hasattr(user, 'buyer_profile'):
+            if profiles.buyer_id is None:
                 return Response(
                     {
                         'responseCode': status.HTTP_404_NOT_FOUND,
@@ -1394,7 +1758,7 @@ class PurchaseOrderDetailView(APIView):
                 )
 
             # Filter purchase orders by po_number and the logged-in buyer
-            purchase_order = PurchaseOrder.objects.filter(po_number=po_number, buyer=user.buyer_profile).first()
+            purchase_order = purchase_order_read_queryset(profiles).filter(po_number=po_number).first()
             if not purchase_order:
                 return Response(
                     {
@@ -1405,15 +1769,21 @@ class PurchaseOrderDetailView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            serializer = PurchaseOrderSerializer(purchase_order)
-            return Response(
+            # Unchanged since the client's copy: skip serialization
+            validators = resource_validators(request, [purchase_order.updated_at])
+            unchanged = not_modified(request, validators)
+            if unchanged:
+                return unchanged
+
+            serializer = PurchaseOrderReadSerializer(purchase_order)
+            return set_validators(Response(
                 {
                     'responseCode': status.HTTP_200_OK,
                     'responseMessage': 'Purchase Order details retrieved successfully.',
                     'responseData': serializer.data,
                 },
                 status=status.HTTP_200_OK
-            )
+            ), validators)
         except Exception as e:
             print('purchase order detail error---------->', e)
             return Response(
@@ -1483,6 +1853,15 @@ class PurchaseOrderUpdateView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        except ValidationError as ve:
+            return Response(
+                {
+                    'responseCode': status.HTTP_400_BAD_REQUEST,
+                    'responseMessage': ve.detail,
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         except ObjectDoesNotExist as e:
             print('object not found---------->', e)
             return Response(
@@ -1565,12 +1944,15 @@ class PurchaseOrderDeleteView(APIView):
 #################################     Performance Metric       ####################################################
 
 from .performance_calculations import *
+from .downsampling import largest_triangle_three_buckets
+from .leaderboard import LEADERBOARD_METRICS, vendor_leaderboard
+from .metric_counters import response_time_percentiles
 
 class VendorPerformanceView(APIView):
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
-        manual_parameters=[authorization_param],
+        manual_parameters=[authorization_param, window_param],
         responses={
             200: openapi.Response(description='OK', schema=VendorPerformanceSerializer),
             404: openapi.Response(description='Not Found', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
@@ -1579,16 +1961,49 @@ class VendorPerformanceView(APIView):
     )
     def get(self, request, vendor_id):
         try:
-            vendor = get_object_or_404(Vendor, id=vendor_id)
-            performance = vendor.historical_performance.latest('date')
-            serializer = VendorPerformanceSerializer(performance)
-            return Response(
+            # The payload is cached with its validators, per user and query string, until the vendor's KPIs change
+            window = rolling_window_from_request(request)
+            cache_key = vendor_performance_key(request, vendor_id, window)
+            cached = vendor_response_cache.get(cache_key)
+            if cached is None:
+                validators = vendor_validators(request, Vendor.objects.filter(id=vendor_id), window, counters=True)
+                if not validators:
+                    raise Vendor.DoesNotExist
+                if window:
+                    metrics = rolling_vendor_metrics([vendor_id], window)[vendor_id]
+                    serializer = VendorPerformanceSerializer({**metrics, 'date': timezone.now()})
+                    data = {**serializer.data, 'window': window}
+                else:
+                    performance_serializer = compiled_serializer(VendorPerformanceSerializer)
+                    performance = performance_serializer.project(
+                        HistoricalPerformanceVendor.objects.filter(vendor_id=vendor_id)
+                    ).latest('date')
+                    data = performance_serializer.serialize([performance])[0]
+                data['response_time_percentiles'] = response_time_percentiles(vendor_id, window)
+                cached = (validators, data)
+                vendor_response_cache.set(cache_key, cached)
+
+            # Answer polls of unchanged metrics with a 304
+            validators, data = cached
+            unchanged = not_modified(request, validators)
+            if unchanged:
+                return unchanged
+            return set_validators(Response(
                 {
                     'responseCode': status.HTTP_200_OK,
                     'responseMessage': 'Vendor performance metrics retrieved successfully.',
-                    'responseData': serializer.data,
+                    'responseData': data,
                 },
                 status=status.HTTP_200_OK
+            ), validators)
+        except ValidationError as ve:
+            return Response(
+                {
+                    'responseCode': status.HTTP_400_BAD_REQUEST,
+                    'responseMessage': 'Invalid input',
+                    'responseData': ve.detail,
+                },
+                status=status.HTTP_400_BAD_REQUEST
             )
         except Vendor.DoesNotExist:
             return Response(
@@ -1618,6 +2033,285 @@ class VendorPerformanceView(APIView):
             )
         
 
+history_from_param = openapi.Parameter(
+    'from',
+    openapi.IN_QUERY,
+    description="Start of the range (ISO 8601), defaults to 30 days before `to`",
+    type=openapi.TYPE_STRING,
+    format=openapi.FORMAT_DATETIME
+)
+
+history_to_param = openapi.Parameter(
+    'to',
+    openapi.IN_QUERY,
+    description="End of the range (ISO 8601, exclusive), defaults to now",
+    type=openapi.TYPE_STRING,
+    format=openapi.FORMAT_DATETIME
+)
+
+history_bucket_param = openapi.Parameter(
+    'bucket',
+    openapi.IN_QUERY,
+    description="Aggregation bucket",
+    type=openapi.TYPE_STRING,
+    enum=['hour', 'day', 'week'],
+    default='day'
+)
+
+history_points_param = openapi.Parameter(
+    'points',
+    openapi.IN_QUERY,
+    description="Downsample the series to at most this many buckets (largest-triangle-three-buckets)",
+    type=openapi.TYPE_INTEGER
+)
+
+history_metric_param = openapi.Parameter(
+    'metric',
+    openapi.IN_QUERY,
+    description="Metric whose average drives the downsampling",
+    type=openapi.TYPE_STRING,
+    enum=['on_time_delivery_rate', 'quality_rating_avg', 'average_response_time', 'fulfillment_rate'],
+    default='fulfillment_rate'
+)
+
+
+class VendorPerformanceHistoryView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            authorization_param,
+            history_from_param,
+            history_to_param,
+            history_bucket_param,
+            history_points_param,
+            history_metric_param,
+        ],
+        responses={
+            200: openapi.Response(description='OK', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+            400: openapi.Response(description='Bad Request', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+            404: openapi.Response(description='Not Found', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+            500: openapi.Response(description='Internal Server Error', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        }
+    )
+    def get(self, request, vendor_id):
+        try:
+            query = VendorPerformanceHistoryQuerySerializer(data=request.query_params)
+            if not query.is_valid():
+                return Response(
+                    {
+                        'responseCode': status.HTTP_400_BAD_REQUEST,
+                        'responseMessage': query.errors,
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            params = query.validated_data
+
+            if not Vendor.objects.filter(id=vendor_id).exists():
+                return Response(
+                    {
+                        'responseCode': status.HTTP_404_NOT_FOUND,
+                        'responseMessage': 'Vendor not found.',
+                    },
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            series = performance_history_series(vendor_id, params['from'], params['to'], params['bucket'])
+            if params.get('points'):
+                metric = params['metric']
+                keep = largest_triangle_three_buckets(
+                    [(row['bucket'].timestamp(), row[metric]['avg']) for row in series],
+                    params['points'],
+                )
+                series = [series[index] for index in keep]
+
+            return Response(
+                {
+                    'responseCode': status.HTTP_200_OK,
+                    'responseMessage': 'Vendor performance history retrieved successfully.',
+                    'responseData': {
+                        'from': params['from'],
+                        'to': params['to'],
+                        'bucket': params['bucket'],
+                        'series': series,
+                    },
+                },
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            print('performance history error------------>', e)
+            return Response(
+                {
+                    'responseCode': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    'responseMessage': 'Something went wrong! Please try again.',
+                    'responseData': {'error': str(e)},
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+leaderboard_metric_param = openapi.Parameter(
+    'metric',
+    openapi.IN_QUERY,
+    description="KPI to rank vendors by",
+    type=openapi.TYPE_STRING,
+    enum=list(LEADERBOARD_METRICS),
+    default='fulfillment_rate'
+)
+
+leaderboard_limit_param = openapi.Parameter(
+    'limit',
+    openapi.IN_QUERY,
+    description="Number of vendors to return (1-500)",
+    type=openapi.TYPE_INTEGER,
+    default=50
+)
+
+rank_metric_param = openapi.Parameter(
+    'metric',
+    openapi.IN_QUERY,
+    description="Only return the standing for this KPI",
+    type=openapi.TYPE_STRING,
+    enum=list(LEADERBOARD_METRICS)
+)
+
+
+class VendorLeaderboardView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        manual_parameters=[authorization_param, leaderboard_metric_param, leaderboard_limit_param],
+        responses={
+            200: openapi.Response(description='OK', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+            400: openapi.Response(description='Bad Request', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+            500: openapi.Response(description='Internal Server Error', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        }
+    )
+    def get(self, request):
+        try:
+            query = VendorLeaderboardQuerySerializer(data=request.query_params)
+            if not query.is_valid():
+                return Response(
+                    {
+                        'responseCode': status.HTTP_400_BAD_REQUEST,
+                        'responseMessage': query.errors,
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            metric = query.validated_data['metric']
+
+            leaders = vendor_leaderboard.top(metric, query.validated_data['limit'])
+            vendors = Vendor.objects.select_related('user').only('vendor_code', 'user__name').in_bulk(
+                [vendor_id for _, vendor_id, _ in leaders]
+            )
+            results = [
+                {
+                    'rank': rank,
+                    'vendor_id': vendor_id,
+                    'vendor_code': vendors[vendor_id].vendor_code,
+                    'name': vendors[vendor_id].user.name,
+                    'value': value,
+                }
+                for rank, vendor_id, value in leaders
+                if vendor_id in vendors
+            ]
+
+            return Response(
+                {
+                    'responseCode': status.HTTP_200_OK,
+                    'responseMessage': 'Vendor leaderboard retrieved successfully.',
+                    'responseData': {'metric': metric, 'results': results},
+                },
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            print('vendor leaderboard error------------>', e)
+            return Response(
+                {
+                    'responseCode': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    'responseMessage': 'Something went wrong! Please try again.',
+                    'responseData': {'error': str(e)},
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class VendorRankView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        manual_parameters=[authorization_param, rank_metric_param],
+        responses={
+            200: openapi.Response(description='OK', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+            400: openapi.Response(description='Bad Request', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+            404: openapi.Response(description='Not Found', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+            500: openapi.Response(description='Internal Server Error', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        }
+    )
+    def get(self, request, vendor_id):
+        try:
+            query = VendorRankQuerySerializer(data=request.query_params)
+            if not query.is_valid():
+                return Response(
+                    {
+                        'responseCode': status.HTTP_400_BAD_REQUEST,
+                        'responseMessage': query.errors,
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            metric = query.validated_data.get('metric')
+
+            standing = vendor_leaderboard.standing(vendor_id, [metric] if metric else None)
+            if standing is None:
+                return Response(
+                    {
+                        'responseCode': status.HTTP_404_NOT_FOUND,
+                        'responseMessage': 'Vendor not found.',
+                    },
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            metrics, ranked = standing
+
+            return Response(
+                {
+                    'responseCode': status.HTTP_200_OK,
+                    'responseMessage': 'Vendor rank retrieved successfully.',
+                    'responseData': {'vendor_id': vendor_id, 'ranked_vendors': ranked, 'metrics': metrics},
+                },
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            print('vendor rank error------------>', e)
+            return Response(
+                {
+                    'responseCode': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    'responseMessage': 'Something went wrong! Please try again.',
+                    'responseData': {'error': str(e)},
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ResponseCacheStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        manual_parameters=[authorization_param],
+        responses={
+            200: openapi.Response(description='Hit/miss counters of the vendor response cache in this process', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        }
+    )
+    def get(self, request):
+        return Response(
+            {
+                'responseCode': status.HTTP_200_OK,
+                'responseMessage': 'Response cache statistics retrieved successfully.',
+                'responseData': {'pid': os.getpid(), **vendor_response_cache.snapshot()},
+            },
+            status=status.HTTP_200_OK
+        )
+
+
 #################################  PURCHASE ORDER STATUS  ####################################
 
 class AcknowledgePurchaseOrderView(APIView):
@@ -1631,6 +2325,7 @@ class AcknowledgePurchaseOrderView(APIView):
         ),
         responses={
             200: openapi.Response(description='OK'),
+            400: openapi.Response(description='Bad Request'),
             404: openapi.Response(description='Not Found'),
             500: openapi.Response(description='Internal Server Error'),
         }
@@ -1638,10 +2333,17 @@ class AcknowledgePurchaseOrderView(APIView):
     def post(self, request, po_id):
         try:
             purchase_order = get_object_or_404(PurchaseOrder, id=po_id)
+            if purchase_order.status == 'canceled':
+                return Response(
+                    {
+                        'responseCode': status.HTTP_400_BAD_REQUEST,
+                        'responseMessage': 'A canceled purchase order cannot be acknowledged.',
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             purchase_order.acknowledgment_date = timezone.now()
             purchase_order.status = 'acknowledged'
             purchase_order.save()
-            update_vendor_metrics(purchase_order.vendor)
             return Response(
                 {
                     'responseCode': status.HTTP_200_OK,
@@ -1678,6 +2380,7 @@ class IssuePurchaseOrderView(APIView):
         ),
         responses={
             200: openapi.Response(description='OK'),
+            400: openapi.Response(description='Bad Request'),
             404: openapi.Response(description='Not Found'),
             500: openapi.Response(description='Internal Server Error'),
         }
@@ -1685,10 +2388,17 @@ class IssuePurchaseOrderView(APIView):
     def post(self, request, po_id):
         try:
             purchase_order = get_object_or_404(PurchaseOrder, id=po_id)
+            if purchase_order.status == 'canceled':
+                return Response(
+                    {
+                        'responseCode': status.HTTP_400_BAD_REQUEST,
+                        'responseMessage': 'A canceled purchase order cannot be issued.',
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             purchase_order.issue_date = timezone.now()
             purchase_order.status = 'issued'
             purchase_order.save()
-            update_vendor_metrics(purchase_order.vendor)
             return Response(
                 {
                     'responseCode': status.HTTP_200_OK,
@@ -1725,6 +2435,7 @@ class CompletePurchaseOrderView(APIView):
         ),
         responses={
             200: openapi.Response(description='OK'),
+            400: openapi.Response(description='Bad Request'),
             404: openapi.Response(description='Not Found'),
             500: openapi.Response(description='Internal Server Error'),
         }
@@ -1732,10 +2443,17 @@ class CompletePurchaseOrderView(APIView):
     def post(self, request, po_id):
         try:
             purchase_order = get_object_or_404(PurchaseOrder, id=po_id)
+            if purchase_order.status == 'canceled':
+                return Response(
+                    {
+                        'responseCode': status.HTTP_400_BAD_REQUEST,
+                        'responseMessage': 'A canceled purchase order cannot be completed.',
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             purchase_order.completion_date = timezone.now()
             purchase_order.status = 'completed'
             purchase_order.save()
-            update_vendor_metrics(purchase_order.vendor)
             return Response(
                 {
                     'responseCode': status.HTTP_200_OK,
@@ -1779,9 +2497,8 @@ class CancelPurchaseOrderView(APIView):
     def post(self, request, po_id):
         try:
             purchase_order = get_object_or_404(PurchaseOrder, id=po_id)
-            purchase_order.status = 'cancelled'
+            purchase_order.status = 'canceled'
             purchase_order.save()
-            update_vendor_metrics(purchase_order.vendor)
             return Response(
                 {
                     'responseCode': status.HTTP_200_OK,
@@ -1808,4 +2525,68 @@ class CancelPurchaseOrderView(APIView):
             )
 
 
+class BulkPurchaseOrderTransitionView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        manual_parameters=[authorization_param],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['transition', 'ids'],
+            properties={
+                'transition': openapi.Schema(type=openapi.TYPE_STRING, enum=list(PURCHASE_ORDER_TRANSITIONS)),
+                'ids': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    description=f"Up to {PurchaseOrderBulkTransitionSerializer.MAX_ORDERS} purchase order ids",
+                    items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                ),
+            },
+        ),
+        responses={
+            200: openapi.Response(description='OK', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+            400: openapi.Response(description='Bad Request', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+            500: openapi.Response(description='Internal Server Error', schema=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        }
+    )
+    def post(self, request):
+        try:
+            serializer = PurchaseOrderBulkTransitionSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(
+                    {
+                        'responseCode': status.HTTP_400_BAD_REQUEST,
+                        'responseMessage': serializer.errors,
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            purchase_orders = purchase_order_read_queryset(resolve_user_profiles(request.user))
+            if purchase_orders is None:
+                return Response(
+                    {
+                        'responseCode': status.HTTP_400_BAD_REQUEST,
+                        'responseMessage': 'User does not have a buyer or vendor profile.',
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
+            transition = serializer.validated_data['transition']
+            updated, skipped = bulk_transition_purchase_orders(purchase_orders, serializer.validated_data['ids'], transition)
+            return Response(
+                {
+                    'responseCode': status.HTTP_200_OK,
+                    'responseMessage': f'{len(updated)} purchase orders updated, {len(skipped)} skipped.',
+                    'responseData': {'transition': transition, 'updated': updated, 'skipped': skipped},
+                },
+                status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            print('bulk status transition error--------->', e)
+            return Response(
+                {
+                    'responseCode': status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    'responseMessage': 'Something went wrong! Please try again.',
+                    'responseData': {'error': str(e)},
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-18 02:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_models', '0003_buyer_buyer_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorMetricCounters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created Date')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated Date')),
+                ('total_orders', models.BigIntegerField(default=0, verbose_name='Total Orders')),
+                ('completed_orders', models.BigIntegerField(default=0, verbose_name='Completed Orders')),
+                ('on_time_orders', models.BigIntegerField(default=0, verbose_name='On Time Orders')),
+                ('quality_rating_sum', models.FloatField(default=0.0, verbose_name='Quality Rating Sum')),
+                ('acknowledged_orders', models.BigIntegerField(default=0, verbose_name='Acknowledged Orders')),
+                ('response_seconds_sum', models.FloatField(default=0.0, verbose_name='Response Seconds Sum')),
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metric_counters', to='vendor_models.vendor')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
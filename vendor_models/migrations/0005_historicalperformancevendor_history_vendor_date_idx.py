@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-18 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_models', '0004_vendormetriccounters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='historicalperformancevendor',
+            index=models.Index(fields=['vendor', '-date'], name='history_vendor_date_idx'),
+        ),
+    ]
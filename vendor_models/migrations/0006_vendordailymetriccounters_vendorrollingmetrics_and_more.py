@@ -0,0 +1,55 @@
+# Generated by Django 5.0.6 on 2026-10-18 02:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_models', '0005_historicalperformancevendor_history_vendor_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorDailyMetricCounters',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created Date')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated Date')),
+                ('total_orders', models.BigIntegerField(default=0, verbose_name='Total Orders')),
+                ('completed_orders', models.BigIntegerField(default=0, verbose_name='Completed Orders')),
+                ('on_time_orders', models.BigIntegerField(default=0, verbose_name='On Time Orders')),
+                ('quality_rating_sum', models.FloatField(default=0.0, verbose_name='Quality Rating Sum')),
+                ('acknowledged_orders', models.BigIntegerField(default=0, verbose_name='Acknowledged Orders')),
+                ('response_seconds_sum', models.FloatField(default=0.0, verbose_name='Response Seconds Sum')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_metric_counters', to='vendor_models.vendor')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VendorRollingMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created Date')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated Date')),
+                ('total_orders', models.BigIntegerField(default=0, verbose_name='Total Orders')),
+                ('completed_orders', models.BigIntegerField(default=0, verbose_name='Completed Orders')),
+                ('on_time_orders', models.BigIntegerField(default=0, verbose_name='On Time Orders')),
+                ('quality_rating_sum', models.FloatField(default=0.0, verbose_name='Quality Rating Sum')),
+                ('acknowledged_orders', models.BigIntegerField(default=0, verbose_name='Acknowledged Orders')),
+                ('response_seconds_sum', models.FloatField(default=0.0, verbose_name='Response Seconds Sum')),
+                ('window_days', models.PositiveSmallIntegerField(choices=[(30, '30 days'), (90, '90 days'), (365, '365 days')], verbose_name='Window (days)')),
+                ('window_start', models.DateField(verbose_name='Window Start')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rolling_metrics', to='vendor_models.vendor')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='vendordailymetriccounters',
+            constraint=models.UniqueConstraint(fields=('vendor', 'day'), name='unique_vendor_daily_counters'),
+        ),
+        migrations.AddConstraint(
+            model_name='vendorrollingmetrics',
+            constraint=models.UniqueConstraint(fields=('vendor', 'window_days'), name='unique_vendor_rolling_window'),
+        ),
+    ]
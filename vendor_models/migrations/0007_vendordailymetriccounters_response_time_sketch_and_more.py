@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_models', '0006_vendordailymetriccounters_vendorrollingmetrics_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendordailymetriccounters',
+            name='response_time_sketch',
+            field=models.BinaryField(blank=True, null=True, verbose_name='Response Time Sketch'),
+        ),
+        migrations.AddField(
+            model_name='vendormetriccounters',
+            name='response_time_sketch',
+            field=models.BinaryField(blank=True, null=True, verbose_name='Response Time Sketch'),
+        ),
+    ]
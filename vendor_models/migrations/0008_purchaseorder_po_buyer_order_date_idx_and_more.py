@@ -0,0 +1,21 @@
+# Generated by Django 5.0.6 on 2026-10-18 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_models', '0007_vendordailymetriccounters_response_time_sketch_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['buyer', '-order_date', '-id'], name='po_buyer_order_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['vendor', '-order_date', '-id'], name='po_vendor_order_date_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 02:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_models', '0008_purchaseorder_po_buyer_order_date_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['vendor', 'status', 'order_date', 'acknowledgment_date', 'issue_date', 'delivery_date', 'quality_rating'], name='po_vendor_metrics_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(condition=models.Q(('acknowledgment_date__isnull', False)), fields=['vendor', 'acknowledgment_date', 'issue_date', 'order_date'], name='po_vendor_acknowledged_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['buyer', 'status', '-order_date'], name='po_buyer_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(condition=models.Q(('delivery_date__isnull', False)), fields=['buyer', 'delivery_date'], name='po_buyer_delivery_idx'),
+        ),
+    ]
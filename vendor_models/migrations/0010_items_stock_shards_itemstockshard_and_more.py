@@ -0,0 +1,32 @@
+# Generated by Django 5.0.6 on 2026-10-18 03:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_models', '0009_purchaseorder_po_vendor_metrics_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='items',
+            name='stock_shards',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Stock Shards'),
+        ),
+        migrations.CreateModel(
+            name='ItemStockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Shard')),
+                ('available_quantity', models.PositiveBigIntegerField(default=0, verbose_name='Available Quantity')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='vendor_models.items')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='itemstockshard',
+            constraint=models.UniqueConstraint(fields=('item', 'shard'), name='unique_item_stock_shard'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-18 04:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_models', '0010_items_stock_shards_itemstockshard_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Updated Date'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Full-text search index over the user text fields, SQLite only.
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+USER_TABLE = 'vendor_models_vendormanagementuser'
+SEARCH_TABLE = 'vendor_models_user_search'
+SEARCH_COLUMNS = ('name', 'email', 'contact_details', 'address')
+
+
+def create_user_search_index(apps, schema_editor):
+    # FTS5 with the trigram tokenizer answers substring queries from an index. Other
+    # backends, and SQLite builds without FTS5, keep filtering with icontains.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5({columns}, "
+            f"content='{USER_TABLE}', content_rowid='id', tokenize='trigram')"
+        )
+    except OperationalError:
+        return
+    # External content table: the triggers keep the index in step with every write.
+    schema_editor.execute(
+        f"CREATE TRIGGER {SEARCH_TABLE}_ai AFTER INSERT ON {USER_TABLE} BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {SEARCH_TABLE}_ad AFTER DELETE ON {USER_TABLE} BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+    )
+    schema_editor.execute(
+        f"CREATE TRIGGER {SEARCH_TABLE}_au AFTER UPDATE OF {columns} ON {USER_TABLE} BEGIN "
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    )
+    schema_editor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+
+
+def drop_user_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for suffix in ('ai', 'ad', 'au'):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{suffix}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_models', '0011_purchaseorder_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_user_search_index, drop_user_search_index),
+    ]
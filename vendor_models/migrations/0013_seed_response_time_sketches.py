@@ -0,0 +1,40 @@
+# Seeds the response time sketches of counters rows written before 0007 added them.
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def seed_response_time_sketches(apps, schema_editor):
+    # The pure sketch implementation, so the historical models are all that is needed here
+    from apis.sketches import DDSketch
+    PurchaseOrder = apps.get_model('vendor_models', 'PurchaseOrder')
+    VendorMetricCounters = apps.get_model('vendor_models', 'VendorMetricCounters')
+    VendorDailyMetricCounters = apps.get_model('vendor_models', 'VendorDailyMetricCounters')
+    lifetime = {}
+    daily = {}
+    acknowledged = PurchaseOrder.objects.filter(acknowledgment_date__isnull=False).order_by()
+    for vendor_id, order_date, issue_date, acknowledgment_date in acknowledged.values_list(
+        'vendor_id', 'order_date', 'issue_date', 'acknowledgment_date'
+    ).iterator(chunk_size=2000):
+        seconds = (acknowledgment_date - issue_date).total_seconds()
+        lifetime.setdefault(vendor_id, DDSketch()).add(seconds)
+        daily.setdefault((vendor_id, timezone.localtime(order_date).date()), DDSketch()).add(seconds)
+    for counters in VendorMetricCounters.objects.filter(response_time_sketch__isnull=True, vendor_id__in=lifetime):
+        counters.response_time_sketch = lifetime[counters.vendor_id].to_bytes()
+        counters.save(update_fields=['response_time_sketch'])
+    for counters in VendorDailyMetricCounters.objects.filter(response_time_sketch__isnull=True):
+        sketch = daily.get((counters.vendor_id, counters.day))
+        if sketch is not None:
+            counters.response_time_sketch = sketch.to_bytes()
+            counters.save(update_fields=['response_time_sketch'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_models', '0012_user_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_response_time_sketches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 03:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_models', '0013_seed_response_time_sketches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveBigIntegerField(verbose_name='Quantity')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to='vendor_models.items')),
+                ('purchase_order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservation', to='vendor_models.purchaseorder')),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Builds the daily and rolling-window counters of vendors whose orders predate 0006.
+
+from django.db import migrations, transaction
+
+
+def rebuild_existing_window_counters(apps, schema_editor):
+    # The counters are rebuilt by the application code, the same way `rebuild_vendor_counters`
+    # does it, so the rows match what the incremental updates maintain from here on.
+    from apis.metric_counters import vendor_id_chunks, response_time_sketches, rebuild_window_counters
+    PurchaseOrder = apps.get_model('vendor_models', 'PurchaseOrder')
+    vendor_ids = set(PurchaseOrder.objects.order_by().values_list('vendor_id', flat=True).distinct())
+    if not vendor_ids:
+        return
+    for chunk in vendor_id_chunks(vendor_ids):
+        _, daily_sketches = response_time_sketches(chunk)
+        with transaction.atomic():
+            rebuild_window_counters(chunk, daily_sketches)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendor_models', '0014_stockreservation'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_existing_window_counters, migrations.RunPython.noop),
+    ]
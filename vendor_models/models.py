@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from .model_manager import VendorManagementUserManager 
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
@@ -121,6 +121,8 @@ class Items(CommonTimePicker):
     item_name = models.CharField("Item Name",max_length=255, blank=True, null=True,db_index=True)
     vendor = models.ForeignKey(Vendor,on_delete=models.CASCADE,related_name="items")
     available_quantity = models.PositiveBigIntegerField("Available Quantity")
+    # 0: stock lives in `available_quantity`; N: spread over N `ItemStockShard` rows
+    stock_shards = models.PositiveSmallIntegerField("Stock Shards", default=0)
 
     def __str__(self):
         return f"{self.item_name} selling by the vendor {self.vendor.user.name}"
@@ -130,6 +132,24 @@ class Items(CommonTimePicker):
 
 
 
+class ItemStockShard(models.Model):
+    """
+    One slice of a sharded item's stock. Reservations for a popular item land on
+    different rows, so concurrent orders do not all wait on the same row lock.
+    """
+    item = models.ForeignKey(Items, on_delete=models.CASCADE, related_name='shards')
+    shard = models.PositiveSmallIntegerField("Shard")
+    available_quantity = models.PositiveBigIntegerField("Available Quantity", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'shard'], name='unique_item_stock_shard'),
+        ]
+
+    def __str__(self):
+        return f"stock shard {self.shard} of item {self.item_id}"
+
+
 class PurchaseOrder(models.Model):
     po_number = models.CharField(max_length=100, unique=True, default=uuid.uuid4)
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='purchase_orders')
@@ -149,12 +169,124 @@ class PurchaseOrder(models.Model):
     quality_rating = models.FloatField(null=True, blank=True)
     issue_date = models.DateTimeField(auto_now_add=True)
     acknowledgment_date = models.DateTimeField(null=True, blank=True)
+    # Validator for conditional GETs; bulk `.update()` calls must set it explicitly
+    updated_at = models.DateTimeField("Updated Date", auto_now=True)
 
     def __str__(self):
         return f"PO {self.po_number} - {self.vendor.user.name}"
 
+    def save(self, *args, **kwargs):
+        # The save and its signal receivers share one transaction: the receivers lock the
+        # stored row to update the vendor counters by what the save actually changes.
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-order_date']
+        indexes = [
+            # Keyset pagination of a buyer's / vendor's orders on (order_date, id)
+            models.Index(fields=['buyer', '-order_date', '-id'], name='po_buyer_order_date_idx'),
+            models.Index(fields=['vendor', '-order_date', '-id'], name='po_vendor_order_date_idx'),
+            # (vendor, status) lookups; also covers every column the KPI aggregates read,
+            # so per-vendor and per-day aggregates never visit the table
+            models.Index(
+                fields=['vendor', 'status', 'order_date', 'acknowledgment_date', 'issue_date', 'delivery_date', 'quality_rating'],
+                name='po_vendor_metrics_idx',
+            ),
+            # Acknowledged orders only, for the response time scans
+            models.Index(
+                fields=['vendor', 'acknowledgment_date', 'issue_date', 'order_date'],
+                name='po_vendor_acknowledged_idx',
+                condition=models.Q(acknowledgment_date__isnull=False),
+            ),
+            # Purchase order list filters
+            models.Index(fields=['buyer', 'status', '-order_date'], name='po_buyer_status_idx'),
+            models.Index(
+                fields=['buyer', 'delivery_date'],
+                name='po_buyer_delivery_idx',
+                condition=models.Q(delivery_date__isnull=False),
+            ),
+        ]
+
+
+class StockReservation(models.Model):
+    """
+    Stock taken from an item for a purchase order. Cancelling the order returns exactly
+    this quantity and deletes the row, so an order never returns stock it did not take,
+    or returns it twice.
+    """
+    purchase_order = models.OneToOneField(PurchaseOrder, on_delete=models.CASCADE, related_name='stock_reservation')
+    item = models.ForeignKey(Items, on_delete=models.CASCADE, related_name='stock_reservations')
+    quantity = models.PositiveBigIntegerField("Quantity")
+
+    def __str__(self):
+        return f"{self.quantity} of item {self.item_id} for purchase order {self.purchase_order_id}"
+
+
+
+class PurchaseOrderMetricCounters(models.Model):
+    """
+    Running totals over a set of purchase orders, from which every vendor KPI can be derived
+    without rescanning `PurchaseOrder`.
+    """
+    total_orders = models.BigIntegerField("Total Orders", default=0)
+    completed_orders = models.BigIntegerField("Completed Orders", default=0)
+    on_time_orders = models.BigIntegerField("On Time Orders", default=0)
+    quality_rating_sum = models.FloatField("Quality Rating Sum", default=0.0)
+    acknowledged_orders = models.BigIntegerField("Acknowledged Orders", default=0)
+    response_seconds_sum = models.FloatField("Response Seconds Sum", default=0.0)
+
+    class Meta:
+        abstract = True
+
+
+class VendorMetricCounters(CommonTimePicker, PurchaseOrderMetricCounters):
+    vendor = models.OneToOneField(Vendor, on_delete=models.CASCADE, related_name='metric_counters')
+    # Serialized `apis.sketches.DDSketch` of the response times in seconds
+    response_time_sketch = models.BinaryField("Response Time Sketch", null=True, blank=True)
+
+    def __str__(self):
+        return f"metric counters of vendor {self.vendor_id}"
+
+
+class VendorDailyMetricCounters(CommonTimePicker, PurchaseOrderMetricCounters):
+    """
+    Counters of the purchase orders a vendor received on one day (by `order_date`).
+    """
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='daily_metric_counters')
+    day = models.DateField("Day")
+    response_time_sketch = models.BinaryField("Response Time Sketch", null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'day'], name='unique_vendor_daily_counters'),
+        ]
+
+    def __str__(self):
+        return f"metric counters of vendor {self.vendor_id} on {self.day}"
+
+
+class VendorRollingMetrics(CommonTimePicker, PurchaseOrderMetricCounters):
+    """
+    Counters of the purchase orders a vendor received from `window_start` onwards. The
+    window is moved forward by subtracting the daily counters that fall out of it.
+    """
+    WINDOW_CHOICES = [
+        (30, '30 days'),
+        (90, '90 days'),
+        (365, '365 days'),
+    ]
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='rolling_metrics')
+    window_days = models.PositiveSmallIntegerField("Window (days)", choices=WINDOW_CHOICES)
+    window_start = models.DateField("Window Start")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'window_days'], name='unique_vendor_rolling_window'),
+        ]
+
+    def __str__(self):
+        return f"{self.window_days} day metrics of vendor {self.vendor_id}"
 
 
 
@@ -166,6 +298,10 @@ class HistoricalPerformanceVendor(CommonTimePicker):
     average_response_time = models.FloatField(default=0.0)
     fulfillment_rate = models.FloatField(default=0.0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['vendor', '-date'], name='history_vendor_date_idx'),
+        ]
 
     def __str__(self):
         return f"vendor {self.vendor.user.name} fulfillment rate {self.fulfillment_rate}"
\ No newline at end of file
@@ -15,10 +15,12 @@ from pathlib import Path
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-from dotenv import load_dotenv
 import os 
 
-load_dotenv()
+# python-dotenv is only imported when there is a .env file to read.
+if (BASE_DIR / '.env').exists():
+    from dotenv import load_dotenv
+    load_dotenv(BASE_DIR / '.env')
 
 
 # Quick-start development settings - unsuitable for production
@@ -45,7 +47,6 @@ CUSTOM_APPS = [
 
 THIRD_PARTY_APPS = [
     'rest_framework',
-    'drf_yasg', 
     'rest_framework_simplejwt',
 ]
 
@@ -146,8 +147,20 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'apis.authentication.ClaimsJWTAuthentication',
+    ),
+    # Same JSON as DRF's JSONRenderer, encoded with orjson when it is installed
+    'DEFAULT_RENDERER_CLASSES': (
+        'apis.renderers.EnvelopeJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+}
+
+# Tokens issued at login carry the user's role and profile ids, so requests are
+# authenticated without loading the user. Whether the user is still active is re-checked
+# at most every TTL_SECONDS per process (immediately after a deactivation in this process).
+AUTH_PRINCIPAL_CACHE = {
+    'TTL_SECONDS': 30,
 }
 
 
@@ -179,3 +192,55 @@ SIMPLE_JWT = {
 
 
 AUTH_USER_MODEL = 'vendor_models.VendorManagementUser'
+
+
+# Vendor metric recomputation is coalesced per vendor and run on a worker thread pool.
+# Set ENABLED to False to recompute inline on every purchase order change.
+VENDOR_METRICS_QUEUE = {
+    'ENABLED': True,
+    'DEBOUNCE_SECONDS': 2.0,
+    'WORKERS': 2,
+}
+
+# Historical performance snapshots: unchanged metrics are not written again and every
+# change inside one BUCKET ('hour', 'day' or None for one row per change) updates the
+# same row. Existing history can be rewritten with `manage.py compact_performance_history`.
+VENDOR_PERFORMANCE_SNAPSHOTS = {
+    'BUCKET': 'hour',
+    'SKIP_UNCHANGED': True,
+}
+
+# In-process vendor leaderboard behind /vendors-leaderboard/ and /vendors/{id}/rank. It is
+# updated as KPIs are written in this process and reloaded from the database once it is
+# older than RELOAD_SECONDS, which bounds how stale writes from other processes can be.
+VENDOR_LEADERBOARD = {
+    'RELOAD_SECONDS': 300,
+}
+
+# Read-through cache of the vendor detail and performance payloads: an in-process LRU of
+# LOCAL_MAX_ENTRIES in front of the CACHES[ALIAS] backend. Entries are dropped whenever the
+# vendor or its KPIs change; other processes keep a local copy for at most LOCAL_TTL seconds.
+VENDOR_RESPONSE_CACHE = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+    'LOCAL_MAX_ENTRIES': 1024,
+    'LOCAL_TTL': 5,
+}
+
+# API documentation: /swagger/ and the OpenAPI document at /openapi.json. The document is
+# read from SCHEMA_FILE, written by `manage.py build_openapi` at deploy time, and cached by
+# clients for MAX_AGE seconds; without the file it is generated once per process. Set
+# API_DOCS_ENABLED=0 on API-only workers so they never import drf_yasg.
+API_DOCS = {
+    'ENABLED': os.environ.get('API_DOCS_ENABLED', '1') == '1',
+    'SCHEMA_FILE': BASE_DIR / 'openapi.json',
+    'MAX_AGE': 86400,
+}
+
+if API_DOCS['ENABLED']:
+    INSTALLED_APPS.append('drf_yasg')
+
+SWAGGER_SETTINGS = {
+    'SPEC_URL': 'openapi-schema',
+}
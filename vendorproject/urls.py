@@ -19,9 +19,7 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include 
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from apis.schema import api_docs_settings
 
 # from rest_framework_simplejwt.views import (
 #     TokenObtainPairView,
@@ -29,25 +27,14 @@ from drf_yasg import openapi
 # )
 
 
-
-
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Vendor Management Apis",
-      default_version='v1',
-      description="Vendor, Buyer, Purchase Order, Historical Performance",
-      terms_of_service="https://www.vendorexample.com/policies/terms/",
-      contact=openapi.Contact(email="vendor@example.com"),
-      license=openapi.License(name="Vendor License"),
-   ),
-   public=True,
-   permission_classes=(permissions.AllowAny,),
-)
-
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('apis/',include('apis.urls'),name='Apis'),
     # path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     # path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
 ]
+
+# drf_yasg and the schema annotations of the views are only loaded when docs are served.
+if api_docs_settings()['ENABLED']:
+    from apis.schema import docs_urlpatterns
+    urlpatterns += docs_urlpatterns()